@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.api.routes.transactions import get_db
+from app.schemas.analytics import DistinctMerchants, TopMerchants
+from app.services.analytics import distinct_merchants, top_merchants
+from app.services.months import MONTH_PATTERN
+from app.services.summaries import check_summary_range
+
+# Router object is created for approximate analytics endpoints
+router = APIRouter(prefix="/transactions/analytics", tags=["analytics"])
+
+
+# Month range is validated as for the range summary
+def _check_range(start: str, end: str) -> None:
+    try:
+        check_summary_range(start, end)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+# Top merchants endpoint is defined
+@router.get("/top-merchants", response_model=TopMerchants)
+def get_top_merchants(
+    start: str = Query(pattern=MONTH_PATTERN),
+    end: str = Query(pattern=MONTH_PATTERN),
+    limit: int = Query(default=20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    _check_range(start, end)
+
+    # Monthly top merchant sketches of the range are merged
+    return top_merchants(db, start, end, limit)
+
+
+# Distinct merchants endpoint is defined
+@router.get("/distinct-merchants", response_model=DistinctMerchants)
+def get_distinct_merchants(
+    start: str = Query(pattern=MONTH_PATTERN),
+    end: str = Query(pattern=MONTH_PATTERN),
+    db: Session = Depends(get_db),
+):
+    _check_range(start, end)
+
+    # Monthly distinct merchant sketches of the range are merged per category
+    return distinct_merchants(db, start, end)
@@ -1,10 +1,18 @@
 from fastapi import APIRouter
 
+from app.services.categorizer import get_rules_version
+from app.services.rules_watcher import rules_watcher
+
 # Router object is created for health-related endpoints
 router = APIRouter()
 
 # Health check endpoint is defined
 @router.get("/health")
 def health_check():
-    # A simple status response is returned
-    return {"status": "healthy"}
+    # Status is returned with the version of the active categorization rules
+    # A rules file that failed to load is reported while the previous rules stay active
+    return {
+        "status": "healthy",
+        "rules_version": get_rules_version(),
+        "rules_error": rules_watcher.last_error,
+    }
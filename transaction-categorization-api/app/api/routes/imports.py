@@ -0,0 +1,108 @@
+import os
+import uuid
+from pathlib import Path
+from typing import Literal
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.api.routes.transactions import get_db
+from app.core.config import settings
+from app.models.import_job import ImportJob
+from app.schemas.import_job import ImportJobRead
+from app.services.statement_import import (
+    ImportAlreadyRunning,
+    create_import_job,
+    is_import_running,
+    run_import,
+)
+
+# Router object is created for statement import endpoints
+router = APIRouter(prefix="/transactions/imports", tags=["imports"])
+
+
+# Uploaded statement is imported after the response has been sent
+def _import_uploaded_statement(job_id: int, source_path: str) -> None:
+    try:
+        status = run_import(job_id)
+    except ImportAlreadyRunning:
+        return
+
+    # Spooled uploads are removed once they have been fully imported
+    # Failed imports keep their file so they can be resumed, files imported by the CLI are never removed
+    spooled = Path(source_path).parent.resolve() == Path(settings.import_dir).resolve()
+    if status == "completed" and spooled:
+        os.remove(source_path)
+
+
+# Statement upload endpoint is defined
+@router.post(
+    "/",
+    response_model=ImportJobRead,
+    status_code=202,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "text/csv": {"schema": {"type": "string", "format": "binary"}},
+                "application/x-ofx": {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+async def upload_statement(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    file_format: Literal["csv", "ofx"] = Query(alias="format"),
+    db: Session = Depends(get_db),
+):
+    # Request body is spooled to disk chunk by chunk so memory stays flat
+    source_path = Path(settings.import_dir) / f"{uuid.uuid4().hex}.{file_format}"
+    source_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(source_path, "wb") as upload:
+        async for chunk in request.stream():
+            await run_in_threadpool(upload.write, chunk)
+
+    # Empty uploads are rejected
+    if source_path.stat().st_size == 0:
+        source_path.unlink()
+        raise HTTPException(status_code=422, detail="Statement file is empty")
+
+    # Import job is recorded and processed in the background
+    job = await run_in_threadpool(create_import_job, db, str(source_path), file_format)
+    background_tasks.add_task(_import_uploaded_statement, job.id, job.source_path)
+
+    # Accepted job is returned so its progress can be polled
+    return job
+
+
+# Import job progress endpoint is defined
+@router.get("/{job_id}", response_model=ImportJobRead)
+def get_import_job(job_id: int, db: Session = Depends(get_db)):
+    # Job is looked up by id
+    job = db.get(ImportJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
+# Import job resume endpoint is defined
+@router.post("/{job_id}/resume", response_model=ImportJobRead, status_code=202)
+def resume_import_job(
+    job_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
+    # Job is looked up by id
+    job = db.get(ImportJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+
+    # Completed and running jobs cannot be resumed
+    if job.status == "completed" or is_import_running(job_id):
+        raise HTTPException(status_code=409, detail=f"Import job is {job.status}")
+
+    # Import continues from the last checkpoint in the background
+    background_tasks.add_task(_import_uploaded_statement, job.id, job.source_path)
+    return job
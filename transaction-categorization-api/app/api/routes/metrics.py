@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import render_metrics
+
+# Router object is created for the metrics endpoint
+router = APIRouter()
+
+# Content type of the Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# Metrics endpoint is defined
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    # Current metrics are rendered in the Prometheus text format
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
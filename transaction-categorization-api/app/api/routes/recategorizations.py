@@ -0,0 +1,65 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.api.routes.transactions import get_db
+from app.models.recategorization_job import RecategorizationJob
+from app.schemas.recategorization_job import RecategorizationJobRead
+from app.services.recategorization import (
+    RecategorizationAlreadyRunning,
+    create_recategorization_job,
+    is_recategorization_running,
+    run_recategorization,
+)
+
+# Router object is created for re-categorization endpoints
+router = APIRouter(prefix="/transactions/recategorizations", tags=["recategorizations"])
+
+
+# Job is processed after the response has been sent
+def _run_recategorization(job_id: int) -> None:
+    try:
+        run_recategorization(job_id)
+    except RecategorizationAlreadyRunning:
+        return
+
+
+# Re-categorization start endpoint is defined
+@router.post("/", response_model=RecategorizationJobRead, status_code=202)
+def start_recategorization(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    # Job covering every stored row is recorded and processed in the background
+    job = create_recategorization_job(db)
+    background_tasks.add_task(_run_recategorization, job.id)
+
+    # Accepted job is returned so its progress can be polled
+    return job
+
+
+# Re-categorization job progress endpoint is defined
+@router.get("/{job_id}", response_model=RecategorizationJobRead)
+def get_recategorization_job(job_id: int, db: Session = Depends(get_db)):
+    # Job is looked up by id
+    job = db.get(RecategorizationJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Re-categorization job not found")
+    return job
+
+
+# Re-categorization job resume endpoint is defined
+@router.post("/{job_id}/resume", response_model=RecategorizationJobRead, status_code=202)
+def resume_recategorization_job(
+    job_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
+    # Job is looked up by id
+    job = db.get(RecategorizationJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Re-categorization job not found")
+
+    # Completed and running jobs cannot be resumed
+    if job.status == "completed" or is_recategorization_running(job_id):
+        raise HTTPException(status_code=409, detail=f"Re-categorization job is {job.status}")
+
+    # Job continues after its last checkpoint in the background
+    background_tasks.add_task(_run_recategorization, job.id)
+    return job
@@ -1,13 +1,44 @@
+import json
+from collections.abc import AsyncIterator
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 from datetime import date
+from typing import Literal
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.responses import FastJSONResponse
 from app.db.session import SessionLocal
-from app.models.transaction import Transaction
-from app.schemas.transaction import MonthlySummary, TransactionCreate, TransactionRead
-from app.services.categorizer import categorize_transaction
+from app.db.shards import ShardReadOnly, is_year_writable
+from app.schemas.transaction import (
+    BulkIngestResult,
+    BulkRowResult,
+    MonthlyRangeSummary,
+    MonthlySummary,
+    TransactionChanges,
+    TransactionCreate,
+    TransactionCreated,
+    TransactionRead,
+)
+from app.services.categorizer import categorize_merchant, get_rule_engine
+from app.services.changes import delete_transaction, read_changes
+from app.services.ingest import decode_ndjson_line, ingest_chunk, insert_unique_rows, same_transaction
+from app.services.listing import (
+    csv_chunks,
+    decode_cursor,
+    fetch_transaction_rows,
+    gzip_chunks,
+    iter_transaction_rows,
+    ndjson_chunks,
+    transaction_rows_content,
+)
+from app.services.money import from_cents, to_cents
+from app.services.months import MONTH_PATTERN
+from app.services.summaries import check_summary_range, month_summary, range_summary
+from app.services.write_behind import WriteQueueFull, write_behind
 
 # Router object is created for transaction related endpoints
 router = APIRouter(prefix="/transactions", tags=["transactions"])
@@ -25,115 +56,354 @@ def get_db():
         db.close()
 
 
+# Idempotency key header shared by the create endpoints is defined
+# A request repeating a key is answered with the transaction stored for it
+IdempotencyKey = Header(
+    default=None,
+    min_length=1,
+    max_length=200,
+    description="Key of the request; a retried request with the same key is not stored twice",
+)
+
+
+def write_timeout_error(future: Future) -> HTTPException:
+    # A row still waiting in the queue is withdrawn, so it is never written
+    if future.cancel():
+        return HTTPException(
+            status_code=503,
+            detail="Transaction was not written in time and was withdrawn",
+            headers={"Retry-After": "1"},
+        )
+
+    # A row already in a group being committed may still be stored, so the outcome is unknown
+    # Retrying with the same Idempotency-Key or external_id stores it at most once
+    return HTTPException(
+        status_code=504,
+        detail="Transaction commit was not confirmed in time and may still be stored; "
+        "retry with the same Idempotency-Key or external_id",
+        headers={"Retry-After": "1"},
+    )
+
+
 # Transaction creation endpoint is defined
-@router.post("/", response_model=TransactionRead)
+@router.post("/", response_model=TransactionCreated)
 def create_transaction(
     transaction: TransactionCreate,
+    response: Response,
+    idempotency_key: str | None = IdempotencyKey,
     db: Session = Depends(get_db),
 ):
+    # Years archived in a read-only shard accept no new rows
+    if not is_year_writable(db, transaction.date.year):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Transactions dated {transaction.date.year} are archived read-only",
+        )
+
     # Category is determined using business logic
-    category = categorize_transaction(transaction.merchant)
-
-    # Transaction database object is created
-    db_transaction = Transaction(
-        amount=transaction.amount,
-        merchant=transaction.merchant,
-        category=category,
-        date=transaction.date,
-    )
+    # Active rules are read once, so the stored version is the one that assigned the category
+    rule_engine = get_rule_engine()
+    categorization = categorize_merchant(transaction.merchant, rule_engine)
 
-    # Transaction is added to the database session
-    db.add(db_transaction)
+    # Transaction row is built from the validated payload
+    # The idempotency key is stored as the external id when the payload has none
+    row = {
+        "amount_cents": to_cents(transaction.amount),
+        "merchant": transaction.merchant,
+        "category": categorization.category,
+        "date": transaction.date,
+        "external_id": transaction.external_id or idempotency_key,
+        "rules_version": rule_engine.version,
+        "category_source": categorization.source,
+    }
 
-    # Changes are committed to the database
-    db.commit()
+    # Row is handed to the group commit writer when write-behind is enabled
+    if settings.write_behind_enabled:
+        try:
+            future = write_behind.submit(row, settings.write_behind_submit_timeout_ms / 1000)
+        except WriteQueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Write queue is full",
+                headers={"Retry-After": "1"},
+            )
+
+        # Response waits until the row's group has been committed
+        try:
+            stored, inserted = future.result(timeout=settings.write_behind_commit_timeout_s)
+        except FutureTimeout:
+            raise write_timeout_error(future) from None
+    else:
+        # Row and its monthly rollup are written in one transaction, unless its external id is stored
+        ((stored, inserted),) = insert_unique_rows(db, [row])
 
-    # Database generated values are refreshed
-    db.refresh(db_transaction)
+        # Changes are committed to the database
+        db.commit()
+
+    # A stored external id is never reused for a different transaction
+    if not inserted and not same_transaction(row, stored):
+        raise HTTPException(
+            status_code=409,
+            detail=f"external_id {row['external_id']} is already used by transaction {stored['id']}",
+        )
+
+    # A retried request is answered with the stored transaction and marked as replayed
+    if not inserted:
+        response.headers["Idempotent-Replayed"] = "true"
 
     # Stored transaction is returned
-    return db_transaction
+    return {**stored, "amount": from_cents(stored["amount_cents"])}
+
+
+# Request body lines are read incrementally from the client stream
+async def _iter_body_lines(request: Request) -> AsyncIterator[bytes]:
+    # Partial line carried over between stream chunks
+    pending = b""
+
+    async for chunk in request.stream():
+        # Complete lines are emitted as soon as they arrive
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+
+    # Final line without a trailing newline is emitted
+    if pending:
+        yield pending
+
+
+# Raw bulk rows are read from a JSON array or an NDJSON stream
+async def _iter_bulk_rows(request: Request) -> AsyncIterator[tuple[int, object]]:
+    content_type = request.headers.get("content-type", "")
+
+    # NDJSON bodies are decoded line by line while they are streamed
+    if "ndjson" in content_type or "jsonl" in content_type:
+        index = 0
+        async for line in _iter_body_lines(request):
+            # Blank lines are skipped without consuming a position
+            if not line.strip():
+                continue
+            yield index, decode_ndjson_line(line)
+            index += 1
+        return
+
+    # JSON bodies are expected to hold a single array of rows
+    try:
+        payload = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=422, detail="Request body must be a JSON array")
+
+    for index, raw_row in enumerate(payload):
+        yield index, raw_row
+
+
+# Bulk transaction ingest endpoint is defined
+@router.post(
+    "/bulk",
+    response_model=BulkIngestResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": TransactionCreate.model_json_schema(),
+                    }
+                },
+                "application/x-ndjson": {
+                    "schema": TransactionCreate.model_json_schema(),
+                },
+            },
+        }
+    },
+)
+async def bulk_create_transactions(
+    request: Request,
+    idempotency_key: str | None = IdempotencyKey,
+    db: Session = Depends(get_db),
+):
+    # Per-row outcomes are collected in submission order
+    results: list[BulkRowResult] = []
+
+    # Raw rows are buffered until a full chunk is available
+    pending: list[tuple[int, object]] = []
+
+    try:
+        async for raw_row in _iter_bulk_rows(request):
+            pending.append(raw_row)
+
+            # Full chunks are categorized and inserted off the event loop
+            # Rows without an external id are keyed by the idempotency key and their position
+            if len(pending) >= settings.bulk_chunk_size:
+                results.extend(await run_in_threadpool(ingest_chunk, db, pending, idempotency_key))
+                pending = []
+
+        # Remaining rows are written as a final chunk
+        if pending:
+            results.extend(await run_in_threadpool(ingest_chunk, db, pending, idempotency_key))
+
+        # All chunks are committed in one transaction
+        await run_in_threadpool(db.commit)
+    except BaseException:
+        # Partially written chunks are discarded on failure
+        await run_in_threadpool(db.rollback)
+        raise
+
+    # Counts are derived from the per-row outcomes
+    stored = sum(1 for row_result in results if row_result.id is not None)
+    duplicates = sum(1 for row_result in results if row_result.duplicate)
+
+    # Bulk ingest outcome is returned
+    return {
+        "inserted": stored - duplicates,
+        "failed": len(results) - stored,
+        "duplicates": duplicates,
+        "results": results,
+    }
 
 
 # Transaction list endpoint is defined
-@router.get("/", response_model=list[TransactionRead])
+@router.get(
+    "/",
+    response_model=list[TransactionRead],
+    responses={
+        200: {
+            "headers": {
+                "X-Next-Cursor": {
+                    "description": "Cursor for the next page when more rows are available",
+                    "schema": {"type": "string"},
+                }
+            },
+            "content": {"application/x-ndjson": {}},
+        }
+    },
+)
 def list_transactions(
     start: date | None = None,
     end: date | None = None,
+    limit: int | None = Query(default=None, ge=1, le=settings.max_page_size),
+    after: str | None = None,
+    stream: bool = False,
     db: Session = Depends(get_db),
 ):
-    # Base query for transactions is created
-    query = db.query(Transaction)
+    # Opaque cursor is decoded into its (date, id) position
+    try:
+        after_key = decode_cursor(after) if after is not None else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
-    # Start date filter is applied if provided
-    if start is not None:
-        query = query.filter(Transaction.date >= start)
+    # Streaming mode writes NDJSON rows straight from the database cursor
+    if stream:
+        rows = iter_transaction_rows(start, end, after_key, settings.stream_chunk_size)
+        return StreamingResponse(
+            ndjson_chunks(rows, settings.stream_chunk_size),
+            media_type="application/x-ndjson",
+        )
 
-    # End date filter is applied if provided
-    if end is not None:
-        query = query.filter(Transaction.date <= end)
+    # A single page, or the whole range without a limit, is fetched as column tuples
+    rows, next_cursor = fetch_transaction_rows(db, start, end, after_key, limit)
 
-    # Query results are returned
-    return query.all()
+    # Cursor for the next page is returned when the page is full
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor is not None else None
 
+    # Rows are encoded directly, skipping per-row response model validation
+    # The declared response model still documents the payload
+    return FastJSONResponse(transaction_rows_content(rows), headers=headers)
 
-# Monthly summary endpoint is defined
-@router.get("/summary", response_model=MonthlySummary)
-def monthly_summary(
-    month: str,
-    db: Session = Depends(get_db),
+
+# Transaction export endpoint is defined
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/csv": {}, "application/x-ndjson": {}}}},
+)
+def export_transactions(
+    request: Request,
+    export_format: Literal["csv", "ndjson"] = Query(default="csv", alias="format"),
+    start: date | None = None,
+    end: date | None = None,
 ):
-    # Month value is expected in YYYY MM form
-    month_key = month
-
-    # Month extraction expression is defined for SQLite
-    month_expr = func.strftime("%Y-%m", Transaction.date)
-
-    # Grouped totals are computed at the database level
-    grouped_rows = (
-        db.query(
-            Transaction.category.label("category"),
-            func.count(Transaction.id).label("transaction_count"),
-            func.sum(Transaction.amount).label("category_total"),
-        )
-        .filter(month_expr == month_key)
-        .group_by(Transaction.category)
-        .all()
-    )
+    # Rows are read from a server-side cursor in fixed size chunks
+    rows = iter_transaction_rows(start, end, chunk_size=settings.stream_chunk_size)
 
-    # Totals by category container is created
-    totals_by_category: dict[str, float] = {}
+    # Rows are encoded directly in the requested format
+    if export_format == "csv":
+        chunks = csv_chunks(rows, settings.stream_chunk_size)
+        media_type = "text/csv"
+    else:
+        chunks = ndjson_chunks(rows, settings.stream_chunk_size)
+        media_type = "application/x-ndjson"
 
-    # Overall total accumulator is created
-    overall_total = 0.0
+    headers = {"Content-Disposition": f'attachment; filename="transactions.{export_format}"'}
 
-    # Transaction count accumulator is created
-    transaction_count = 0
+    # Output is gzip compressed on the fly when the client accepts it
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
 
-    # Grouped rows are converted into the response structures
-    for row in grouped_rows:
-        # Category label is read
-        category = row.category
+    # Export is streamed without buffering the result
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
 
-        # Category total value is normalized
-        category_total = float(row.category_total or 0.0)
 
-        # Transaction count value is normalized
-        category_count = int(row.transaction_count or 0)
+# Change feed endpoint is defined
+@router.get("/changes", response_model=TransactionChanges)
+def list_changes(
+    since: int = Query(default=0, ge=0),
+    limit: int = Query(default=settings.max_page_size, ge=1, le=settings.max_page_size),
+    db: Session = Depends(get_db),
+):
+    # Inserts, re-categorizations and deletes after the cursor are read from the change sequence index
+    # Changes are encoded directly, skipping per-row response model validation
+    return FastJSONResponse(read_changes(db, since, limit))
 
-        # Category total is stored
-        totals_by_category[category] = category_total
 
-        # Overall total is accumulated
-        overall_total += category_total
+# Transaction delete endpoint is defined
+@router.delete("/{transaction_id}", status_code=204)
+def remove_transaction(transaction_id: int, db: Session = Depends(get_db)):
+    # Row, its rollup and its tombstone are written in one transaction
+    try:
+        deleted = delete_transaction(db, transaction_id)
+    except ShardReadOnly as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Transaction {transaction_id} does not exist")
 
-        # Overall transaction count is accumulated
-        transaction_count += category_count
+    # Changes are committed to the database
+    db.commit()
+    return Response(status_code=204)
 
-    # Summary response is returned
-    return {
-        "month": month_key,
-        "transaction_count": transaction_count,
-        "overall_total": overall_total,
-        "totals_by_category": totals_by_category,
-    }
+
+# Monthly summary endpoint is defined
+@router.get("/summary", response_model=MonthlySummary)
+def monthly_summary(
+    month: str = Query(pattern=MONTH_PATTERN),
+    db: Session = Depends(get_db),
+):
+    # Summary for the month is built from the rollup table
+    return month_summary(db, month)
+
+
+# Multi-month summary endpoint is defined
+@router.get(
+    "/summary/range",
+    response_model=MonthlyRangeSummary,
+    response_model_exclude_none=True,
+)
+def monthly_range_summary(
+    start: str = Query(pattern=MONTH_PATTERN),
+    end: str = Query(pattern=MONTH_PATTERN),
+    yoy: bool = False,
+    db: Session = Depends(get_db),
+):
+    # Range must be ordered and bounded
+    try:
+        check_summary_range(start, end, yoy)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+    # Columnar summary is returned
+    return range_summary(db, start, end, yoy)
@@ -0,0 +1,244 @@
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator
+from datetime import date
+from itertools import islice
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.routes.transactions import IdempotencyKey, write_timeout_error
+from app.core.config import settings
+from app.core.responses import FastJSONResponse
+from app.db.async_session import AsyncSessionLocal
+from app.schemas.transaction import (
+    MonthlyRangeSummary,
+    MonthlySummary,
+    TransactionCreate,
+    TransactionCreated,
+    TransactionRead,
+)
+from app.services.archive import find_segments, iter_archived_rows, merge_archived_rows, row_key
+from app.services.categorizer import categorize_merchant, get_rule_engine
+from app.services.ingest import insert_unique_rows, same_transaction
+from app.services.listing import (
+    LIST_COLUMNS,
+    decode_cursor,
+    encode_ndjson,
+    next_page_cursor,
+    page_statement,
+    transaction_list_statement,
+    transaction_rows_content,
+)
+from app.services.money import from_cents, to_cents
+from app.services.months import MONTH_PATTERN
+from app.services.summaries import check_summary_range, month_summary, range_summary
+from app.services.write_behind import WriteQueueFull, write_behind
+
+# Router object is created for the async versions of the transaction endpoints
+# Routes are hidden from the schema because the sync routes document the same contract
+router = APIRouter(prefix="/transactions", tags=["transactions"], include_in_schema=False)
+
+
+# Async database session dependency is defined
+async def get_async_db():
+    # Async session is created and closed around the request
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Async transaction creation endpoint is defined
+@router.post("/", response_model=TransactionCreated)
+async def create_transaction(
+    transaction: TransactionCreate,
+    response: Response,
+    idempotency_key: str | None = IdempotencyKey,
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Category is determined using business logic
+    # Active rules are read once, so the stored version is the one that assigned the category
+    rule_engine = get_rule_engine()
+    categorization = categorize_merchant(transaction.merchant, rule_engine)
+
+    # Transaction row is built from the validated payload
+    # The idempotency key is stored as the external id when the payload has none
+    row = {
+        "amount_cents": to_cents(transaction.amount),
+        "merchant": transaction.merchant,
+        "category": categorization.category,
+        "date": transaction.date,
+        "external_id": transaction.external_id or idempotency_key,
+        "rules_version": rule_engine.version,
+        "category_source": categorization.source,
+    }
+
+    # Row is handed to the group commit writer when write-behind is enabled
+    # The event loop is never blocked, a full queue is rejected immediately
+    if settings.write_behind_enabled:
+        try:
+            future = write_behind.submit(row, timeout=0)
+        except WriteQueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Write queue is full",
+                headers={"Retry-After": "1"},
+            )
+
+        # Response waits until the row's group has been committed
+        try:
+            stored, inserted = await asyncio.wait_for(
+                asyncio.wrap_future(future), settings.write_behind_commit_timeout_s
+            )
+        except asyncio.TimeoutError:
+            raise write_timeout_error(future) from None
+    else:
+        # Shared insert logic runs on the async connection
+        ((stored, inserted),) = await db.run_sync(insert_unique_rows, [row])
+
+        # Changes are committed to the database
+        await db.commit()
+
+    # A stored external id is never reused for a different transaction
+    if not inserted and not same_transaction(row, stored):
+        raise HTTPException(
+            status_code=409,
+            detail=f"external_id {row['external_id']} is already used by transaction {stored['id']}",
+        )
+
+    # A retried request is answered with the stored transaction and marked as replayed
+    if not inserted:
+        response.headers["Idempotent-Replayed"] = "true"
+
+    # Stored transaction is returned
+    return {**stored, "amount": from_cents(stored["amount_cents"])}
+
+
+# Rows are streamed from an async server-side cursor
+async def _aiter_ndjson(
+    start: date | None,
+    end: date | None,
+    after: tuple[date, int] | None,
+) -> AsyncIterator[bytes]:
+    # A dedicated session lives as long as the response stream
+    async with AsyncSessionLocal() as session:
+        # Archived months the range reaches are looked up before streaming starts
+        segments = await session.run_sync(find_segments, start, end, after)
+        archived = iter_archived_rows(segments, start, end, after)
+
+        # Segment files are read and decompressed in the threadpool, a batch of rows at a time
+        # The event loop only merges rows that are already decoded
+        pending: deque = deque()
+        archived_left = bool(segments)
+
+        async def read_archived() -> list:
+            nonlocal archived_left
+            batch = await run_in_threadpool(list, islice(archived, settings.stream_chunk_size))
+            archived_left = len(batch) == settings.stream_chunk_size
+            return batch
+
+        statement = transaction_list_statement(start, end, after, LIST_COLUMNS)
+        result = await session.stream(
+            statement.execution_options(yield_per=settings.stream_chunk_size)
+        )
+
+        # Each fetched partition is encoded as one chunk
+        # Archived rows that sort before the partition's last row are merged into it
+        async for partition in result.partitions():
+            last_key = row_key(partition[-1])
+            while archived_left and (not pending or row_key(pending[-1]) < last_key):
+                pending.extend(await read_archived())
+            earlier = []
+            while pending and row_key(pending[0]) < last_key:
+                earlier.append(pending.popleft())
+            yield encode_ndjson(merge_archived_rows(partition, earlier))
+
+        # Archived rows after the last stored row are written last
+        if pending:
+            yield encode_ndjson(pending)
+        while archived_left:
+            batch = await read_archived()
+            if batch:
+                yield encode_ndjson(batch)
+
+
+# Async transaction list endpoint is defined
+@router.get("/", response_model=list[TransactionRead])
+async def list_transactions(
+    start: date | None = None,
+    end: date | None = None,
+    limit: int | None = Query(default=None, ge=1, le=settings.max_page_size),
+    after: str | None = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Opaque cursor is decoded into its (date, id) position
+    try:
+        after_key = decode_cursor(after) if after is not None else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    # Streaming mode writes NDJSON rows straight from the database cursor
+    if stream:
+        return StreamingResponse(
+            _aiter_ndjson(start, end, after_key),
+            media_type="application/x-ndjson",
+        )
+
+    # Archived months the range reaches are looked up on the async connection
+    segments = await db.run_sync(find_segments, start, end, after_key)
+
+    # Segment files are read and decompressed in the threadpool, as the stream reads them
+    archived = []
+    if segments:
+        archived = await run_in_threadpool(
+            list, islice(iter_archived_rows(segments, start, end, after_key), limit)
+        )
+
+    # Stored rows of the page are fetched as column tuples with the shared keyset logic
+    statement = page_statement(
+        transaction_list_statement(start, end, after_key, LIST_COLUMNS), archived, limit
+    )
+    stored = (await db.execute(statement)).all()
+    rows = list(merge_archived_rows(stored, archived, limit))
+
+    # Cursor for the next page is returned when the page is full
+    next_cursor = next_page_cursor(rows, limit)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor is not None else None
+
+    # Rows are encoded directly, skipping per-row response model validation
+    # The declared response model still documents the payload
+    return FastJSONResponse(transaction_rows_content(rows), headers=headers)
+
+
+# Async monthly summary endpoint is defined
+@router.get("/summary", response_model=MonthlySummary)
+async def monthly_summary(
+    month: str = Query(pattern=MONTH_PATTERN),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Summary for the month is built from the rollup table
+    return await db.run_sync(month_summary, month)
+
+
+# Async multi-month summary endpoint is defined
+@router.get(
+    "/summary/range",
+    response_model=MonthlyRangeSummary,
+    response_model_exclude_none=True,
+)
+async def monthly_range_summary(
+    start: str = Query(pattern=MONTH_PATTERN),
+    end: str = Query(pattern=MONTH_PATTERN),
+    yoy: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Range must be ordered and bounded
+    try:
+        check_summary_range(start, end, yoy)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+    # Columnar summary is returned
+    return await db.run_sync(range_summary, start, end, yoy)
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -11,6 +13,124 @@ class Settings(BaseSettings):
     # SQLite is used for simplicity
     database_url: str = "sqlite:///./transactions.db"
 
+    # Directory of per-year shard files, partitioning is disabled when empty
+    # Each year's transactions and monthly rollups then live in their own SQLite file
+    partition_dir: str = ""
+
+    # Shards of years before this one are opened read-only, 0 keeps every shard writable
+    partition_readonly_before: int = 0
+
+    # Directory of the compressed segment files holding archived months
+    archive_dir: str = "archive"
+
+    # Months ending more than this many months ago are moved to the archive by scripts.archive_months
+    archive_after_months: int = 24
+
+    # Decoded archive row groups of up to 16,384 rows kept in memory by each worker
+    archive_cache_row_groups: int = 128
+
+    # Create, list and summary routes use the async engine when enabled
+    use_async_db: bool = False
+
+    # Async driver URL is derived from the database URL when empty
+    async_database_url: str = ""
+
+    # SQLite journal mode is applied to every new connection
+    # WAL lets readers proceed while a writer is active
+    sqlite_journal_mode: Literal["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"] = "WAL"
+
+    # SQLite fsync level is applied to every new connection
+    # NORMAL is durable across application crashes when WAL is used
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+
+    # SQLite page cache size is applied to every new connection
+    # Negative values are KiB, so the default is a 64 MiB cache
+    sqlite_cache_size: int = -64_000
+
+    # Bytes of the database file read through memory mapping
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+
+    # Milliseconds a connection waits for a lock before failing
+    sqlite_busy_timeout_ms: int = 5_000
+
+    # Persistent connections kept in the pool
+    db_pool_size: int = 10
+
+    # Extra connections opened beyond the pool size under load
+    # Together with the pool size this covers the default threadpool of 40 workers
+    db_max_overflow: int = 30
+
+    # Seconds a request waits for a pooled connection
+    db_pool_timeout: float = 30.0
+
+    # Number of rows written by each multi-row insert during bulk ingest
+    # Kept well below the SQLite bound parameter limit
+    bulk_chunk_size: int = 500
+
+    # Single-row creates are queued and group committed when enabled
+    # A response is still sent only after its row has been committed
+    write_behind_enabled: bool = False
+
+    # Largest number of queued rows written in one transaction
+    write_behind_max_batch_rows: int = 500
+
+    # Longest time the writer waits for more rows before flushing
+    write_behind_max_delay_ms: float = 5.0
+
+    # Rows that may wait in the queue before new requests are rejected
+    write_behind_queue_size: int = 10_000
+
+    # Milliseconds a request waits for queue space before a 503 is returned
+    write_behind_submit_timeout_ms: float = 100.0
+
+    # Seconds a request waits for its group commit before it is answered with 503 or 504
+    write_behind_commit_timeout_s: float = 30.0
+
+    # Path of the categorization rules file
+    # The rules bundled with the application are used when empty
+    rules_path: str = ""
+
+    # Seconds between checks of the rules file for changes
+    # Changed rules are compiled in the background and swapped in; 0 disables reloading
+    rules_reload_interval_s: float = 5.0
+
+    # Maximum number of normalized merchants kept in the category cache
+    category_cache_size: int = 10_000
+
+    # Merchants of this many most recent transactions are categorized at startup
+    # This fills the category cache before the first request, 0 disables it
+    category_cache_warm_rows: int = 10_000
+
+    # Path of a trained fallback model for merchants no rule matches
+    # The fallback is disabled when empty and requires NumPy when set
+    fallback_model_path: str = ""
+
+    # Smallest probability at which a fallback prediction replaces the default category
+    fallback_min_confidence: float = 0.8
+
+    # Merchants tracked per month by the top merchant sketch
+    # A merchant seen in more than 1 / capacity of a month's transactions is always tracked
+    top_merchant_capacity: int = 500
+
+    # Largest page size accepted by the transaction list endpoint
+    max_page_size: int = 1000
+
+    # Number of rows fetched per cursor round trip when streaming
+    stream_chunk_size: int = 1000
+
+    # Request, SQL and categorizer metrics are collected and served on /metrics when enabled
+    metrics_enabled: bool = True
+
+    # Directory where uploaded statement files are kept until their import completes
+    import_dir: str = "imports"
+
+    # Bytes read from a statement file per read call
+    import_read_size: int = 64 * 1024
+
+    # Number of rows categorized and written back per re-categorization chunk
+    # Each chunk is committed in its own short transaction
+    recategorize_chunk_size: int = 2_000
+
     class Config:
         # Environment variables are loaded from a .env file
         env_file = ".env"
@@ -0,0 +1,285 @@
+# Prometheus metrics are defined in this file
+# Metrics are kept in process and rendered in the Prometheus text format on scrape
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from functools import lru_cache
+
+from sqlalchemy import Engine, event
+
+# Default latency buckets for HTTP requests, in seconds
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Latency buckets for SQL statements, in seconds
+STATEMENT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# Leading SQL keyword used as the statement operation label
+_SQL_OPERATION = re.compile(r"\s*(\w+)")
+
+
+def _format_value(value: float) -> str:
+    # Whole numbers are written without a fractional part
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label_value(value: str) -> str:
+    # Backslashes, quotes and newlines are escaped as required by the text format
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names: Iterable[str], label_values: Iterable[str]) -> str:
+    # Label pairs are written inside braces, or omitted when there are none
+    pairs = [
+        f'{name}="{_escape_label_value(str(value))}"'
+        for name, value in zip(label_names, label_values)
+    ]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    # Prometheus metric type written in the TYPE line
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+        # Metric identity and label names are stored
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+
+        # A single lock guards the values of every label set
+        self._lock = threading.Lock()
+
+    def samples(self) -> list[str]:
+        # Sample lines are produced by each metric type
+        return []
+
+    def render(self) -> list[str]:
+        # HELP and TYPE lines precede the samples
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples(),
+        ]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        # Value of the label set is increased
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = list(self._values.items())
+
+        # A metric without labels is reported as 0 until it first changes
+        if not values and not self.label_names:
+            values = [((), 0.0)]
+        return [
+            f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}"
+            for label_values, value in values
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        # Value of the label set is decreased
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = REQUEST_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = buckets
+
+        # Per label set, non-cumulative bucket counts, the sum and the count are kept
+        self._values: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        # Observation is counted in the first bucket whose bound it does not exceed
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = [
+                (label_values, list(counts), total, count)
+                for label_values, (counts, total, count) in self._values.items()
+            ]
+
+        lines = []
+        bucket_labels = (*self.label_names, "le")
+        for label_values, counts, total, count in values:
+            # Bucket counts are written cumulatively, ending with +Inf
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(bucket_labels, (*label_values, le))} {cumulative}"
+                )
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    def __init__(self, name: str, documentation: str, kind: str, callback: Callable[[], float]):
+        super().__init__(name, documentation)
+        self.kind = kind
+
+        # Value is read from the callback only when metrics are scraped
+        self.callback = callback
+
+    def samples(self) -> list[str]:
+        return [f"{self.name} {_format_value(self.callback())}"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        # Metrics are rendered in registration order
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        # A metric name is registered only once
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        # Every metric is rendered in the Prometheus text format
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = [line for metric in metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+# Registry shared by the whole process
+REGISTRY = MetricsRegistry()
+
+# HTTP request metrics are registered
+HTTP_REQUESTS = REGISTRY.register(
+    Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+)
+HTTP_REQUEST_DURATION = REGISTRY.register(
+    Histogram("http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+)
+HTTP_REQUESTS_IN_PROGRESS = REGISTRY.register(
+    Gauge("http_requests_in_progress", "HTTP requests currently being served", ("method",))
+)
+
+# SQL statement metrics are registered
+# The histogram count doubles as the statement count
+DB_STATEMENT_DURATION = REGISTRY.register(
+    Histogram(
+        "db_statement_duration_seconds",
+        "SQL statement execution time by operation",
+        ("operation",),
+        STATEMENT_BUCKETS,
+    )
+)
+
+
+def register_callback(name: str, documentation: str, kind: str, callback: Callable[[], float]) -> None:
+    # Values owned by other modules are exposed without touching their hot paths
+    REGISTRY.register(CallbackMetric(name, documentation, kind, callback))
+
+
+def render_metrics() -> str:
+    # Current metrics are returned in the Prometheus text format
+    return REGISTRY.render()
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        # Wrapped ASGI application is stored
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # Only HTTP requests are measured
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        # Response status is captured as it is sent
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Streamed responses are measured until their last chunk has been sent
+            elapsed = time.perf_counter() - started
+            HTTP_REQUESTS_IN_PROGRESS.dec(method)
+
+            # Route templates are used as labels so path parameters do not create new series
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.observe(elapsed, method, route)
+            HTTP_REQUESTS.inc(method, route, str(status))
+
+
+@lru_cache(maxsize=1024)
+def statement_operation(statement: str) -> str:
+    # Leading keyword of the statement is used as its operation
+    match = _SQL_OPERATION.match(statement)
+    return match.group(1).upper() if match else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    # Start time is pushed on the connection so nested executions stay paired
+    conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    # Elapsed time of the statement is recorded by operation
+    elapsed = time.perf_counter() - conn.info["statement_started"].pop()
+    DB_STATEMENT_DURATION.observe(elapsed, statement_operation(statement))
+
+
+def _handle_error(exception_context) -> None:
+    # Start time of a failed statement is discarded
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("statement_started"):
+        connection.info["statement_started"].pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    # SQL timing hooks are attached to the engine's cursor execution events
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
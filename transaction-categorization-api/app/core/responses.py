@@ -0,0 +1,28 @@
+# Fast JSON encoding for read endpoints is defined in this file
+# orjson is used when it is installed, the standard library encoder otherwise
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+# orjson is optional and only speeds up encoding
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_json(content: Any) -> bytes:
+    # Content is encoded with orjson when available
+    if orjson is not None:
+        return orjson.dumps(content)
+
+    # Standard library output matches the default JSON response
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+# JSON response class that encodes plain content without model validation
+# Routes return it directly with already shaped dicts, so FastAPI skips response model processing
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
@@ -0,0 +1,35 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.db.session import apply_sqlite_pragmas, engine_options
+
+# Year shards are routed by the sync session layer only
+if settings.partition_dir:
+    raise RuntimeError("USE_ASYNC_DB cannot be combined with PARTITION_DIR")
+
+# Async driver URL is derived from the sync URL unless set explicitly
+async_database_url = settings.async_database_url or settings.database_url.replace(
+    "sqlite://", "sqlite+aiosqlite://", 1
+)
+
+# Async database engine is created using the aiosqlite driver
+# Connections run on the driver's own thread, so the event loop never blocks on I/O
+async_engine = create_async_engine(async_database_url, **engine_options(async_database_url))
+
+# SQLite pragmas are applied on every new connection, as for the sync engine
+if async_engine.dialect.name == "sqlite":
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+
+# Statements are timed on the underlying sync engine, as for the sync path
+if settings.metrics_enabled:
+    instrument_engine(async_engine.sync_engine)
+
+# Async session factory is created
+# Objects stay readable after commit so responses can be built from them
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
@@ -0,0 +1,382 @@
+# Versioned schema migrations are defined in this file
+# The applied version is tracked with the SQLite user_version pragma
+from collections.abc import Callable
+from typing import NamedTuple
+
+from sqlalchemy import Connection, Engine, text
+
+
+# A single schema migration is defined
+# Steps are SQL statements or callables receiving the open connection
+class Migration(NamedTuple):
+    version: int
+    description: str
+    steps: tuple[str | Callable[[Connection], None], ...]
+
+
+def _rebuild_merchant_sketches(connection: Connection) -> None:
+    # Sketches are built by the same code that rebuilds them later
+    from app.services.merchant_sketches import rebuild_merchant_sketches
+
+    rebuild_merchant_sketches(connection)
+
+
+def _backfill_archived_external_ids(connection: Connection) -> None:
+    # External ids of months archived so far are reserved by the same code that archives later months
+    from app.services.archive import backfill_archived_external_ids
+
+    backfill_archived_external_ids(connection)
+
+
+# Migrations are listed in the order they must be applied
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(
+        1,
+        "create transactions table",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS transactions (
+                id INTEGER NOT NULL PRIMARY KEY,
+                amount FLOAT NOT NULL,
+                merchant VARCHAR NOT NULL,
+                category VARCHAR NOT NULL,
+                date DATE NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_transactions_id ON transactions (id)",
+        ),
+    ),
+    Migration(
+        2,
+        "add covering index for date range summaries",
+        (
+            """
+            CREATE INDEX IF NOT EXISTS ix_transactions_date_category_amount
+            ON transactions (date, category, amount)
+            """,
+        ),
+    ),
+    Migration(
+        3,
+        "create monthly category rollup table",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS monthly_category_totals (
+                month VARCHAR NOT NULL,
+                category VARCHAR NOT NULL,
+                transaction_count INTEGER NOT NULL,
+                total_amount FLOAT NOT NULL,
+                PRIMARY KEY (month, category)
+            )
+            """,
+            "DELETE FROM monthly_category_totals",
+            """
+            INSERT INTO monthly_category_totals (month, category, transaction_count, total_amount)
+            SELECT strftime('%Y-%m', date), category, count(id), sum(amount)
+            FROM transactions
+            GROUP BY strftime('%Y-%m', date), category
+            """,
+        ),
+    ),
+    Migration(
+        4,
+        "store amounts as integer cents",
+        (
+            # Table is rebuilt because SQLite cannot change a column type in place
+            """
+            CREATE TABLE transactions_new (
+                id INTEGER NOT NULL PRIMARY KEY,
+                amount_cents INTEGER NOT NULL,
+                merchant VARCHAR NOT NULL,
+                category VARCHAR NOT NULL,
+                date DATE NOT NULL
+            )
+            """,
+            # Float amounts are rounded to the nearest cent
+            """
+            INSERT INTO transactions_new (id, amount_cents, merchant, category, date)
+            SELECT id, CAST(round(amount * 100) AS INTEGER), merchant, category, date
+            FROM transactions
+            """,
+            "DROP TABLE transactions",
+            "ALTER TABLE transactions_new RENAME TO transactions",
+            "CREATE INDEX ix_transactions_id ON transactions (id)",
+            """
+            CREATE INDEX ix_transactions_date_category_amount_cents
+            ON transactions (date, category, amount_cents)
+            """,
+            # Rollup totals are recomputed exactly from the converted rows
+            "DROP TABLE monthly_category_totals",
+            """
+            CREATE TABLE monthly_category_totals (
+                month VARCHAR NOT NULL,
+                category VARCHAR NOT NULL,
+                transaction_count INTEGER NOT NULL,
+                total_cents INTEGER NOT NULL,
+                PRIMARY KEY (month, category)
+            )
+            """,
+            """
+            INSERT INTO monthly_category_totals (month, category, transaction_count, total_cents)
+            SELECT strftime('%Y-%m', date), category, count(id), sum(amount_cents)
+            FROM transactions
+            GROUP BY strftime('%Y-%m', date), category
+            """,
+        ),
+    ),
+    Migration(
+        5,
+        "create statement import jobs table",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS import_jobs (
+                id INTEGER NOT NULL PRIMARY KEY,
+                source_path VARCHAR NOT NULL,
+                file_format VARCHAR NOT NULL,
+                status VARCHAR NOT NULL,
+                total_bytes BIGINT NOT NULL,
+                checkpoint_offset BIGINT NOT NULL,
+                rows_read INTEGER NOT NULL,
+                rows_inserted INTEGER NOT NULL,
+                rows_failed INTEGER NOT NULL,
+                error VARCHAR,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL
+            )
+            """,
+        ),
+    ),
+    Migration(
+        6,
+        "create re-categorization jobs table",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS recategorization_jobs (
+                id INTEGER NOT NULL PRIMARY KEY,
+                status VARCHAR NOT NULL,
+                target_id INTEGER NOT NULL,
+                total_rows INTEGER NOT NULL,
+                checkpoint_id INTEGER NOT NULL,
+                rows_scanned INTEGER NOT NULL,
+                rows_changed INTEGER NOT NULL,
+                elapsed_seconds FLOAT NOT NULL,
+                error VARCHAR,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL
+            )
+            """,
+        ),
+    ),
+    Migration(
+        7,
+        "track the shard of re-categorization checkpoints",
+        (
+            """
+            ALTER TABLE recategorization_jobs
+            ADD COLUMN checkpoint_year INTEGER NOT NULL DEFAULT 0
+            """,
+        ),
+    ),
+    Migration(
+        8,
+        "create monthly merchant sketch tables",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS monthly_top_merchants (
+                month VARCHAR NOT NULL PRIMARY KEY,
+                transaction_count INTEGER NOT NULL,
+                floor_count INTEGER NOT NULL,
+                counters TEXT NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS monthly_merchant_sketches (
+                month VARCHAR NOT NULL,
+                category VARCHAR NOT NULL,
+                registers BLOB NOT NULL,
+                PRIMARY KEY (month, category)
+            )
+            """,
+        ),
+    ),
+    Migration(
+        9,
+        "add unique external ids to transactions",
+        (
+            # Existing rows get no external id, so the column is added without rewriting the table
+            "ALTER TABLE transactions ADD COLUMN external_id VARCHAR",
+            # Only rows with an external id are indexed, so rows without one cost nothing extra
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS ix_transactions_external_id
+            ON transactions (external_id) WHERE external_id IS NOT NULL
+            """,
+            "ALTER TABLE import_jobs ADD COLUMN rows_duplicate INTEGER NOT NULL DEFAULT 0",
+        ),
+    ),
+    Migration(
+        10,
+        "record the rules version that categorized each transaction",
+        (
+            # Rows categorized before rules were versioned keep no version
+            "ALTER TABLE transactions ADD COLUMN rules_version VARCHAR",
+        ),
+    ),
+    Migration(
+        11,
+        "add a change sequence and tombstones for the change feed",
+        (
+            # Existing rows are numbered in insertion order, so a feed read from 0 returns every stored row
+            "ALTER TABLE transactions ADD COLUMN change_seq INTEGER",
+            "UPDATE transactions SET change_seq = id",
+            "CREATE INDEX IF NOT EXISTS ix_transactions_change_seq ON transactions (change_seq)",
+            """
+            CREATE TABLE IF NOT EXISTS transaction_tombstones (
+                change_seq INTEGER PRIMARY KEY,
+                transaction_id INTEGER NOT NULL,
+                date DATE NOT NULL
+            )
+            """,
+            # New changes are numbered after the existing rows
+            """
+            CREATE TABLE IF NOT EXISTS change_sequence (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                value INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+            "INSERT OR IGNORE INTO change_sequence (id, value) SELECT 1, coalesce(max(id), 0) FROM transactions",
+        ),
+    ),
+    Migration(
+        12,
+        "add the archive segment catalog",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS archive_segments (
+                id INTEGER PRIMARY KEY,
+                month VARCHAR NOT NULL,
+                file_name VARCHAR NOT NULL,
+                row_count INTEGER NOT NULL,
+                max_id INTEGER NOT NULL,
+                file_size INTEGER NOT NULL,
+                category_totals TEXT NOT NULL DEFAULT '{}'
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_archive_segments_month ON archive_segments (month)",
+        ),
+    ),
+    Migration(
+        13,
+        "add a (date, id) index for keyset pages",
+        (
+            # Pages are read in (date, id) order straight from this index, without sorting a temporary b-tree
+            "CREATE INDEX IF NOT EXISTS ix_transactions_date_id ON transactions (date, id)",
+        ),
+    ),
+    Migration(
+        14,
+        "record what assigned each transaction's category",
+        (
+            # Rows categorized before sources were recorded keep no source
+            "ALTER TABLE transactions ADD COLUMN category_source VARCHAR",
+        ),
+    ),
+    Migration(
+        15,
+        "keep the external ids of archived transactions unique",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS archived_external_ids (
+                external_id VARCHAR NOT NULL PRIMARY KEY,
+                transaction_id INTEGER NOT NULL,
+                amount_cents INTEGER NOT NULL,
+                merchant VARCHAR NOT NULL,
+                category VARCHAR NOT NULL,
+                date DATE NOT NULL,
+                rules_version VARCHAR
+            )
+            """,
+            _backfill_archived_external_ids,
+        ),
+    ),
+    Migration(
+        16,
+        "store top merchant counters one row each",
+        (
+            # Counters are updated in place, so an insert no longer rewrites every counter of its month
+            """
+            CREATE TABLE IF NOT EXISTS monthly_top_merchant_counters (
+                month VARCHAR NOT NULL,
+                merchant VARCHAR NOT NULL,
+                count INTEGER NOT NULL,
+                error INTEGER NOT NULL,
+                PRIMARY KEY (month, merchant)
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_monthly_top_merchant_counters_month_count
+            ON monthly_top_merchant_counters (month, count)
+            """,
+            "ALTER TABLE monthly_top_merchants DROP COLUMN counters",
+            # Sketches of the existing and archived rows are built from one grouped scan
+            _rebuild_merchant_sketches,
+        ),
+    ),
+)
+
+
+
+def current_version(connection: Connection) -> int:
+    # Applied schema version is read from the database header
+    return connection.execute(text("PRAGMA user_version")).scalar_one()
+
+
+class SchemaOutdated(RuntimeError):
+    # Raised when the database has not been migrated to the version the code expects
+    pass
+
+
+def latest_version() -> int:
+    # Version the application code expects is that of the last migration
+    return MIGRATIONS[-1].version
+
+
+def run_migrations(engine: Engine) -> int:
+    with engine.connect() as connection:
+        # Write lock is taken before the applied version is read
+        # Processes migrating at the same time run one after another, and later ones find nothing to do
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+        # Only migrations newer than the applied version are run
+        version = current_version(connection)
+        for migration in MIGRATIONS:
+            if migration.version <= version:
+                continue
+
+            # Each step is executed inside the same transaction
+            for step in migration.steps:
+                if callable(step):
+                    step(connection)
+                else:
+                    connection.execute(text(step))
+
+            # Applied version is recorded with the migration
+            connection.execute(text(f"PRAGMA user_version = {migration.version}"))
+            version = migration.version
+
+        # Every applied migration is committed at once
+        connection.commit()
+
+    # Final schema version is returned
+    return version
+
+
+def check_schema_version(engine: Engine) -> int:
+    # Applied version is compared with the latest migration without changing anything
+    with engine.connect() as connection:
+        version = current_version(connection)
+    if version < latest_version():
+        raise SchemaOutdated(
+            f"Database schema is at version {version} but version {latest_version()} is required; "
+            "run python -m scripts.migrate"
+        )
+    return version
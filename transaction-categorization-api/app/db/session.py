@@ -1,19 +1,99 @@
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.db.shards import PartitionedSession, ShardRouter
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    # Configured pragmas are applied once per new DBAPI connection
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode = {settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous = {settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA cache_size = {int(settings.sqlite_cache_size)}")
+        cursor.execute(f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}")
+    finally:
+        cursor.close()
+
+
+def apply_readonly_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    # Read-only shards keep their journal mode, only cache and lock settings are applied
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA query_only = ON")
+        cursor.execute(f"PRAGMA cache_size = {int(settings.sqlite_cache_size)}")
+        cursor.execute(f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}")
+    finally:
+        cursor.close()
+
+
+def engine_options(database_url: str) -> dict:
+    # In-memory databases use a single shared connection and take no pool limits
+    if ":memory:" in database_url or database_url.rstrip("/").endswith("sqlite:"):
+        return {}
+
+    # File databases get the configured pool limits
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+    }
+
 
 # Database engine is created using the configured database URL
 # The engine manages connections to the database file
 engine = create_engine(
     settings.database_url,
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False},
+    **engine_options(settings.database_url),
+)
+
+# SQLite pragmas are applied on every new connection
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+
+# Statement counts and durations are recorded when metrics are enabled
+if settings.metrics_enabled:
+    instrument_engine(engine)
+
+
+def create_shard_engine(path: str, readonly: bool = False) -> Engine:
+    # Read-only shards are opened through a URI, so SQLite refuses every write
+    url = f"sqlite:///file:{path}?mode=ro&uri=true" if readonly else f"sqlite:///{path}"
+    shard_engine = create_engine(url, connect_args={"check_same_thread": False}, **engine_options(url))
+
+    # Shards get the same pragmas and metrics as the main database
+    event.listen(shard_engine, "connect", apply_readonly_sqlite_pragmas if readonly else apply_sqlite_pragmas)
+    if settings.metrics_enabled:
+        instrument_engine(shard_engine)
+    return shard_engine
+
+
+# Year shards are routed when a partition directory is configured
+# The main database then keeps only job tables, transactions and rollups live in the shards
+shard_router = (
+    ShardRouter(settings.partition_dir, create_shard_engine, settings.partition_readonly_before)
+    if settings.partition_dir
+    else None
 )
 
 # Session factory is created
 # Each session represents a single database conversation
-SessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=engine
-)
+if shard_router is not None:
+    SessionLocal = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=engine,
+        class_=PartitionedSession,
+        router=shard_router,
+    )
+else:
+    SessionLocal = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=engine
+    )
@@ -0,0 +1,192 @@
+# Time-partitioned storage is defined in this file
+# Transactions and their monthly rollups are kept in one SQLite file per year when partitioning is enabled
+import os
+import re
+import threading
+from collections.abc import Callable
+
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
+
+from app.db.migrations import run_migrations
+
+# Ids written to a year's shard start above year * ID_BLOCK
+# Ids therefore stay unique across shards and the year of a new id is id // ID_BLOCK
+ID_BLOCK = 10**10
+
+# Shard files are named after the year they hold
+SHARD_FILE_PATTERN = re.compile(r"^transactions-(\d{4})\.db$")
+
+
+class ShardReadOnly(Exception):
+    # Raised when rows are written to a year whose shard is opened read-only
+    pass
+
+
+def shard_path(directory: str, year: int) -> str:
+    # Path of the shard file holding the given year
+    return os.path.join(directory, f"transactions-{year}.db")
+
+
+class ShardRouter:
+    def __init__(
+        self,
+        directory: str,
+        engine_factory: Callable[[str, bool], Engine],
+        readonly_before: int = 0,
+    ):
+        # Shard location, engine factory and read-only boundary are stored
+        self.directory = directory
+        self.engine_factory = engine_factory
+        self.readonly_before = readonly_before
+
+        # One engine per shard is created on first use and kept for the process lifetime
+        self._engines: dict[int, Engine] = {}
+        self._lock = threading.Lock()
+
+    def is_writable(self, year: int) -> bool:
+        # Years before the boundary are served read-only
+        return year >= self.readonly_before
+
+    def years(self, first_year: int | None = None, last_year: int | None = None) -> list[int]:
+        # Existing shard files within the bounds are listed in year order
+        # The directory is listed on every call, so shards created by other processes are found
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        years = sorted(int(match.group(1)) for match in map(SHARD_FILE_PATTERN.match, names) if match)
+        return [
+            year
+            for year in years
+            if (first_year is None or year >= first_year) and (last_year is None or year <= last_year)
+        ]
+
+    def engine(self, year: int, create: bool = False) -> Engine | None:
+        # Engines that already exist are returned without locking
+        engine = self._engines.get(year)
+        if engine is not None:
+            return engine
+
+        with self._lock:
+            engine = self._engines.get(year)
+            if engine is not None:
+                return engine
+
+            path = shard_path(self.directory, year)
+            if not os.path.exists(path):
+                # Missing shards are only created for writes
+                if not create:
+                    return None
+                if not self.is_writable(year):
+                    raise ShardReadOnly(f"Shard for {year} is read-only")
+
+                # A new shard receives the full schema before it is used
+                os.makedirs(self.directory, exist_ok=True)
+                engine = self.engine_factory(path, False)
+                run_migrations(engine)
+            else:
+                engine = self.engine_factory(path, not self.is_writable(year))
+
+            self._engines[year] = engine
+            return engine
+
+    def dispose(self) -> None:
+        # Pooled connections of every opened shard are closed
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+
+
+# Session on the main database that opens one session per year shard on demand
+# Shards are committed before the main database, so job checkpoints never run ahead of their rows
+# Each shard commits on its own: rows and rollups of a year are atomic, a write spanning years is not
+class PartitionedSession(Session):
+    def __init__(self, *args, router: ShardRouter, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.router = router
+        self.shard_sessions: dict[int, Session] = {}
+
+    def shard(self, year: int, write: bool = False) -> Session | None:
+        # Writes to years served read-only are refused
+        if write and not self.router.is_writable(year):
+            raise ShardReadOnly(f"Transactions dated {year} are archived in a read-only shard")
+
+        # One session per shard is opened and reused for the life of this session
+        session = self.shard_sessions.get(year)
+        if session is None:
+            engine = self.router.engine(year, create=write)
+            if engine is None:
+                return None
+            session = Session(bind=engine, autoflush=False)
+            self.shard_sessions[year] = session
+        return session
+
+    def commit(self) -> None:
+        # Shards are committed in year order, the main database last
+        for year in sorted(self.shard_sessions):
+            self.shard_sessions[year].commit()
+        super().commit()
+
+    def rollback(self) -> None:
+        # Every open shard transaction is discarded with the main one
+        for session in self.shard_sessions.values():
+            session.rollback()
+        super().rollback()
+
+    def close(self) -> None:
+        # Shard sessions are closed with the main session
+        for session in self.shard_sessions.values():
+            session.close()
+        self.shard_sessions.clear()
+        super().close()
+
+
+def is_partitioned(db: Session) -> bool:
+    # Sessions from a partitioned session factory route transactions to year shards
+    return isinstance(db, PartitionedSession)
+
+
+def is_year_writable(db: Session, year: int) -> bool:
+    # Every year is writable when partitioning is disabled
+    return not is_partitioned(db) or db.router.is_writable(year)
+
+
+def shard_sessions(
+    db: Session,
+    first_year: int | None = None,
+    last_year: int | None = None,
+) -> list[tuple[int, Session]]:
+    # Without partitioning the database itself is the only shard, reported as year 0
+    if not is_partitioned(db):
+        return [(0, db)]
+
+    # Only the shards within the requested years are opened, in year order
+    return [(year, db.shard(year)) for year in db.router.years(first_year, last_year)]
+
+
+def write_session(db: Session, year: int) -> Session:
+    # Rows of a year are written to its shard, or to the database itself without partitioning
+    if not is_partitioned(db):
+        return db
+    return db.shard(year, write=True)
+
+
+def begin_write(session: Session) -> None:
+    # The write lock is taken before anything is read, unless the transaction already holds it
+    # Writers in other processes wait for the commit, so what is read stays true until then
+    connection = session.connection()
+    if not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def reserve_shard_ids(session: Session, year: int) -> int:
+    # The shard's write lock is taken before its largest id is read, so no id is handed out twice
+    begin_write(session)
+
+    # New ids continue after the largest id, starting at the year's id block
+    # Archived rows left the table, so the largest id of the archive catalog is counted as well
+    connection = session.connection()
+    last_id = connection.exec_driver_sql("SELECT max(id) FROM transactions").scalar()
+    last_archived_id = connection.exec_driver_sql("SELECT max(max_id) FROM archive_segments").scalar()
+    return max(last_id or 0, last_archived_id or 0, year * ID_BLOCK) + 1
@@ -1,26 +1,89 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 
+from app.api.routes.analytics import router as analytics_router
 from app.api.routes.health import router as health_router
+from app.api.routes.imports import router as imports_router
+from app.api.routes.metrics import router as metrics_router
+from app.api.routes.recategorizations import router as recategorizations_router
 from app.api.routes.transactions import router as transactions_router
-from app.db.base import Base
-from app.db.session import engine
+from app.core.config import settings
+from app.core.metrics import MetricsMiddleware
+from app.db.session import engine, shard_router
+from app.services.rules_watcher import rules_watcher
+from app.services.warmup import warm_async_pool, warm_up
+from app.services.write_behind import write_behind
+
+
+# Worker startup and shutdown are defined
+# Schema changes are applied beforehand with python -m scripts.migrate, never here
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Schema version is checked and pools and caches are warmed off the event loop
+    await run_in_threadpool(warm_up)
+    if settings.use_async_db:
+        await warm_async_pool(settings.db_pool_size)
+
+    # Rules file is watched, so changed rules are swapped in without restarting the worker
+    rules_watcher.start()
+
+    yield
+
+    # Rules file is no longer watched
+    await run_in_threadpool(rules_watcher.stop, settings.rules_reload_interval_s)
+
+    # Queued single-row creates are committed before the worker exits
+    await run_in_threadpool(write_behind.stop, settings.write_behind_commit_timeout_s)
+
+    # Pooled connections are closed
+    engine.dispose()
+    if shard_router is not None:
+        shard_router.dispose()
+    if settings.use_async_db:
+        from app.db.async_session import async_engine
+
+        await async_engine.dispose()
+
 
 # FastAPI application instance is created
 app = FastAPI(
     title="Transaction Categorization API",
     description="Backend service for categorizing and summarizing financial transactions",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
 )
 
-# Database tables are created if they do not already exist
-Base.metadata.create_all(bind=engine)
+# Request latency and in-flight counts are measured for every request
+# The metrics endpoint is served only when collection is enabled
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
 
 # Health routes are registered
 app.include_router(health_router)
 
+# Async transaction routes are registered first when enabled
+# They take precedence over the sync routes with the same path and method
+if settings.use_async_db:
+    from app.api.routes.transactions_async import router as async_transactions_router
+
+    app.include_router(async_transactions_router)
+
 # Transaction routes are registered
 app.include_router(transactions_router)
 
+# Statement import routes are registered
+app.include_router(imports_router)
+
+# Re-categorization routes are registered
+app.include_router(recategorizations_router)
+
+# Approximate analytics routes are registered
+app.include_router(analytics_router)
+
 
 # Root endpoint is defined
 @app.get("/")
@@ -0,0 +1,55 @@
+from sqlalchemy import Column, Date, Index, Integer, String, Text
+
+from app.db.base import Base
+
+# Archive segment catalog table definition is declared
+# One row describes a compressed segment file holding archived transactions of one month
+class ArchiveSegment(Base):
+    # Table name is defined
+    __tablename__ = "archive_segments"
+
+    # Segment number is stored, segments are never rewritten once catalogued
+    id = Column(Integer, primary_key=True)
+
+    # Month key in YYYY-MM form is stored
+    month = Column(String, nullable=False)
+
+    # Segment file name inside the archive directory is stored
+    file_name = Column(String, nullable=False)
+
+    # Number of archived transactions is stored
+    row_count = Column(Integer, nullable=False)
+
+    # Largest archived id is stored, new rows are numbered after it
+    max_id = Column(Integer, nullable=False)
+
+    # Size of the compressed segment file is stored
+    file_size = Column(Integer, nullable=False)
+
+    # Count and cent total per category are stored as a JSON object mapping the category to [count, cents]
+    # Rollups rebuilt from raw rows add these, since the rows are no longer in the transactions table
+    category_totals = Column(Text, nullable=False, default="{}")
+
+    # Segments of a month range are found without scanning the catalog
+    __table_args__ = (Index("ix_archive_segments_month", "month"),)
+
+
+# Archived external id table definition is declared
+# Archived rows leave the transactions table, so their external ids stay reserved here
+class ArchivedExternalId(Base):
+    # Table name is defined
+    __tablename__ = "archived_external_ids"
+
+    # External id of the archived transaction is stored, unique like the transactions index
+    external_id = Column(String, primary_key=True)
+
+    # Id of the archived transaction is stored
+    transaction_id = Column(Integer, nullable=False)
+
+    # Fields a retried row is compared with and answered with are stored
+    # Replays are therefore answered without opening segment files
+    amount_cents = Column(Integer, nullable=False)
+    merchant = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
+    rules_version = Column(String, nullable=True)
@@ -0,0 +1,33 @@
+from sqlalchemy import CheckConstraint, Column, Date, Integer
+
+from app.db.base import Base
+
+# Change sequence table definition is declared
+# Its single row holds the last change number handed out to an insert, re-categorization or delete
+class ChangeSequence(Base):
+    # Table name is defined
+    __tablename__ = "change_sequence"
+
+    # Only one row ever exists
+    id = Column(Integer, primary_key=True)
+
+    # Last change number handed out is stored
+    value = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (CheckConstraint("id = 1"),)
+
+
+# Transaction tombstone table definition is declared
+# One row records a deleted transaction, so change feed clients learn about the delete
+class TransactionTombstone(Base):
+    # Table name is defined
+    __tablename__ = "transaction_tombstones"
+
+    # Change number of the delete is stored
+    change_seq = Column(Integer, primary_key=True)
+
+    # Id of the deleted transaction is stored
+    transaction_id = Column(Integer, nullable=False)
+
+    # Date of the deleted transaction is stored, so tombstones follow their rows into year shards
+    date = Column(Date, nullable=False)
@@ -0,0 +1,54 @@
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String, func
+
+from app.db.base import Base
+
+# Statement import job table definition is declared
+# One row tracks the progress and checkpoint of a single statement file import
+class ImportJob(Base):
+    # Table name is defined
+    __tablename__ = "import_jobs"
+
+    # Primary key column is defined
+    id = Column(Integer, primary_key=True)
+
+    # Path of the statement file being imported is stored
+    source_path = Column(String, nullable=False)
+
+    # Statement file format is stored
+    file_format = Column(String, nullable=False)
+
+    # Job status is stored
+    status = Column(String, nullable=False, default="pending")
+
+    # Size of the statement file in bytes is stored
+    total_bytes = Column(BigInteger, nullable=False, default=0)
+
+    # Byte offset just after the last committed record is stored
+    # A resumed import continues reading from this position
+    checkpoint_offset = Column(BigInteger, nullable=False, default=0)
+
+    # Number of records read up to the checkpoint is stored
+    rows_read = Column(Integer, nullable=False, default=0)
+
+    # Number of stored transactions is stored
+    rows_inserted = Column(Integer, nullable=False, default=0)
+
+    # Number of rejected records is stored
+    rows_failed = Column(Integer, nullable=False, default=0)
+
+    # Number of records already stored under the same external id is stored
+    rows_duplicate = Column(Integer, nullable=False, default=0)
+
+    # Error that stopped the import is stored
+    error = Column(String, nullable=True)
+
+    # Creation time is stored
+    created_at = Column(DateTime, nullable=False, server_default=func.current_timestamp())
+
+    # Time of the last checkpoint is stored
+    updated_at = Column(DateTime, nullable=False, server_default=func.current_timestamp())
+
+    # Share of the file imported so far is exposed as a fraction
+    @property
+    def progress(self) -> float:
+        return self.checkpoint_offset / self.total_bytes if self.total_bytes else 1.0
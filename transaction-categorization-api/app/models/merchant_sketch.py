@@ -0,0 +1,55 @@
+from sqlalchemy import Column, Index, Integer, LargeBinary, String
+
+from app.db.base import Base
+
+# Monthly top merchant sketch table definition is declared
+# One row holds the totals of a month's space-saving sketch, its counters are stored one row each
+class MonthlyTopMerchants(Base):
+    # Table name is defined
+    __tablename__ = "monthly_top_merchants"
+
+    # Month key in YYYY-MM form is stored
+    month = Column(String, primary_key=True)
+
+    # Number of transactions counted by the sketch is stored
+    transaction_count = Column(Integer, nullable=False, default=0)
+
+    # Largest count evicted from the sketch is stored
+    # Merchants without a counter occurred at most this often
+    floor_count = Column(Integer, nullable=False, default=0)
+
+
+# Monthly top merchant counter table definition is declared
+# One row holds the counter of a merchant tracked by a month's space-saving sketch
+class MonthlyTopMerchantCounter(Base):
+    # Table name is defined
+    __tablename__ = "monthly_top_merchant_counters"
+
+    # Month key in YYYY-MM form is stored
+    month = Column(String, primary_key=True)
+
+    # Normalized merchant name is stored
+    merchant = Column(String, primary_key=True)
+
+    # Counted occurrences are stored with the part of them that may be over-counted
+    count = Column(Integer, nullable=False)
+    error = Column(Integer, nullable=False)
+
+    # The smallest counters of a month are read in count order when merchants are evicted
+    __table_args__ = (Index("ix_monthly_top_merchant_counters_month_count", "month", "count"),)
+
+
+# Monthly distinct merchant sketch table definition is declared
+# One row holds the HyperLogLog registers of the merchants of a category within a month
+class MonthlyMerchantSketch(Base):
+    # Table name is defined
+    __tablename__ = "monthly_merchant_sketches"
+
+    # Month key in YYYY-MM form is stored
+    month = Column(String, primary_key=True)
+
+    # Category label is stored
+    category = Column(String, primary_key=True)
+
+    # HyperLogLog registers are stored as raw bytes
+    registers = Column(LargeBinary, nullable=False)
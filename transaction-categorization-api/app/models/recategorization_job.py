@@ -0,0 +1,58 @@
+from sqlalchemy import Column, DateTime, Float, Integer, String, func
+
+from app.db.base import Base
+
+# Re-categorization job table definition is declared
+# One row tracks the progress and checkpoint of a single pass over the transactions table
+class RecategorizationJob(Base):
+    # Table name is defined
+    __tablename__ = "recategorization_jobs"
+
+    # Primary key column is defined
+    id = Column(Integer, primary_key=True)
+
+    # Job status is stored
+    status = Column(String, nullable=False, default="pending")
+
+    # Highest transaction id when the job was created is stored
+    # Rows inserted later are already categorized with the current rules
+    target_id = Column(Integer, nullable=False, default=0)
+
+    # Number of rows up to the target id is stored
+    total_rows = Column(Integer, nullable=False, default=0)
+
+    # Year shard of the last committed chunk is stored, 0 without partitioning
+    # Shards are walked in year order, each one in id order
+    checkpoint_year = Column(Integer, nullable=False, default=0)
+
+    # Id of the last row of the last committed chunk is stored
+    # A resumed job continues after this id
+    checkpoint_id = Column(Integer, nullable=False, default=0)
+
+    # Number of rows categorized up to the checkpoint is stored
+    rows_scanned = Column(Integer, nullable=False, default=0)
+
+    # Number of rows whose category was rewritten is stored
+    rows_changed = Column(Integer, nullable=False, default=0)
+
+    # Seconds spent processing chunks across every run of the job are stored
+    elapsed_seconds = Column(Float, nullable=False, default=0.0)
+
+    # Error that stopped the job is stored
+    error = Column(String, nullable=True)
+
+    # Creation time is stored
+    created_at = Column(DateTime, nullable=False, server_default=func.current_timestamp())
+
+    # Time of the last checkpoint is stored
+    updated_at = Column(DateTime, nullable=False, server_default=func.current_timestamp())
+
+    # Share of the rows processed so far is exposed as a fraction
+    @property
+    def progress(self) -> float:
+        return min(self.rows_scanned / self.total_rows, 1.0) if self.total_rows else 1.0
+
+    # Processing rate is exposed in rows per second
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_scanned / self.elapsed_seconds if self.elapsed_seconds else 0.0
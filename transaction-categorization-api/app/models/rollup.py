@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String
+
+from app.db.base import Base
+
+# Monthly rollup table definition is declared
+# One row holds the running totals of a category within a month
+class MonthlyCategoryTotal(Base):
+    # Table name is defined
+    __tablename__ = "monthly_category_totals"
+
+    # Month key in YYYY-MM form is stored
+    month = Column(String, primary_key=True)
+
+    # Category label is stored
+    category = Column(String, primary_key=True)
+
+    # Number of transactions is stored
+    transaction_count = Column(Integer, nullable=False, default=0)
+
+    # Sum of transaction amounts is stored in integer cents
+    total_cents = Column(Integer, nullable=False, default=0)
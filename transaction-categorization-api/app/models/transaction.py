@@ -1,6 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, Date
+from decimal import Decimal
+
+from sqlalchemy import Column, Integer, String, Date, Index
 
 from app.db.base import Base
+from app.services.money import from_cents
 
 # Transaction table definition is declared
 # Each class attribute maps to a database column
@@ -11,8 +14,8 @@ class Transaction(Base):
     # Primary key column is defined
     id = Column(Integer, primary_key=True, index=True)
 
-    # Transaction amount is stored
-    amount = Column(Float, nullable=False)
+    # Transaction amount is stored in integer cents
+    amount_cents = Column(Integer, nullable=False)
 
     # Merchant name is stored
     merchant = Column(String, nullable=False)
@@ -22,3 +25,35 @@ class Transaction(Base):
 
     # Transaction date is stored
     date = Column(Date, nullable=False)
+
+    # Upstream identifier or idempotency key is stored when one was given
+    external_id = Column(String, nullable=True)
+
+    # Version of the categorization rules that assigned the category
+    rules_version = Column(String, nullable=True)
+
+    # What assigned the category: a rule, the fallback model or the default, unknown for older rows
+    category_source = Column(String, nullable=True)
+
+    # Change number of the last insert or re-categorization of the row
+    change_seq = Column(Integer, nullable=True)
+
+    # Covering index lets date range summaries skip the table entirely
+    # Keyset pages walk the (date, id) index in order, so no page is sorted
+    # Partial unique index keeps external ids unique and only holds rows that have one
+    __table_args__ = (
+        Index("ix_transactions_date_category_amount_cents", "date", "category", "amount_cents"),
+        Index("ix_transactions_date_id", "date", "id"),
+        Index(
+            "ix_transactions_external_id",
+            "external_id",
+            unique=True,
+            sqlite_where=external_id.isnot(None),
+        ),
+        Index("ix_transactions_change_seq", "change_seq"),
+    )
+
+    # Transaction amount is exposed as an exact decimal
+    @property
+    def amount(self) -> Decimal:
+        return from_cents(self.amount_cents)
@@ -0,0 +1,67 @@
+from pydantic import BaseModel
+
+# Schema for a single merchant of the top merchant list is defined
+class TopMerchant(BaseModel):
+    # Normalized merchant name is returned
+    merchant: str
+
+    # Estimated transaction count is returned
+    # The sketch never underestimates, so this is also the upper bound
+    count: int
+
+    # Smallest transaction count the sketch guarantees is returned
+    count_lower_bound: int
+
+    # Whether the merchant is certainly among the top merchants is returned
+    guaranteed: bool
+
+
+# Schema for the approximate top merchants of a month range is defined
+class TopMerchants(BaseModel):
+    # First month of the range is returned
+    start: str
+
+    # Last month of the range is returned
+    end: str
+
+    # Number of transactions in the range is returned
+    transaction_count: int
+
+    # Largest count any merchant missing from the list can have is returned
+    untracked_max_count: int
+
+    # Merchants are returned by decreasing estimated count
+    merchants: list[TopMerchant]
+
+
+# Schema for an approximate distinct count is defined
+class DistinctCount(BaseModel):
+    # Estimated number of distinct merchants is returned
+    estimate: int
+
+    # Lower end of the confidence interval is returned
+    lower_bound: int
+
+    # Upper end of the confidence interval is returned
+    upper_bound: int
+
+
+# Schema for the approximate distinct merchants of a month range is defined
+class DistinctMerchants(BaseModel):
+    # First month of the range is returned
+    start: str
+
+    # Last month of the range is returned
+    end: str
+
+    # Relative standard error of every estimate is returned
+    relative_standard_error: float
+
+    # Confidence level of the reported intervals is returned
+    confidence: float
+
+    # Distinct merchants across all categories are returned
+    distinct_merchants: DistinctCount
+
+    # Distinct merchants per category are returned
+    by_category: dict[str, DistinctCount]
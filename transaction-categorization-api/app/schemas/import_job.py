@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+# Schema for returning a statement import job is defined
+# This schema reports the progress of an import
+class ImportJobRead(BaseModel):
+    # Unique identifier is returned
+    id: int
+
+    # Statement file format is returned
+    file_format: str
+
+    # Job status is returned
+    status: str
+
+    # Size of the statement file in bytes is returned
+    total_bytes: int
+
+    # Byte offset of the last committed checkpoint is returned
+    checkpoint_offset: int
+
+    # Fraction of the file imported so far is returned
+    progress: float
+
+    # Number of records read is returned
+    rows_read: int
+
+    # Number of stored transactions is returned
+    rows_inserted: int
+
+    # Number of rejected records is returned
+    rows_failed: int
+
+    # Number of records already stored under the same external id is returned
+    rows_duplicate: int
+
+    # Error that stopped the import is returned
+    error: str | None = None
+
+    # Creation time is returned
+    created_at: datetime
+
+    # Time of the last checkpoint is returned
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
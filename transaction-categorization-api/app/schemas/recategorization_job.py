@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+# Schema for returning a re-categorization job is defined
+# This schema reports the progress and throughput of a job
+class RecategorizationJobRead(BaseModel):
+    # Unique identifier is returned
+    id: int
+
+    # Job status is returned
+    status: str
+
+    # Highest transaction id covered by the job is returned
+    target_id: int
+
+    # Number of rows covered by the job is returned
+    total_rows: int
+
+    # Year shard of the last committed row is returned, 0 without partitioning
+    checkpoint_year: int
+
+    # Id of the last committed row is returned
+    checkpoint_id: int
+
+    # Fraction of the rows processed so far is returned
+    progress: float
+
+    # Number of rows categorized is returned
+    rows_scanned: int
+
+    # Number of rows whose category changed is returned
+    rows_changed: int
+
+    # Processing rate in rows per second is returned
+    rows_per_second: float
+
+    # Error that stopped the job is returned
+    error: str | None = None
+
+    # Creation time is returned
+    created_at: datetime
+
+    # Time of the last checkpoint is returned
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
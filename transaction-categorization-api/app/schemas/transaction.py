@@ -1,11 +1,26 @@
 from datetime import date
-from pydantic import BaseModel
+from decimal import Decimal
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field, PlainSerializer
+
+# Money amount is defined
+# Amounts are exact decimals with at most two places and are written to JSON as numbers
+Money = Annotated[
+    Decimal,
+    Field(max_digits=15, decimal_places=2),
+    PlainSerializer(float, return_type=float, when_used="json"),
+]
+
+# Upstream identifier of a transaction is defined
+# At most one stored transaction carries a given external id
+ExternalId = Annotated[str, Field(min_length=1, max_length=255)]
 
 # Schema for creating a transaction is defined
 # This schema validates incoming request data
 class TransactionCreate(BaseModel):
     # Transaction amount is provided
-    amount: float
+    amount: Money
 
     # Merchant name is provided
     merchant: str
@@ -13,6 +28,10 @@ class TransactionCreate(BaseModel):
     # Transaction date is provided
     date: date
 
+    # Upstream identifier is optionally provided
+    # A row repeating a stored external id is answered with the stored transaction
+    external_id: ExternalId | None = None
+
 
 # Schema for returning a transaction is defined
 # This schema controls response formatting
@@ -21,7 +40,7 @@ class TransactionRead(BaseModel):
     id: int
 
     # Transaction amount is returned
-    amount: float
+    amount: Money
 
     # Merchant name is returned
     merchant: str
@@ -36,6 +55,15 @@ class TransactionRead(BaseModel):
        
          from_attributes = True
 
+
+# Schema for returning a created transaction is defined
+class TransactionCreated(TransactionRead):
+    # Upstream identifier or idempotency key is returned when one was given
+    external_id: str | None = None
+
+    # Version of the rules that categorized the transaction is returned
+    rules_version: str | None = None
+
 # Schema for monthly summary response is defined
 class MonthlySummary(BaseModel):
     # Month string is returned
@@ -45,8 +73,107 @@ class MonthlySummary(BaseModel):
     transaction_count: int
 
     # Overall total is returned
-    overall_total: float
+    overall_total: Money
 
     # Totals by category are returned
-    totals_by_category: dict[str, float]
+    totals_by_category: dict[str, Money]
+
+
+# Schema for a single bulk ingest row outcome is defined
+class BulkRowResult(BaseModel):
+    # Position of the row in the submitted payload is returned
+    index: int
+
+    # Identifier of the stored transaction is returned on success
+    id: int | None = None
+
+    # Category assigned to the stored transaction is returned on success
+    category: str | None = None
+
+    # Error message is returned when the row was rejected
+    error: str | None = None
+
+    # Whether the row repeated a stored external id and was not inserted again is returned
+    duplicate: bool = False
+
+
+# Schema for the bulk ingest response is defined
+class BulkIngestResult(BaseModel):
+    # Number of stored rows is returned
+    inserted: int
+
+    # Number of rejected rows is returned
+    failed: int
+
+    # Number of rows answered with an already stored transaction is returned
+    duplicates: int = 0
+
+    # Per-row outcomes are returned in submission order
+    results: list[BulkRowResult]
+
+
+# Schema for a multi-month summary response is defined
+# Values are laid out in columns aligned with the months array
+class MonthlyRangeSummary(BaseModel):
+    # Months covered by the summary are returned in order
+    months: list[str]
+
+    # Transaction count per month is returned
+    transaction_counts: list[int]
+
+    # Overall total per month is returned
+    overall_totals: list[Money]
+
+    # One totals array per category is returned
+    totals_by_category: dict[str, list[Money]]
+
+    # Year over year deltas per category are returned when requested
+    # A null entry means the same month of the prior year has no data
+    yoy_deltas_by_category: dict[str, list[Money | None]] | None = None
+
+
+# Optional transaction date, named apart from the field that shadows the type
+OptionalDate = date | None
+
+
+# Schema for a single change of the change feed is defined
+# Deletes carry only the id of the removed transaction
+class TransactionChange(BaseModel):
+    # Change number is returned
+    seq: int
+
+    # Kind of change is returned, an upsert replaces the client's copy of the row
+    operation: Literal["upsert", "delete"]
+
+    # Transaction id is returned
+    id: int
+
+    # Transaction amount is returned for upserts
+    amount: Money | None = None
+
+    # Merchant name is returned for upserts
+    merchant: str | None = None
+
+    # Current category label is returned for upserts
+    category: str | None = None
+
+    # Transaction date is returned for upserts
+    date: OptionalDate = None
+
+    # Upstream identifier is returned for upserts when one was given
+    external_id: str | None = None
+
+    # Version of the rules that categorized the transaction is returned for upserts
+    rules_version: str | None = None
+
+
+# Schema for a page of the change feed is defined
+class TransactionChanges(BaseModel):
+    # Changes are returned in change number order
+    changes: list[TransactionChange]
+
+    # Cursor to pass as since on the next request is returned
+    next_since: int
 
+    # Whether more changes are available right away is returned
+    has_more: bool
@@ -0,0 +1,102 @@
+# Approximate merchant analytics are defined in this file
+# Monthly sketches of the requested range are merged instead of grouping the raw transactions
+import math
+from collections import defaultdict
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.shards import shard_sessions
+from app.models.merchant_sketch import MonthlyMerchantSketch
+from app.services.merchant_sketches import load_top_merchants
+from app.services.sketches import HLL_RELATIVE_ERROR, HyperLogLog
+
+# Two-sided normal quantile used for distinct count intervals
+CONFIDENCE = 0.95
+_CONFIDENCE_Z = 1.96
+
+
+def top_merchants(db: Session, start: str, end: str, limit: int) -> dict:
+    # Sketches of every month in the range are read from the shards covering it
+    rows = [
+        row
+        for _, session in shard_sessions(db, int(start[:4]), int(end[:4]))
+        for row in load_top_merchants(session, start, end)
+    ]
+
+    # A merchant missing from a month's sketch occurred at most that month's untracked bound
+    # The bounds of all months together cap the count of any merchant not listed at all
+    sketches = [sketch for _, sketch in rows]
+    untracked_max = sum(sketch.untracked_bound() for sketch in sketches)
+
+    # Upper bounds start from the untracked cap and replace it month by month where a counter exists
+    # Lower bounds only count what the counters guarantee
+    upper: dict[str, int] = {}
+    lower: dict[str, int] = {}
+    for sketch in sketches:
+        bound = sketch.untracked_bound()
+        for merchant, (count, error) in sketch.counters.items():
+            upper[merchant] = upper.get(merchant, untracked_max) + count - bound
+            lower[merchant] = lower.get(merchant, 0) + count - error
+
+    # Merchants are ranked by their upper bound
+    ranked = sorted(upper, key=upper.__getitem__, reverse=True)
+
+    # A listed merchant is certainly in the top list when its lower bound beats every merchant left out
+    cutoff = max(upper[ranked[limit]] if len(ranked) > limit else 0, untracked_max)
+    return {
+        "start": start,
+        "end": end,
+        "transaction_count": sum(transaction_count for transaction_count, _ in rows),
+        "untracked_max_count": untracked_max,
+        "merchants": [
+            {
+                "merchant": merchant,
+                "count": upper[merchant],
+                "count_lower_bound": lower[merchant],
+                "guaranteed": lower[merchant] >= cutoff,
+            }
+            for merchant in ranked[:limit]
+        ],
+    }
+
+
+def distinct_estimate(sketch: HyperLogLog) -> dict:
+    # Estimate is reported with its interval at the configured confidence
+    estimate = sketch.count()
+    margin = _CONFIDENCE_Z * HLL_RELATIVE_ERROR * estimate
+    return {
+        "estimate": estimate,
+        "lower_bound": max(0, math.floor(estimate - margin)),
+        "upper_bound": math.ceil(estimate + margin),
+    }
+
+
+def distinct_merchants(db: Session, start: str, end: str) -> dict:
+    # Registers of every month and category in the range are read from the shards covering it
+    statement = select(MonthlyMerchantSketch.category, MonthlyMerchantSketch.registers).where(
+        MonthlyMerchantSketch.month >= start, MonthlyMerchantSketch.month <= end
+    )
+
+    # Months are merged per category, so a merchant seen in several months counts once
+    registers_by_category: dict[str, list[HyperLogLog]] = defaultdict(list)
+    for _, session in shard_sessions(db, int(start[:4]), int(end[:4])):
+        for category, registers in session.execute(statement):
+            registers_by_category[category].append(HyperLogLog(registers))
+    by_category: dict[str, HyperLogLog] = {}
+    for category, sketches in registers_by_category.items():
+        by_category[category] = HyperLogLog()
+        by_category[category].merge(*sketches)
+
+    # Categories are merged into one sketch for merchants across all categories
+    overall = HyperLogLog()
+    overall.merge(*by_category.values())
+
+    return {
+        "start": start,
+        "end": end,
+        "relative_standard_error": round(HLL_RELATIVE_ERROR, 5),
+        "confidence": CONFIDENCE,
+        "distinct_merchants": distinct_estimate(overall),
+        "by_category": {category: distinct_estimate(by_category[category]) for category in sorted(by_category)},
+    }
@@ -0,0 +1,486 @@
+# Cold month archival is defined in this file
+# Closed months are moved out of the transactions table into compressed, append-only columnar segment files
+import heapq
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator
+from datetime import date
+from itertools import accumulate, islice
+from typing import NamedTuple
+
+from sqlalchemy import Connection, delete, exists, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.shards import begin_write, write_session
+from app.models.archive_segment import ArchivedExternalId, ArchiveSegment
+from app.models.rollup import MonthlyCategoryTotal
+from app.models.transaction import Transaction
+from app.services.cache import LRUCache
+from app.services.months import month_bounds
+
+# Segment files start with this marker, followed by the length of their JSON header
+SEGMENT_MAGIC = b"TXSEG1\n"
+HEADER_LENGTH = struct.Struct("<I")
+
+# Rows of a segment are stored in row groups, each with its own compressed column blocks
+# A page only decompresses the groups its range reaches
+ROW_GROUP_ROWS = 16_384
+
+# Columns stored in a segment, in file order
+SEGMENT_COLUMNS = (
+    "id",
+    "date",
+    "amount_cents",
+    "merchant",
+    "category",
+    "external_id",
+    "rules_version",
+    "change_seq",
+    "category_source",
+)
+
+# Columns read back when archived rows are listed
+LIST_SEGMENT_COLUMNS = ("id", "date", "amount_cents", "merchant", "category")
+
+# Columns kept for the external ids of archived rows
+EXTERNAL_ID_SEGMENT_COLUMNS = ("id", "date", "amount_cents", "merchant", "category", "external_id", "rules_version")
+
+# Segment headers are small, so far more of them are cached than row groups
+SEGMENT_INDEX_CACHE_SIZE = 1024
+
+
+class ArchivedRow(NamedTuple):
+    # Archived transaction shaped like a row of the list query
+    id: int
+    amount_cents: int
+    merchant: str
+    category: str
+    date: date
+
+
+class SegmentCorrupted(RuntimeError):
+    # Raised when a segment file is not readable as written
+    pass
+
+
+def row_key(row) -> tuple[date, int]:
+    # Stored and archived rows are both ordered by (date, id) like the list endpoint
+    return row.date, row.id
+
+
+def segment_path(file_name: str) -> str:
+    # Segment files live in the configured archive directory
+    return os.path.join(settings.archive_dir, file_name)
+
+
+def _packed(typecode: str, values: Iterable[int]) -> bytes:
+    # Integers are stored little-endian in the width of the array type code
+    packed = array(typecode, values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpacked(typecode: str, data: bytes) -> array:
+    # Little-endian integers are read back into an array of the type code
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def encode_column(name: str, values: list) -> tuple[str, bytes]:
+    # Ids and change numbers grow with the rows, so their small differences are stored
+    if name in ("id", "change_seq"):
+        numbers = [value or 0 for value in values]
+        return "delta", _packed("q", (value - previous for previous, value in zip([0, *numbers], numbers)))
+
+    # Amounts are stored as plain integers
+    if name == "amount_cents":
+        return "int", _packed("q", values)
+
+    # The month is implied by the segment, so only the day of each date is stored
+    if name == "date":
+        return "day", bytes(value.day for value in values)
+
+    # Text columns repeat few distinct values, so they are stored as a dictionary and codes
+    # Codes take the narrowest integer type that holds the dictionary
+    dictionary: dict[str | None, int] = {}
+    codes = [dictionary.setdefault(value, len(dictionary)) for value in values]
+    typecode = "B" if len(dictionary) <= 1 << 8 else "H" if len(dictionary) <= 1 << 16 else "I"
+    words = json.dumps(list(dictionary), separators=(",", ":")).encode()
+    return f"dict:{typecode}", HEADER_LENGTH.pack(len(words)) + words + _packed(typecode, codes)
+
+
+def decode_column(encoding: str, data: bytes):
+    # Columns are decoded into arrays, dictionary columns into their words and codes
+    kind, _, typecode = encoding.partition(":")
+    if kind == "delta":
+        return array("q", accumulate(_unpacked("q", data)))
+    if kind == "int":
+        return _unpacked("q", data)
+    if kind == "day":
+        return data
+    if kind == "dict":
+        (length,) = HEADER_LENGTH.unpack_from(data)
+        words = json.loads(data[HEADER_LENGTH.size:HEADER_LENGTH.size + length])
+        return words, _unpacked(typecode, data[HEADER_LENGTH.size + length:])
+    raise SegmentCorrupted(f"Unknown column encoding {encoding}")
+
+
+def write_segment(path: str, month: str, rows: list) -> int:
+    # Rows are split into row groups and each group into columns, every block compressed on its own
+    # The last (day, id) of each group lets readers skip the groups before a range
+    header: dict = {"month": month, "rows": len(rows), "groups": []}
+    blocks = []
+    offset = 0
+    for first in range(0, len(rows), ROW_GROUP_ROWS):
+        group_rows = rows[first:first + ROW_GROUP_ROWS]
+        columns = {}
+        for position, name in enumerate(SEGMENT_COLUMNS):
+            encoding, raw = encode_column(name, [row[position] for row in group_rows])
+            block = zlib.compress(raw, 6)
+            columns[name] = [encoding, offset, len(block), zlib.crc32(block)]
+            blocks.append(block)
+            offset += len(block)
+        last_id, last_date = group_rows[-1][0], group_rows[-1][1]
+        header["groups"].append({"rows": len(group_rows), "last": [last_date.day, last_id], "columns": columns})
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+
+    # The file is written under a temporary name and renamed once it is on disk
+    # A segment is therefore either complete or absent
+    partial_path = f"{path}.partial"
+    with open(partial_path, "wb") as segment_file:
+        segment_file.write(SEGMENT_MAGIC + HEADER_LENGTH.pack(len(header_bytes)) + header_bytes)
+        for block in blocks:
+            segment_file.write(block)
+        segment_file.flush()
+        os.fsync(segment_file.fileno())
+    os.replace(partial_path, path)
+    return os.path.getsize(path)
+
+
+class SegmentIndex:
+    # Header of one segment, telling where the column blocks of each row group are stored
+    def __init__(self, file_name: str):
+        self.path = segment_path(file_name)
+        with open(self.path, "rb") as segment_file:
+            prefix = segment_file.read(len(SEGMENT_MAGIC) + HEADER_LENGTH.size)
+            if not prefix.startswith(SEGMENT_MAGIC):
+                raise SegmentCorrupted(f"{self.path} is not an archive segment")
+            (header_length,) = HEADER_LENGTH.unpack_from(prefix, len(SEGMENT_MAGIC))
+            header = json.loads(segment_file.read(header_length))
+        self.body_start = len(prefix) + header_length
+        self.first_day, self.next_first_day = month_bounds(header["month"])
+        self.groups = header["groups"]
+
+        # Last (date, id) of every row group, in row order
+        self.last_keys = [
+            (self.first_day.replace(day=day), row_id) for day, row_id in (group["last"] for group in self.groups)
+        ]
+
+    def first_group(self, start: date | None, after: tuple[date, int] | None) -> int:
+        # First row group holding a row at or after the start date and past the cursor
+        # Ids are positive, so (start, 0) sorts before every row of the start date
+        position = 0 if start is None else bisect_left(self.last_keys, (start, 0))
+        if after is not None:
+            position = max(position, bisect_right(self.last_keys, after))
+        return position
+
+    def read_columns(self, group: int, columns: Iterable[str]) -> dict:
+        # Only the requested column blocks of the group are read and decompressed
+        decoded = {}
+        with open(self.path, "rb") as segment_file:
+            for name in columns:
+                encoding, offset, length, checksum = self.groups[group]["columns"][name]
+                segment_file.seek(self.body_start + offset)
+                block = segment_file.read(length)
+
+                # Every block is checked against its checksum before it is decompressed
+                if zlib.crc32(block) != checksum:
+                    raise SegmentCorrupted(f"{self.path}: column {name} of row group {group} fails its checksum")
+                decoded[name] = decode_column(encoding, zlib.decompress(block))
+        return decoded
+
+
+class RowGroup:
+    # Listed columns of one row group, kept as arrays so a cached group stays small
+    # Row tuples are only built for the rows a page returns
+    def __init__(self, index: SegmentIndex, columns: dict):
+        self.first_day, self.next_first_day = index.first_day, index.next_first_day
+        self.days = columns["date"]
+        self.ids = columns["id"]
+        self.amounts = columns["amount_cents"]
+        self.merchants, self.merchant_codes = columns["merchant"]
+        self.categories, self.category_codes = columns["category"]
+
+        # One date object per day of the month is shared by its rows
+        self.dates = {day: self.first_day.replace(day=day) for day in set(self.days)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _day_position(self, day: date, right: bool) -> int:
+        # Rows are sorted by day, so a date is located by binary search on the day column
+        if day < self.first_day:
+            return 0
+        if day >= self.next_first_day:
+            return len(self)
+        return (bisect_right if right else bisect_left)(self.days, day.day)
+
+    def row_range(
+        self,
+        start: date | None = None,
+        end: date | None = None,
+        after: tuple[date, int] | None = None,
+    ) -> range:
+        # Positions of the rows inside the requested (date, id) range are found without a scan
+        low = 0 if start is None else self._day_position(start, False)
+        high = len(self) if end is None else self._day_position(end, True)
+
+        # Ids are sorted within each day, so rows up to the cursor are skipped by bisecting that day
+        if after is not None:
+            day_low, day_high = self._day_position(after[0], False), self._day_position(after[0], True)
+            low = max(low, bisect_right(self.ids, after[1], day_low, day_high))
+        return range(low, max(low, high))
+
+    def rows(self, positions: range) -> Iterator[ArchivedRow]:
+        # Row tuples are built lazily, so a page stops decoding once it is full
+        for position in positions:
+            yield ArchivedRow(
+                self.ids[position],
+                self.amounts[position],
+                self.merchants[self.merchant_codes[position]],
+                self.categories[self.category_codes[position]],
+                self.dates[self.days[position]],
+            )
+
+
+# Segment files never change, so headers and decoded row groups are cached by file name
+_index_cache: LRUCache[str, SegmentIndex] = LRUCache(SEGMENT_INDEX_CACHE_SIZE)
+_row_group_cache: LRUCache[tuple[str, int], RowGroup] = LRUCache(settings.archive_cache_row_groups)
+
+
+def load_segment_index(file_name: str) -> SegmentIndex:
+    # Header of a segment is read once and served from the cache afterwards
+    index = _index_cache.get(file_name)
+    if index is None:
+        index = SegmentIndex(file_name)
+        _index_cache.put(file_name, index)
+    return index
+
+
+def load_row_group(file_name: str, group: int) -> RowGroup:
+    # Listed columns of a row group are read once and served from the cache afterwards
+    row_group = _row_group_cache.get((file_name, group))
+    if row_group is None:
+        index = load_segment_index(file_name)
+        row_group = RowGroup(index, index.read_columns(group, LIST_SEGMENT_COLUMNS))
+        _row_group_cache.put((file_name, group), row_group)
+    return row_group
+
+
+def clear_segment_caches() -> None:
+    # Cached headers and row groups are dropped, so the next reads go to the files
+    _index_cache.clear()
+    _row_group_cache.clear()
+
+
+def iter_segment_rows(
+    file_name: str,
+    start: date | None = None,
+    end: date | None = None,
+    after: tuple[date, int] | None = None,
+) -> Iterator[ArchivedRow]:
+    # Row groups are read from the first one the range reaches
+    index = load_segment_index(file_name)
+    for group in range(index.first_group(start, after), len(index.groups)):
+        row_group = load_row_group(file_name, group)
+        positions = row_group.row_range(start, end, after)
+        yield from row_group.rows(positions)
+
+        # The range ends inside this group when it stops before the group's last row
+        if positions.stop < len(row_group):
+            return
+
+
+def find_segments(
+    session: Session,
+    start: date | None = None,
+    end: date | None = None,
+    after: tuple[date, int] | None = None,
+) -> list[tuple[str, str]]:
+    # Catalogued segments of the months the range reaches are listed in month order
+    lower = max((bound for bound in (start, after[0] if after else None) if bound), default=None)
+    statement = select(ArchiveSegment.month, ArchiveSegment.file_name).order_by(
+        ArchiveSegment.month, ArchiveSegment.id
+    )
+    if lower is not None:
+        statement = statement.where(ArchiveSegment.month >= lower.strftime("%Y-%m"))
+    if end is not None:
+        statement = statement.where(ArchiveSegment.month <= end.strftime("%Y-%m"))
+    return [(month, file_name) for month, file_name in session.execute(statement)]
+
+
+def iter_archived_rows(
+    segments: list[tuple[str, str]],
+    start: date | None = None,
+    end: date | None = None,
+    after: tuple[date, int] | None = None,
+) -> Iterator[ArchivedRow]:
+    # Months are read one after another, so months past a full page are never loaded
+    segments_by_month: dict[str, list[str]] = defaultdict(list)
+    for month, file_name in segments:
+        segments_by_month[month].append(file_name)
+
+    for month in sorted(segments_by_month):
+        parts = [iter_segment_rows(file_name, start, end, after) for file_name in segments_by_month[month]]
+
+        # A month archived more than once has one segment per run, merged in (date, id) order
+        yield from parts[0] if len(parts) == 1 else heapq.merge(*parts, key=row_key)
+
+
+def merge_archived_rows(rows: Iterable, archived: Iterable, limit: int | None = None) -> Iterator:
+    # Stored and archived rows are merged in (date, id) order and cut at the limit
+    merged = heapq.merge(rows, archived, key=row_key)
+    return merged if limit is None else islice(merged, limit)
+
+
+def archived_category_totals(session: Session) -> dict[tuple[str, str], tuple[int, int]]:
+    # Count and cent totals of every archived month and category are summed from the catalog
+    totals: dict[tuple[str, str], tuple[int, int]] = {}
+    for month, category_totals in session.execute(select(ArchiveSegment.month, ArchiveSegment.category_totals)):
+        for category, (count, cents) in json.loads(category_totals).items():
+            stored_count, stored_cents = totals.get((month, category), (0, 0))
+            totals[(month, category)] = (stored_count + count, stored_cents + cents)
+    return totals
+
+
+def iter_archived_merchants(session: Session) -> Iterator[tuple[str, str, str, int]]:
+    # Archived rows are counted per month, category and merchant from the segment columns
+    for month, file_name in session.execute(select(ArchiveSegment.month, ArchiveSegment.file_name)):
+        index = SegmentIndex(file_name)
+        for group in range(len(index.groups)):
+            columns = index.read_columns(group, ("merchant", "category"))
+            merchants, merchant_codes = columns["merchant"]
+            categories, category_codes = columns["category"]
+            for (category_code, merchant_code), count in Counter(zip(category_codes, merchant_codes)).items():
+                yield month, categories[category_code], merchants[merchant_code], count
+
+
+def archived_external_id_rows(rows: Iterable) -> list[dict]:
+    # Rows carrying an external id keep it reserved, with the fields a retried row is compared with
+    return [
+        {
+            "external_id": row["external_id"],
+            "transaction_id": row["id"],
+            "amount_cents": row["amount_cents"],
+            "merchant": row["merchant"],
+            "category": row["category"],
+            "date": row["date"],
+            "rules_version": row["rules_version"],
+        }
+        for row in rows
+        if row["external_id"] is not None
+    ]
+
+
+def iter_segment_external_id_rows(file_name: str) -> Iterator[dict]:
+    # External ids of a segment are read back from its columns, one row group at a time
+    index = SegmentIndex(file_name)
+    for group in range(len(index.groups)):
+        columns = index.read_columns(group, EXTERNAL_ID_SEGMENT_COLUMNS)
+
+        # Dictionary columns are expanded into their words and days into dates
+        for name, values in columns.items():
+            if isinstance(values, tuple):
+                words, codes = values
+                columns[name] = [words[code] for code in codes]
+        columns["date"] = [index.first_day.replace(day=day) for day in columns["date"]]
+
+        rows = zip(*(columns[name] for name in EXTERNAL_ID_SEGMENT_COLUMNS))
+        yield from archived_external_id_rows(dict(zip(EXTERNAL_ID_SEGMENT_COLUMNS, row)) for row in rows)
+
+
+def backfill_archived_external_ids(db: Session | Connection) -> None:
+    # External ids of months archived before they were reserved are read back from the segment files
+    for (file_name,) in db.execute(select(ArchiveSegment.file_name).order_by(ArchiveSegment.id)).all():
+        external_id_rows = list(iter_segment_external_id_rows(file_name))
+        if external_id_rows:
+            db.execute(insert(ArchivedExternalId), external_id_rows)
+
+
+def archivable_months(session: Session, before: str) -> list[str]:
+    # Months are taken from the rollup table, which lists every month that holds rows
+    # Only months that still have rows in the transactions table are returned
+    months = session.execute(
+        select(MonthlyCategoryTotal.month)
+        .where(MonthlyCategoryTotal.month < before)
+        .distinct()
+        .order_by(MonthlyCategoryTotal.month)
+    ).scalars()
+    archivable = []
+    for month in months:
+        first_day, next_first_day = month_bounds(month)
+        if session.execute(
+            select(exists().where(Transaction.date >= first_day, Transaction.date < next_first_day))
+        ).scalar():
+            archivable.append(month)
+    return archivable
+
+
+def archive_month(db: Session, month: str) -> dict | None:
+    # Rows of the month are moved in the shard of its year, which refuses read-only years
+    session = write_session(db, int(month[:4]))
+
+    # The write lock is held until the commit, so no row of the month is added or changed in between
+    begin_write(session)
+    first_day, next_first_day = month_bounds(month)
+    in_month = (Transaction.date >= first_day, Transaction.date < next_first_day)
+    rows = session.execute(
+        select(*(getattr(Transaction, name) for name in SEGMENT_COLUMNS))
+        .where(*in_month)
+        .order_by(Transaction.date, Transaction.id)
+    ).all()
+    if not rows:
+        return None
+
+    # Category totals of the segment are kept, so rollups can still be rebuilt without its rows
+    category_totals: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+    for row in rows:
+        totals = category_totals[row.category]
+        totals[0] += 1
+        totals[1] += row.amount_cents
+
+    # A new segment is written on every run, existing segments are never rewritten
+    segment_id = (session.execute(select(func.max(ArchiveSegment.id))).scalar() or 0) + 1
+    file_name = f"transactions-{month}-{segment_id}.seg"
+    os.makedirs(settings.archive_dir, exist_ok=True)
+    file_size = write_segment(segment_path(file_name), month, rows)
+
+    # The catalog entry, the reserved external ids and the removal of the rows commit together
+    # A crash before the commit leaves the rows in place and an uncatalogued file that is never read
+    session.execute(
+        insert(ArchiveSegment).values(
+            id=segment_id,
+            month=month,
+            file_name=file_name,
+            row_count=len(rows),
+            max_id=max(row.id for row in rows),
+            file_size=file_size,
+            category_totals=json.dumps(category_totals, separators=(",", ":")),
+        )
+    )
+    external_id_rows = archived_external_id_rows(row._mapping for row in rows)
+    if external_id_rows:
+        session.execute(insert(ArchivedExternalId), external_id_rows)
+    session.execute(delete(Transaction).where(*in_month).execution_options(synchronize_session=False))
+    return {"month": month, "file_name": file_name, "rows": len(rows), "file_size": file_size}
@@ -0,0 +1,75 @@
+# Bounded LRU cache used in front of the categorizer is defined in this file
+import threading
+from collections import OrderedDict
+from typing import Generic, TypeVar
+
+KeyT = TypeVar("KeyT")
+ValueT = TypeVar("ValueT")
+
+
+class LRUCache(Generic[KeyT, ValueT]):
+    def __init__(self, max_size: int):
+        # Entries are kept in recency order, oldest first
+        self.max_size = max_size
+        self._entries: OrderedDict[KeyT, ValueT] = OrderedDict()
+
+        # A single lock guards entries and counters across threadpool workers
+        self._lock = threading.Lock()
+
+        # Generation is advanced on every clear so stale writes can be dropped
+        self._generation = 0
+
+        # Usage counters are kept for reporting
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def generation(self) -> int:
+        # Current generation is returned
+        return self._generation
+
+    def get(self, key: KeyT) -> ValueT | None:
+        with self._lock:
+            # Missing keys are counted as misses
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+
+            # Hits are moved to the most recently used position
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: KeyT, value: ValueT, generation: int | None = None) -> None:
+        with self._lock:
+            # Values computed before the last clear are discarded
+            if generation is not None and generation != self._generation:
+                return
+
+            # Entry is stored as the most recently used one
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            # Least recently used entries are evicted beyond the size bound
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            # All entries are dropped and in-flight writes are invalidated
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            # Counters and occupancy are returned as a snapshot
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -1,21 +1,247 @@
 # Transaction categorization logic is defined in this file
-# Simple rule-based categorization is used
+# Categorization is delegated to a compiled rule engine behind an LRU cache
+# The active engine is immutable and replaced as a whole, so categorizations never wait for a rules reload
+from collections.abc import Iterable
+from pathlib import Path
+from typing import NamedTuple
 
-def categorize_transaction(merchant: str) -> str:
-    # Merchant name is normalized to lowercase
-    merchant_lower = merchant.lower()
+from app.core.config import settings
+from app.core.metrics import REGISTRY, Counter, register_callback
+from app.services.cache import LRUCache
+from app.services.merchant import normalize_merchant
+from app.services.rule_engine import (
+    DEFAULT_RULES_PATH,
+    CategoryRule,
+    RuleEngine,
+    load_rules,
+)
 
-    # Food and dining category is detected
-    if "starbucks" in merchant_lower or "restaurant" in merchant_lower:
-        return "Food & Dining"
 
-    # Transportation category is detected
-    if "uber" in merchant_lower or "lyft" in merchant_lower:
-        return "Transportation"
+# What assigned a category is stored with it
+# Rows labelled by the fallback model are left out when the model is retrained
+SOURCE_RULE = "rule"
+SOURCE_MODEL = "model"
+SOURCE_DEFAULT = "default"
 
-    # Grocery category is detected
-    if "walmart" in merchant_lower or "grocery" in merchant_lower:
-        return "Groceries"
 
-    # Default category is assigned when no rule matches
-    return "Uncategorized"
+class Categorization(NamedTuple):
+    # Category of a merchant and the source that assigned it
+    category: str
+    source: str
+
+
+def build_rule_engine(rules: Iterable[CategoryRule]) -> RuleEngine:
+    # Patterns are normalized like merchants so both sides compare equally
+    normalized_rules = []
+    for rule in rules:
+        pattern = normalize_merchant(rule.pattern)
+        if pattern:
+            normalized_rules.append(rule._replace(pattern=pattern))
+
+    # Normalized rules are compiled into a single engine
+    return RuleEngine(normalized_rules)
+
+
+def rules_path() -> Path:
+    # Configured rules file, or the rules bundled with the application
+    return Path(settings.rules_path or DEFAULT_RULES_PATH)
+
+
+# Rule engine is compiled from the configured rules file at import and replaced on reload
+_rule_engine = build_rule_engine(load_rules(rules_path()))
+
+# Categories and their sources are cached per rules version and normalized merchant
+# A category is therefore only ever returned with the version of the engine that computed it
+_category_cache: LRUCache[tuple[str, str], Categorization] = LRUCache(settings.category_cache_size)
+
+# Optional learned fallback scores merchants that no rule matches
+# NumPy is only needed when a trained model is configured
+_fallback_model = None
+if settings.fallback_model_path:
+    from app.services.fallback_model import NaiveBayesFallback
+
+    _fallback_model = NaiveBayesFallback.load(settings.fallback_model_path)
+
+
+def get_rule_engine() -> RuleEngine:
+    # Active rule engine is returned
+    return _rule_engine
+
+
+def get_rules_version() -> str:
+    # Version of the active rule set is returned
+    return _rule_engine.version
+
+
+def set_rule_engine(rule_engine: RuleEngine) -> None:
+    # Active rule engine is replaced with a newly compiled one in a single assignment
+    # Categorizations already running keep the engine they started with
+    global _rule_engine
+    _rule_engine = rule_engine
+
+    # Cached categories computed with the previous rules can no longer be hit and are flushed
+    _category_cache.clear()
+
+
+def set_fallback_model(fallback_model) -> None:
+    # Fallback model is replaced, or removed when None is given
+    global _fallback_model
+    _fallback_model = fallback_model
+
+    # Cached categories computed with the previous model are flushed
+    _category_cache.clear()
+
+
+def get_category_cache_stats() -> dict[str, int]:
+    # Category cache counters are returned
+    return _category_cache.stats()
+
+
+def get_category_cache_hit_ratio() -> float:
+    # Share of lookups answered from the cache is returned
+    stats = get_category_cache_stats()
+    lookups = stats["hits"] + stats["misses"]
+    return stats["hits"] / lookups if lookups else 0.0
+
+
+# Merchants categorized are counted where they enter the categorizer
+# A batch looks up each distinct merchant once, so cache lookups undercount batch traffic
+CATEGORIZER_CALLS = REGISTRY.register(Counter("categorizer_calls_total", "Merchants categorized"))
+
+# Cache metrics are read from the cache counters at scrape time
+register_callback(
+    "categorizer_cache_hits_total",
+    "Category cache lookups answered from the cache",
+    "counter",
+    lambda: get_category_cache_stats()["hits"],
+)
+register_callback(
+    "categorizer_cache_misses_total",
+    "Category cache lookups computed by the rule engine",
+    "counter",
+    lambda: get_category_cache_stats()["misses"],
+)
+register_callback(
+    "categorizer_cache_evictions_total",
+    "Entries evicted from the category cache",
+    "counter",
+    lambda: get_category_cache_stats()["evictions"],
+)
+register_callback(
+    "categorizer_cache_entries",
+    "Entries held by the category cache",
+    "gauge",
+    lambda: get_category_cache_stats()["size"],
+)
+register_callback(
+    "categorizer_cache_max_entries",
+    "Entries the category cache holds before evicting",
+    "gauge",
+    lambda: get_category_cache_stats()["max_size"],
+)
+register_callback(
+    "categorizer_cache_hit_ratio",
+    "Share of category cache lookups answered from the cache",
+    "gauge",
+    get_category_cache_hit_ratio,
+)
+
+
+def _categorize_keys(rule_engine: RuleEngine, merchant_keys: list[str]) -> dict[str, Categorization]:
+    # Cache generation is read before the fallback model so a concurrent model swap
+    # causes these results to be discarded instead of cached
+    generation = _category_cache.generation
+    fallback_model = _fallback_model
+
+    # Each merchant is matched against every rule in a single pass
+    categorizations: dict[str, Categorization] = {}
+    unmatched: list[str] = []
+    for merchant_key in merchant_keys:
+        rule = rule_engine.match(merchant_key)
+        if rule is not None:
+            categorizations[merchant_key] = Categorization(rule.category, SOURCE_RULE)
+        else:
+            unmatched.append(merchant_key)
+
+    # Merchants no rule matched are scored by the fallback model in one batch
+    # Predictions below the confidence threshold keep the default category
+    if unmatched:
+        predictions = (
+            fallback_model.predict(unmatched, settings.fallback_min_confidence)
+            if fallback_model is not None
+            else [None] * len(unmatched)
+        )
+        for merchant_key, prediction in zip(unmatched, predictions):
+            categorizations[merchant_key] = (
+                Categorization(prediction, SOURCE_MODEL)
+                if prediction
+                else Categorization(rule_engine.default_category, SOURCE_DEFAULT)
+            )
+
+    # Results are cached under the engine's version unless the cache was cleared in the meantime
+    for merchant_key, categorization in categorizations.items():
+        _category_cache.put((rule_engine.version, merchant_key), categorization, generation)
+    return categorizations
+
+
+def categorize_merchant(merchant: str, rule_engine: RuleEngine | None = None) -> Categorization:
+    # The active engine is read once, callers recording the rules version pass the engine they read
+    rule_engine = rule_engine or _rule_engine
+    CATEGORIZER_CALLS.inc()
+
+    # Merchant name is reduced to its stable form
+    merchant_key = normalize_merchant(merchant)
+
+    # Cached categorization is returned when available
+    categorization = _category_cache.get((rule_engine.version, merchant_key))
+    if categorization is not None:
+        return categorization
+
+    # Uncached merchant is categorized by the rules and, failing that, the fallback model
+    return _categorize_keys(rule_engine, [merchant_key])[merchant_key]
+
+
+def categorize_transaction(merchant: str, rule_engine: RuleEngine | None = None) -> str:
+    # Category alone is returned to callers that do not store its source
+    return categorize_merchant(merchant, rule_engine).category
+
+
+def categorize_merchants(merchants: list[str], rule_engine: RuleEngine | None = None) -> list[Categorization]:
+    # The whole batch is categorized with one engine, even when the rules are swapped meanwhile
+    rule_engine = rule_engine or _rule_engine
+    version = rule_engine.version
+    CATEGORIZER_CALLS.inc(amount=len(merchants))
+
+    # Each distinct merchant is normalized and looked up in the cache only once per batch
+    keys_by_merchant = {merchant: normalize_merchant(merchant) for merchant in set(merchants)}
+    categorizations_by_key: dict[str, Categorization] = {}
+    missing: list[str] = []
+    for merchant_key in set(keys_by_merchant.values()):
+        categorization = _category_cache.get((version, merchant_key))
+        if categorization is None:
+            missing.append(merchant_key)
+        else:
+            categorizations_by_key[merchant_key] = categorization
+
+    # Cache misses are categorized together so the fallback model scores them in one call
+    if missing:
+        categorizations_by_key.update(_categorize_keys(rule_engine, missing))
+
+    # Categorizations are returned in the same order as the merchants
+    return [categorizations_by_key[keys_by_merchant[merchant]] for merchant in merchants]
+
+
+def prefill_category_cache(merchants: list[str], rule_engine: RuleEngine | None = None) -> int:
+    # Categories of the merchants are computed into the cache without going through the counted lookups
+    # Categorizer calls and cache hits and misses therefore only ever count request traffic
+    rule_engine = rule_engine or _rule_engine
+
+    # Distinct merchants are kept in the order given, up to what the cache holds, so nothing is evicted
+    merchant_keys = list(dict.fromkeys(map(normalize_merchant, merchants)))[: _category_cache.max_size]
+    _categorize_keys(rule_engine, merchant_keys)
+    return len(merchant_keys)
+
+
+def categorize_batch(merchants: list[str], rule_engine: RuleEngine | None = None) -> list[str]:
+    # Categories alone are returned to callers that do not store their source
+    return [categorization.category for categorization in categorize_merchants(merchants, rule_engine)]
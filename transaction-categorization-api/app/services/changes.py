@@ -0,0 +1,142 @@
+# Transaction change feed is defined in this file
+# Every insert, re-categorization and delete takes the next number of a single change sequence
+from sqlalchemy import Connection, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.db.shards import begin_write, shard_sessions, write_session
+from app.models.change import ChangeSequence, TransactionTombstone
+from app.models.transaction import Transaction
+from app.services.money import cents_to_float
+from app.services.rollups import apply_rollup_deltas, rollup_deltas
+
+# Columns of a changed row, in the order the feed shapes them
+CHANGE_COLUMNS = (
+    Transaction.change_seq,
+    Transaction.id,
+    Transaction.amount_cents,
+    Transaction.merchant,
+    Transaction.category,
+    Transaction.date,
+    Transaction.external_id,
+    Transaction.rules_version,
+)
+
+
+def allocate_change_seqs(db: Session, count: int) -> int:
+    # The sequence lives in the main database, whose write lock is held until the session commits
+    # The main database commits after every shard, so a number is only visible once all smaller ones are
+    begin_write(db)
+    last_seq = db.execute(
+        update(ChangeSequence)
+        .values(value=ChangeSequence.value + count)
+        .returning(ChangeSequence.value)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+
+    # First number of the allocated block is returned
+    return last_seq - count + 1
+
+
+def largest_change_seq(connection: Connection) -> int:
+    # Largest change number stored in a database, on its rows or its tombstones
+    return max(
+        connection.execute(select(func.max(Transaction.change_seq))).scalar() or 0,
+        connection.execute(select(func.max(TransactionTombstone.change_seq))).scalar() or 0,
+    )
+
+
+def advance_change_sequence(connection: Connection, value: int) -> None:
+    # The sequence is moved forward to the value, never back
+    connection.execute(
+        update(ChangeSequence).where(ChangeSequence.value < value).values(value=value)
+    )
+
+
+def delete_transaction(db: Session, transaction_id: int) -> bool:
+    # The shard holding the id is found by a primary key lookup in each shard
+    row_date = None
+    for _, session in shard_sessions(db):
+        row_date = session.execute(
+            select(Transaction.date).where(Transaction.id == transaction_id)
+        ).scalar_one_or_none()
+        if row_date is not None:
+            break
+    if row_date is None:
+        return False
+
+    # Rows of a year served read-only are refused by the write session
+    session = write_session(db, row_date.year)
+    begin_write(session)
+
+    # The row is deleted under the write lock, so a concurrent delete of the same id finds nothing
+    deleted = session.execute(
+        delete(Transaction)
+        .where(Transaction.id == transaction_id)
+        .returning(Transaction.date, Transaction.category, Transaction.amount_cents)
+        .execution_options(synchronize_session=False)
+    ).one_or_none()
+    if deleted is None:
+        return False
+
+    # The amount leaves its monthly rollup in the same transaction
+    # Sketches cannot forget a merchant, so they keep counting the row until sketches are rebuilt
+    apply_rollup_deltas(session, rollup_deltas([tuple(deleted)], sign=-1))
+
+    # A tombstone tells change feed clients to drop the row
+    session.execute(
+        insert(TransactionTombstone).values(
+            change_seq=allocate_change_seqs(db, 1),
+            transaction_id=transaction_id,
+            date=deleted.date,
+        )
+    )
+    return True
+
+
+def read_changes(db: Session, since: int, limit: int) -> dict:
+    # Largest committed change number is read before any row
+    # Every smaller number was committed with it, so a later cursor never skips a change
+    high = db.execute(select(ChangeSequence.value)).scalar_one_or_none() or 0
+
+    # Each shard's next changes are read from the change sequence index and the tombstone primary key
+    # One extra change per source tells whether more remain
+    changes = []
+    for _, session in shard_sessions(db):
+        rows = session.execute(
+            select(*CHANGE_COLUMNS)
+            .where(Transaction.change_seq > since, Transaction.change_seq <= high)
+            .order_by(Transaction.change_seq)
+            .limit(limit + 1)
+        )
+        changes.extend(
+            {
+                "seq": change_seq,
+                "operation": "upsert",
+                "id": row_id,
+                "amount": cents_to_float(amount_cents),
+                "merchant": merchant,
+                "category": category,
+                "date": row_date.isoformat(),
+                "external_id": external_id,
+                "rules_version": version,
+            }
+            for change_seq, row_id, amount_cents, merchant, category, row_date, external_id, version in rows
+        )
+        tombstones = session.execute(
+            select(TransactionTombstone.change_seq, TransactionTombstone.transaction_id)
+            .where(TransactionTombstone.change_seq > since, TransactionTombstone.change_seq <= high)
+            .order_by(TransactionTombstone.change_seq)
+            .limit(limit + 1)
+        )
+        changes.extend(
+            {"seq": change_seq, "operation": "delete", "id": row_id} for change_seq, row_id in tombstones
+        )
+
+    # Changes of every source are merged in sequence order and cut at the limit
+    changes.sort(key=lambda change: change["seq"])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    # A complete delta moves the cursor to the committed high mark, so empty polls stay cheap
+    next_since = changes[-1]["seq"] if has_more else max(high, since)
+    return {"changes": changes, "next_since": next_since, "has_more": has_more}
@@ -0,0 +1,145 @@
+# Statistical fallback categorizer is defined in this file
+# A multinomial naive Bayes model over hashed character n-grams scores merchants no rule matches
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+
+# Character n-gram lengths used as features
+NGRAM_SIZES = (2, 3, 4)
+
+# Merchant names are truncated to this many characters before featurization
+MAX_NAME_LENGTH = 48
+
+# Multiplier of the n-gram hash, the 64 bit golden ratio constant
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+# Names featurized at once while training, which bounds the n-gram matrix size
+TRAIN_CHUNK_SIZE = 20_000
+
+
+def ngram_buckets(names: list[str], bits: int) -> tuple[np.ndarray, np.ndarray]:
+    # Names are padded with a space on each side so word boundaries become features
+    # Every name is laid out in a fixed width byte matrix, one row per name
+    width = MAX_NAME_LENGTH + 2
+    padded = [f" {name[:MAX_NAME_LENGTH]} " for name in names]
+    lengths = np.fromiter((len(name) for name in padded), dtype=np.int64, count=len(padded))
+    text = "".join(name.ljust(width, "\0") for name in padded).encode("ascii", errors="replace")
+    chars = np.frombuffer(text, dtype=np.uint8).reshape(len(names), width).astype(np.uint64)
+
+    buckets = []
+    valid = []
+    for size in NGRAM_SIZES:
+        # Consecutive characters are packed into one integer code per n-gram
+        positions = width - size + 1
+        codes = np.full((len(names), positions), size, dtype=np.uint64)
+        for offset in range(size):
+            codes = (codes << np.uint64(8)) | chars[:, offset:offset + positions]
+
+        # Codes are spread over the buckets with multiplicative hashing
+        buckets.append((codes * _HASH_MULTIPLIER) >> np.uint64(64 - bits))
+
+        # N-grams reaching into the padding are masked out
+        valid.append(np.arange(positions)[None, :] + size <= lengths[:, None])
+
+    # Bucket indices and their validity mask are returned with one column per n-gram
+    return np.concatenate(buckets, axis=1).astype(np.intp), np.concatenate(valid, axis=1)
+
+
+class NaiveBayesFallback:
+    def __init__(self, classes: Iterable[str], class_log_prior: np.ndarray, feature_log_prob: np.ndarray):
+        # Category labels are kept in model column order
+        self.classes = np.asarray(list(classes))
+
+        # Log priors have one entry per class
+        self.class_log_prior = class_log_prior.astype(np.float32)
+
+        # Log likelihoods are stored bucket major, so scoring gathers whole rows
+        self.feature_log_prob = feature_log_prob.astype(np.float32)
+        self.bits = int(np.log2(self.feature_log_prob.shape[0]))
+
+        # Scoring table is class major, so each class sums contiguous gathered values
+        # An extra zero column is the target of padding n-grams, so they add nothing to a score
+        self._scoring_table = np.ascontiguousarray(
+            np.vstack([self.feature_log_prob, np.zeros((1, len(self.classes)), dtype=np.float32)]).T
+        )
+
+    @classmethod
+    def train(
+        cls,
+        names: list[str],
+        labels: list[str],
+        weights: list[float] | None = None,
+        bits: int = 16,
+        alpha: float = 0.1,
+    ) -> "NaiveBayesFallback":
+        # Classes are sorted so a retrained model has a stable column order
+        classes, label_index = np.unique(np.asarray(labels), return_inverse=True)
+        sample_weight = np.ones(len(names)) if weights is None else np.asarray(weights, dtype=np.float64)
+
+        # Weighted n-gram counts are accumulated per class with one scatter-add per chunk
+        counts = np.zeros((1 << bits, len(classes)), dtype=np.float64)
+        for start in range(0, len(names), TRAIN_CHUNK_SIZE):
+            stop = start + TRAIN_CHUNK_SIZE
+            buckets, valid = ngram_buckets(names[start:stop], bits)
+            shape = buckets.shape
+            np.add.at(
+                counts,
+                (buckets[valid], np.broadcast_to(label_index[start:stop, None], shape)[valid]),
+                np.broadcast_to(sample_weight[start:stop, None], shape)[valid],
+            )
+
+        # Additive smoothing turns counts into log likelihoods per class
+        smoothed = counts + alpha
+        feature_log_prob = np.log(smoothed) - np.log(smoothed.sum(axis=0, keepdims=True))
+
+        # N-grams never seen in training score zero for every class
+        # Otherwise unknown names would lean towards the class with the fewest counts
+        feature_log_prob[counts.sum(axis=1) == 0] = 0.0
+
+        # Class priors follow the weighted label frequencies
+        class_weight = np.bincount(label_index, weights=sample_weight, minlength=len(classes))
+        class_log_prior = np.log(class_weight / class_weight.sum())
+
+        return cls(classes, class_log_prior, feature_log_prob)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "NaiveBayesFallback":
+        # Model arrays are read from a NumPy archive
+        with np.load(path, allow_pickle=False) as archive:
+            return cls(archive["classes"], archive["class_log_prior"], archive["feature_log_prob"])
+
+    def save(self, path: str | Path) -> None:
+        # Model arrays are written to a compressed NumPy archive
+        np.savez_compressed(
+            path,
+            classes=self.classes,
+            class_log_prior=self.class_log_prior,
+            feature_log_prob=self.feature_log_prob,
+        )
+
+    def predict_proba(self, names: list[str]) -> np.ndarray:
+        # Log likelihoods of every n-gram are gathered and summed in one vectorized step
+        # This equals multiplying the sparse n-gram count matrix with the log likelihood matrix
+        buckets, valid = ngram_buckets(names, self.bits)
+        buckets[~valid] = len(self.feature_log_prob)
+        scores = np.take(self._scoring_table, buckets, axis=1).sum(axis=2).T + self.class_log_prior
+
+        # Scores are normalized into class probabilities
+        scores -= scores.max(axis=1, keepdims=True)
+        probabilities = np.exp(scores)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def predict(self, names: list[str], min_confidence: float) -> list[str | None]:
+        # Nothing is scored for an empty batch
+        if not names:
+            return []
+
+        # Most likely class is returned only when its probability clears the threshold
+        probabilities = self.predict_proba(names)
+        best = probabilities.argmax(axis=1)
+        confident = probabilities[np.arange(len(names)), best] >= min_confidence
+        return [
+            str(self.classes[index]) if accepted else None
+            for index, accepted in zip(best.tolist(), confident.tolist())
+        ]
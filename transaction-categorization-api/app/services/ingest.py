@@ -0,0 +1,247 @@
+# Bulk transaction ingestion logic is defined in this file
+# Rows are validated, categorized in batches and written with multi-row inserts
+import json
+from collections import defaultdict
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.db.shards import begin_write, is_partitioned, is_year_writable, reserve_shard_ids, write_session
+from app.models.archive_segment import ArchivedExternalId
+from app.models.transaction import Transaction
+from app.schemas.transaction import BulkRowResult, TransactionCreate
+from app.services.categorizer import categorize_merchants, get_rule_engine
+from app.services.changes import allocate_change_seqs
+from app.services.merchant_sketches import record_inserted_sketches
+from app.services.money import to_cents
+from app.services.rollups import record_inserted_rows
+
+
+def decode_ndjson_line(line: bytes) -> object:
+    # Lines that are not valid JSON are passed on as errors
+    try:
+        return json.loads(line)
+    except ValueError as exc:
+        return exc
+
+
+def insert_transaction_rows(db: Session, rows: list[dict]) -> list[int]:
+    # Nothing is written for an empty chunk
+    if not rows:
+        return []
+
+    # Partitioned storage writes each year's rows to its own shard
+    if is_partitioned(db):
+        return insert_partitioned_rows(db, rows)
+
+    # Rows take consecutive change numbers in chunk order
+    first_seq = allocate_change_seqs(db, len(rows))
+    for offset, row in enumerate(rows):
+        row["change_seq"] = first_seq + offset
+
+    # Ids are assigned explicitly, since SQLite would reuse the ids of archived rows
+    # The database itself is reserved as year 0, whose id block starts at 1
+    first_id = reserve_shard_ids(db, 0)
+    ids = list(range(first_id, first_id + len(rows)))
+
+    # Rows are written by one cached executemany statement, sent as batched multi-row INSERTs
+    # Compiling a multi-row VALUES clause for every chunk cost more than the inserts themselves
+    db.execute(insert(Transaction), [{"id": row_id, **row} for row_id, row in zip(ids, rows)])
+
+    # Monthly rollups and merchant sketches are updated in the same transaction
+    record_inserted_rows(db, rows)
+    record_inserted_sketches(db, rows)
+
+    return ids
+
+
+def insert_partitioned_rows(db: Session, rows: list[dict]) -> list[int]:
+    # Row positions are grouped by the year of their date
+    positions_by_year: dict[int, list[int]] = defaultdict(list)
+    for position, row in enumerate(rows):
+        positions_by_year[row["date"].year].append(position)
+
+    # Ids are assigned explicitly from each shard's id block
+    # Shards are locked in year order, and the main database only after them
+    ids = [0] * len(rows)
+    for year, positions in sorted(positions_by_year.items()):
+        first_id = reserve_shard_ids(write_session(db, year), year)
+        for offset, position in enumerate(positions):
+            ids[position] = first_id + offset
+
+    # Rows take consecutive change numbers in chunk order, whatever their shard
+    first_seq = allocate_change_seqs(db, len(rows))
+    for offset, row in enumerate(rows):
+        row["change_seq"] = first_seq + offset
+
+    for year, positions in sorted(positions_by_year.items()):
+        shard_db = write_session(db, year)
+        year_rows = [{"id": ids[position], **rows[position]} for position in positions]
+
+        # Rows, their monthly rollups and merchant sketches are written in the shard's transaction
+        # Ids are known up front, so no RETURNING is needed and one cached executemany statement is used
+        shard_db.execute(insert(Transaction), year_rows)
+        record_inserted_rows(shard_db, year_rows)
+        record_inserted_sketches(shard_db, year_rows)
+
+    return ids
+
+
+def find_external_rows(db: Session, external_ids: list[str]) -> dict[str, dict]:
+    # Each id is probed in the unique external id index, so a lookup stays logarithmic in the table size
+    rows = db.execute(
+        select(
+            Transaction.id,
+            Transaction.amount_cents,
+            Transaction.merchant,
+            Transaction.category,
+            Transaction.date,
+            Transaction.external_id,
+            Transaction.rules_version,
+        ).where(Transaction.external_id.in_(external_ids))
+    )
+    stored = {row.external_id: row._asdict() for row in rows}
+
+    # Ids not found may belong to archived rows, whose external ids stay reserved after they left the table
+    missing = [external_id for external_id in external_ids if external_id not in stored]
+    if missing:
+        archived_rows = db.execute(
+            select(
+                ArchivedExternalId.transaction_id.label("id"),
+                ArchivedExternalId.amount_cents,
+                ArchivedExternalId.merchant,
+                ArchivedExternalId.category,
+                ArchivedExternalId.date,
+                ArchivedExternalId.external_id,
+                ArchivedExternalId.rules_version,
+            ).where(ArchivedExternalId.external_id.in_(missing))
+        )
+        stored.update((row.external_id, row._asdict()) for row in archived_rows)
+    return stored
+
+
+def same_transaction(row: dict, stored: dict) -> bool:
+    # A retried row repeats the amount, merchant and date it was stored with
+    # Its category may differ when the rules changed in between
+    return (row["amount_cents"], row["merchant"], row["date"]) == (
+        stored["amount_cents"],
+        stored["merchant"],
+        stored["date"],
+    )
+
+
+def insert_unique_rows(db: Session, rows: list[dict]) -> list[tuple[dict, bool]]:
+    # Rows carrying an external id that is already stored are answered with the stored row
+    # Stored rows of the given external ids are collected first
+    stored: dict[str, dict] = {}
+    external_ids_by_year: dict[int, list[str]] = defaultdict(list)
+    for row in rows:
+        if row.get("external_id") is not None:
+            external_ids_by_year[row["date"].year if is_partitioned(db) else 0].append(row["external_id"])
+    for year, external_ids in external_ids_by_year.items():
+        # The write lock is taken before the lookup, so no other writer stores one of these ids before the commit
+        # With partitioning only the shard of the row's year is searched
+        session = write_session(db, year)
+        begin_write(session)
+        stored.update(find_external_rows(session, external_ids))
+
+    # Rows are inserted unless their external id is stored or repeats an earlier row of the chunk
+    results: list[tuple[dict, bool] | None] = [None] * len(rows)
+    first_positions: dict[str, int] = {}
+    new_positions: list[int] = []
+    for position, row in enumerate(rows):
+        external_id = row.get("external_id")
+        if external_id is not None:
+            if external_id in stored:
+                results[position] = (stored[external_id], False)
+                continue
+            if external_id in first_positions:
+                continue
+            first_positions[external_id] = position
+        new_positions.append(position)
+
+    ids = insert_transaction_rows(db, [rows[position] for position in new_positions])
+    for position, row_id in zip(new_positions, ids):
+        results[position] = ({"id": row_id, **rows[position]}, True)
+
+    # Repeats inside the chunk are answered with the row stored for the first occurrence
+    for position, row in enumerate(rows):
+        if results[position] is None:
+            results[position] = (results[first_positions[row["external_id"]]][0], False)
+
+    # Each row's stored transaction is returned with whether it was inserted now
+    return results
+
+
+def ingest_chunk(
+    db: Session,
+    raw_rows: list[tuple[int, object]],
+    idempotency_key: str | None = None,
+) -> list[BulkRowResult]:
+    # Outcomes are collected per submitted row
+    results: list[BulkRowResult] = []
+
+    # Valid rows are collected with their result slot
+    valid_rows: list[tuple[BulkRowResult, TransactionCreate]] = []
+
+    # Each raw row is validated against the creation schema
+    for index, raw_row in raw_rows:
+        row_result = BulkRowResult(index=index)
+        results.append(row_result)
+
+        # Rows that could not be decoded are rejected
+        if isinstance(raw_row, Exception):
+            row_result.error = f"invalid JSON: {raw_row}"
+            continue
+
+        try:
+            row = TransactionCreate.model_validate(raw_row)
+        except ValidationError as exc:
+            row_result.error = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+                for error in exc.errors()
+            )
+            continue
+
+        # Rows dated in a read-only shard are rejected
+        if not is_year_writable(db, row.date.year):
+            row_result.error = f"date: transactions dated {row.date.year} are archived read-only"
+            continue
+
+        valid_rows.append((row_result, row))
+
+    # Categories are computed for the whole chunk at once
+    # Active rules are read once, so a reload never splits a chunk between rule versions
+    rule_engine = get_rule_engine()
+    categorizations = categorize_merchants([row.merchant for _, row in valid_rows], rule_engine)
+
+    # Insert parameters are built for the valid rows
+    # Rows without an external id of their own are keyed by the request's idempotency key and their position
+    insert_rows = [
+        {
+            "amount_cents": to_cents(row.amount),
+            "merchant": row.merchant,
+            "category": categorization.category,
+            "date": row.date,
+            "external_id": row.external_id
+            or (f"{idempotency_key}:{row_result.index}" if idempotency_key is not None else None),
+            "rules_version": rule_engine.version,
+            "category_source": categorization.source,
+        }
+        for (row_result, row), categorization in zip(valid_rows, categorizations)
+    ]
+
+    # Valid rows are written, or matched with the stored row of their external id, and their ids recorded
+    stored_rows = insert_unique_rows(db, insert_rows)
+    for (row_result, _), row, (stored, inserted) in zip(valid_rows, insert_rows, stored_rows):
+        # An external id stored for a different transaction is reported instead of overwritten
+        if not inserted and not same_transaction(row, stored):
+            row_result.error = f"external_id: {row['external_id']} is already used by transaction {stored['id']}"
+            continue
+        row_result.id = stored["id"]
+        row_result.category = stored["category"]
+        row_result.duplicate = not inserted
+
+    # Per-row outcomes are returned in submission order
+    return results
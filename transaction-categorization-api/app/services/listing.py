@@ -0,0 +1,289 @@
+# Transaction listing helpers are defined in this file
+# Keyset cursors and streamed NDJSON output keep memory flat for any range size
+import base64
+import csv
+import io
+import json
+import zlib
+from collections.abc import Callable, Iterable, Iterator
+from datetime import date
+from itertools import islice
+
+from sqlalchemy import Row, Select, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.responses import dumps_json
+from app.db.session import SessionLocal
+from app.db.shards import shard_sessions
+from app.models.transaction import Transaction
+from app.services.archive import ArchivedRow, find_segments, iter_archived_rows, merge_archived_rows
+from app.services.money import cents_to_float, from_cents
+
+# Header row written at the top of CSV exports
+CSV_HEADER = ("id", "amount", "merchant", "category", "date")
+
+# Range of SQLite's 64-bit signed integers, which every id falls in
+SQLITE_MIN_INTEGER = -(1 << 63)
+SQLITE_MAX_INTEGER = (1 << 63) - 1
+
+# Columns returned by the listing endpoints, in response order
+LIST_COLUMNS = (
+    Transaction.id,
+    Transaction.amount_cents,
+    Transaction.merchant,
+    Transaction.category,
+    Transaction.date,
+)
+
+
+def encode_cursor(row_date: date, row_id: int) -> str:
+    # Sort key of the last returned row is packed into an opaque token
+    payload = json.dumps([row_date.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[date, int]:
+    # Token is unpacked back into its (date, id) sort key
+    # Any malformed token is reported as a ValueError
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        row_date, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        row_date = date.fromisoformat(row_date)
+    except (TypeError, ValueError, OverflowError) as exc:
+        raise ValueError("Invalid pagination cursor") from exc
+
+    # Ids are SQLite integers, so floats, booleans and values outside 64 bits are refused
+    if type(row_id) is not int or not SQLITE_MIN_INTEGER <= row_id <= SQLITE_MAX_INTEGER:
+        raise ValueError("Invalid pagination cursor")
+    return row_date, row_id
+
+
+def transaction_list_statement(
+    start: date | None = None,
+    end: date | None = None,
+    after: tuple[date, int] | None = None,
+    columns: Iterable = (Transaction,),
+) -> Select:
+    # Rows are always returned in (date, id) order
+    statement = select(*columns).order_by(Transaction.date, Transaction.id)
+
+    # Start date filter is applied if provided
+    if start is not None:
+        statement = statement.where(Transaction.date >= start)
+
+    # End date filter is applied if provided
+    if end is not None:
+        statement = statement.where(Transaction.date <= end)
+
+    # Rows up to and including the cursor position are skipped
+    if after is not None:
+        statement = statement.where(tuple_(Transaction.date, Transaction.id) > tuple_(*after))
+
+    return statement
+
+
+def shard_years(
+    start: date | None = None,
+    end: date | None = None,
+    after: tuple[date, int] | None = None,
+) -> tuple[int | None, int | None]:
+    # First and last year a (date, id) ordered range can reach
+    # Shards outside these years are never opened
+    lower = max((bound for bound in (start, after[0] if after else None) if bound), default=None)
+    return (lower.year if lower else None, end.year if end else None)
+
+
+def page_statement(statement: Select, archived: list, remaining: int | None) -> Select:
+    # Stored rows are fetched only up to the rows still missing from the page
+    # A full page of archived rows leaves only the stored rows sorting before its last row to be fetched
+    if remaining is None:
+        return statement
+    statement = statement.limit(remaining)
+    if len(archived) == remaining:
+        statement = statement.where(
+            tuple_(Transaction.date, Transaction.id) < tuple_(archived[-1].date, archived[-1].id)
+        )
+    return statement
+
+
+def next_page_cursor(rows: list, limit: int | None) -> str | None:
+    # Cursor for the next page is returned when the page is full
+    if limit is None or len(rows) < limit:
+        return None
+    return encode_cursor(rows[-1].date, rows[-1].id)
+
+
+def fetch_from_shards(
+    db: Session,
+    statement: Select,
+    bounds: tuple[date | None, date | None, tuple[date, int] | None],
+    limit: int | None,
+    fetch: Callable[[Session, Select], Iterable],
+    from_archive: Callable[[ArchivedRow], object],
+) -> list:
+    # Shards hold disjoint years and are read in year order, so their rows follow the global order
+    # Reading stops at the first shard that completes the page
+    results: list = []
+    for _, session in shard_sessions(db, *shard_years(*bounds)):
+        remaining = None if limit is None else limit - len(results)
+
+        # Archived months of the shard are merged in only when the range reaches them
+        segments = find_segments(session, *bounds)
+        if not segments:
+            results.extend(fetch(session, page_statement(statement, [], remaining)))
+        else:
+            # Archived rows are taken first, as they cost no query
+            archived = list(islice(map(from_archive, iter_archived_rows(segments, *bounds)), remaining))
+            shard_statement = page_statement(statement, archived, remaining)
+            results.extend(merge_archived_rows(fetch(session, shard_statement), archived, remaining))
+        if limit is not None and len(results) >= limit:
+            break
+    return results
+
+
+def archived_transaction(row: ArchivedRow) -> Transaction:
+    # Archived rows are returned as detached objects that are never added to a session
+    return Transaction(**row._asdict())
+
+
+def fetch_transaction_page(
+    db: Session,
+    start: date | None = None,
+    end: date | None = None,
+    after: tuple[date, int] | None = None,
+    limit: int | None = None,
+) -> tuple[list[Transaction], str | None]:
+    # Keyset ordered query is built for the requested range
+    statement = transaction_list_statement(start, end, after)
+
+    # A single page is fetched from the shards covering the range when a limit is given
+    transactions = fetch_from_shards(
+        db,
+        statement,
+        (start, end, after),
+        limit,
+        lambda session, page: session.scalars(page),
+        archived_transaction,
+    )
+
+    # Cursor for the next page is returned when the page is full
+    return transactions, next_page_cursor(transactions, limit)
+
+
+def fetch_transaction_rows(
+    db: Session,
+    start: date | None = None,
+    end: date | None = None,
+    after: tuple[date, int] | None = None,
+    limit: int | None = None,
+) -> tuple[list[Row], str | None]:
+    # Only the listed columns are selected, so no ORM objects are built
+    statement = transaction_list_statement(start, end, after, LIST_COLUMNS)
+
+    # A single page is fetched from the shards covering the range when a limit is given
+    # Archived rows already have the shape of the selected columns
+    rows = fetch_from_shards(
+        db,
+        statement,
+        (start, end, after),
+        limit,
+        lambda session, page: session.execute(page).all(),
+        lambda row: row,
+    )
+
+    # Cursor for the next page is returned when the page is full
+    return rows, next_page_cursor(rows, limit)
+
+
+def transaction_rows_content(rows: Iterable) -> list[dict]:
+    # Column tuples are shaped like TransactionRead without per-row validation
+    # Amounts are written as numbers and dates in ISO format, as the model serializes them
+    return [
+        {
+            "id": row_id,
+            "amount": cents_to_float(amount_cents),
+            "merchant": merchant,
+            "category": category,
+            "date": row_date.isoformat(),
+        }
+        for row_id, amount_cents, merchant, category, row_date in rows
+    ]
+
+
+def iter_transaction_rows(
+    start: date | None = None,
+    end: date | None = None,
+    after: tuple[date, int] | None = None,
+    chunk_size: int = 1000,
+) -> Iterator:
+    # A dedicated session lives as long as the response stream
+    with SessionLocal() as db:
+        statement = transaction_list_statement(start, end, after, LIST_COLUMNS)
+
+        # Shards covering the range are streamed one after another in year order
+        for _, session in shard_sessions(db, *shard_years(start, end, after)):
+            # Archived months of the shard the range reaches are looked up before streaming starts
+            segments = find_segments(session, start, end, after)
+
+            # Rows are fetched from the cursor in fixed size partitions
+            result = session.execute(statement.execution_options(yield_per=chunk_size))
+            rows = (row for partition in result.partitions() for row in partition)
+
+            # Archived rows are merged into the stream in (date, id) order
+            if segments:
+                rows = merge_archived_rows(rows, iter_archived_rows(segments, start, end, after))
+            yield from rows
+
+
+def encode_ndjson(rows: Iterable) -> bytes:
+    # Rows are encoded directly without per-row model validation
+    return b"".join(dumps_json(content) + b"\n" for content in transaction_rows_content(rows))
+
+
+def ndjson_chunks(rows: Iterable, rows_per_chunk: int = 1000) -> Iterator[bytes]:
+    # Rows are grouped so each yielded chunk holds a bounded number of lines
+    batch: list = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= rows_per_chunk:
+            yield encode_ndjson(batch)
+            batch = []
+
+    # Remaining rows are flushed
+    if batch:
+        yield encode_ndjson(batch)
+
+
+def csv_chunks(rows: Iterable, rows_per_chunk: int = 1000) -> Iterator[bytes]:
+    # Rows are written to a small reusable text buffer one chunk at a time
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+
+    pending = 0
+    for row_id, amount_cents, merchant, category, row_date in rows:
+        writer.writerow((row_id, from_cents(amount_cents), merchant, category, row_date.isoformat()))
+        pending += 1
+
+        # Buffered rows are emitted and the buffer is reset
+        if pending >= rows_per_chunk:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    # Remaining rows, or only the header for an empty export, are emitted
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    # Chunks are compressed on the fly into a single gzip stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+
+    # Remaining compressed bytes and the gzip trailer are emitted
+    yield compressor.flush()
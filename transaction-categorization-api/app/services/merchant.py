@@ -0,0 +1,33 @@
+# Merchant name normalization is defined in this file
+# Normalized names are used as cache keys and as rule engine input
+import re
+
+# Runs of punctuation, whitespace and underscores separate tokens
+_SEPARATORS = re.compile(r"[\W_]+")
+
+# Runs of letters inside a token that also contains digits
+_LETTER_RUNS = re.compile(r"[^\W\d_]+")
+
+# Shortest letter run kept from a token that contains digits
+_MIN_RUN_LENGTH = 3
+
+
+def normalize_merchant(merchant: str) -> str:
+    # Merchant name is lowercased and split on punctuation
+    tokens = []
+    for token in _SEPARATORS.split(merchant.lower()):
+        # Empty tokens left by leading or trailing separators are skipped
+        if not token:
+            continue
+
+        # Purely alphabetic tokens are kept as they are
+        if token.isalpha():
+            tokens.append(token)
+            continue
+
+        # Digits in a token are store numbers or reference ids and are dropped
+        # Words around them such as "uber" in "uber123" or "ab12uber" are kept, shorter letter runs are id noise
+        tokens.extend(run for run in _LETTER_RUNS.findall(token) if len(run) >= _MIN_RUN_LENGTH)
+
+    # Remaining tokens are joined with single spaces
+    return " ".join(tokens)
@@ -0,0 +1,271 @@
+# Monthly merchant sketch maintenance is defined in this file
+# Sketches are read and rewritten after the rows they describe, so the transaction already holds the write lock
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from datetime import date
+from itertools import chain
+
+from sqlalchemy import Connection, delete, func, insert, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.merchant_sketch import MonthlyMerchantSketch, MonthlyTopMerchantCounter, MonthlyTopMerchants
+from app.models.transaction import Transaction
+from app.services.archive import iter_archived_merchants
+from app.services.merchant import normalize_merchant
+from app.services.months import month_key
+from app.services.sketches import HyperLogLog, SpaceSaving, merchant_hash
+
+# Upserts are built once, since building the excluded columns costs more than executing them for single rows
+# Transaction counts and counters are added to, so a month or merchant seen for the first time is inserted
+_top_merchants_upsert = sqlite_insert(MonthlyTopMerchants)
+_top_merchants_upsert = _top_merchants_upsert.on_conflict_do_update(
+    index_elements=[MonthlyTopMerchants.month],
+    set_={
+        "transaction_count": MonthlyTopMerchants.transaction_count
+        + _top_merchants_upsert.excluded.transaction_count,
+    },
+)
+_counter_upsert = sqlite_insert(MonthlyTopMerchantCounter)
+_counter_upsert = _counter_upsert.on_conflict_do_update(
+    index_elements=[MonthlyTopMerchantCounter.month, MonthlyTopMerchantCounter.merchant],
+    set_={"count": MonthlyTopMerchantCounter.count + _counter_upsert.excluded.count},
+)
+_merchant_sketch_upsert = sqlite_insert(MonthlyMerchantSketch)
+_merchant_sketch_upsert = _merchant_sketch_upsert.on_conflict_do_update(
+    index_elements=[MonthlyMerchantSketch.month, MonthlyMerchantSketch.category],
+    set_={"registers": _merchant_sketch_upsert.excluded.registers},
+)
+
+
+def load_top_merchants(db: Session | Connection, start: str, end: str) -> list[tuple[int, SpaceSaving]]:
+    # Transaction counts and sketches of the months in the range are read with all their counters
+    sketches = {
+        month: (transaction_count, SpaceSaving(settings.top_merchant_capacity, floor=floor_count))
+        for month, transaction_count, floor_count in db.execute(
+            select(
+                MonthlyTopMerchants.month,
+                MonthlyTopMerchants.transaction_count,
+                MonthlyTopMerchants.floor_count,
+            )
+            .where(MonthlyTopMerchants.month >= start, MonthlyTopMerchants.month <= end)
+            .order_by(MonthlyTopMerchants.month)
+        )
+    }
+    for month, merchant, count, error in db.execute(
+        select(
+            MonthlyTopMerchantCounter.month,
+            MonthlyTopMerchantCounter.merchant,
+            MonthlyTopMerchantCounter.count,
+            MonthlyTopMerchantCounter.error,
+        ).where(MonthlyTopMerchantCounter.month >= start, MonthlyTopMerchantCounter.month <= end)
+    ):
+        sketches[month][1].counters[merchant] = [count, error]
+    return list(sketches.values())
+
+
+def admit_new_merchants(db: Session | Connection, month: str, weights: dict[str, int]) -> None:
+    # Free counter slots of the month and its floor are read
+    counter_count = db.execute(
+        select(func.count()).where(MonthlyTopMerchantCounter.month == month)
+    ).scalar_one()
+    floor = db.execute(
+        select(MonthlyTopMerchants.floor_count).where(MonthlyTopMerchants.month == month)
+    ).scalar_one_or_none() or 0
+    free = max(settings.top_merchant_capacity - counter_count, 0)
+
+    # Each merchant beyond the free slots evicts at most one counter, so only that many of the smallest are read
+    smallest = {
+        merchant: [count, error]
+        for merchant, count, error in db.execute(
+            select(MonthlyTopMerchantCounter.merchant, MonthlyTopMerchantCounter.count, MonthlyTopMerchantCounter.error)
+            .where(MonthlyTopMerchantCounter.month == month)
+            .order_by(MonthlyTopMerchantCounter.count, MonthlyTopMerchantCounter.merchant)
+            .limit(max(len(weights) - free, 0))
+        )
+    }
+
+    # The sketch update runs on the smallest counters and the free slots alone
+    # Every counter it can evict is among them, so it admits and evicts exactly as on the full sketch
+    sketch = SpaceSaving(len(smallest) + free, dict(smallest), floor)
+    sketch.update(weights)
+
+    # Evicted counters are removed and admitted merchants stored
+    evicted = [merchant for merchant in smallest if merchant not in sketch.counters]
+    if evicted:
+        db.execute(
+            delete(MonthlyTopMerchantCounter).where(
+                MonthlyTopMerchantCounter.month == month, MonthlyTopMerchantCounter.merchant.in_(evicted)
+            )
+        )
+    admitted = [
+        {"month": month, "merchant": merchant, "count": count, "error": error}
+        for merchant, (count, error) in sketch.counters.items()
+        if merchant not in smallest
+    ]
+    if admitted:
+        db.execute(insert(MonthlyTopMerchantCounter), admitted)
+    if sketch.floor != floor:
+        db.execute(
+            update(MonthlyTopMerchants).where(MonthlyTopMerchants.month == month).values(floor_count=sketch.floor)
+        )
+
+
+def update_top_merchants(db: Session | Connection, weights_by_month: dict[str, Counter]) -> None:
+    # Nothing is written when no rows were added
+    if not weights_by_month:
+        return
+
+    # Transaction counts of the touched months are increased in place
+    db.execute(
+        _top_merchants_upsert,
+        [
+            {"month": month, "transaction_count": sum(weights.values()), "floor_count": 0}
+            for month, weights in weights_by_month.items()
+        ],
+    )
+
+    # Counters of the merchants already tracked are found in one query over the primary key
+    tracked = {
+        (month, merchant)
+        for month, merchant in db.execute(
+            select(MonthlyTopMerchantCounter.month, MonthlyTopMerchantCounter.merchant).where(
+                tuple_(MonthlyTopMerchantCounter.month, MonthlyTopMerchantCounter.merchant).in_(
+                    [(month, merchant) for month, weights in weights_by_month.items() for merchant in weights]
+                )
+            )
+        )
+    }
+
+    # Tracked counters are increased in place, other counters of the month are not read or written
+    increments = [
+        {"month": month, "merchant": merchant, "count": weight, "error": 0}
+        for month, weights in weights_by_month.items()
+        for merchant, weight in weights.items()
+        if (month, merchant) in tracked
+    ]
+    if increments:
+        db.execute(_counter_upsert, increments)
+
+    # Untracked merchants take free slots or evict the smallest counters of their month
+    for month, weights in weights_by_month.items():
+        new_weights = {merchant: weight for merchant, weight in weights.items() if (month, merchant) not in tracked}
+        if new_weights:
+            admit_new_merchants(db, month, new_weights)
+
+
+def update_distinct_merchants(
+    db: Session | Connection,
+    merchants_by_key: dict[tuple[str, str], set[str]],
+) -> None:
+    # Nothing is written when no rows were added
+    if not merchants_by_key:
+        return
+
+    # Stored registers of the touched months are read in one query
+    stored = {
+        (month, category): registers
+        for month, category, registers in db.execute(
+            select(
+                MonthlyMerchantSketch.month,
+                MonthlyMerchantSketch.category,
+                MonthlyMerchantSketch.registers,
+            ).where(MonthlyMerchantSketch.month.in_({month for month, _ in merchants_by_key}))
+        )
+    }
+
+    # Merchants are added to the sketch of their month and category
+    # Known merchants rarely raise a register, so unchanged sketches are not written back
+    changes = []
+    for (month, category), merchants in merchants_by_key.items():
+        registers = stored.get((month, category))
+        sketch = HyperLogLog(registers)
+        changed = registers is None
+        for merchant in merchants:
+            changed |= sketch.add(merchant_hash(merchant))
+        if changed:
+            changes.append({"month": month, "category": category, "registers": bytes(sketch.registers)})
+    if not changes:
+        return
+
+    # Changed registers replace the stored ones
+    db.execute(_merchant_sketch_upsert, changes)
+
+
+def record_sketch_rows(
+    db: Session | Connection,
+    rows: Iterable[tuple[date, str, str]],
+    counted: bool = True,
+) -> None:
+    # Rows given as (date, merchant, category) are grouped by month
+    # Merchant names are normalized once per distinct spelling
+    normalized: dict[str, str] = {}
+    weights_by_month: dict[str, Counter] = defaultdict(Counter)
+    merchants_by_key: dict[tuple[str, str], set[str]] = defaultdict(set)
+    for row_date, merchant, category in rows:
+        name = normalized.get(merchant)
+        if name is None:
+            name = normalized[merchant] = normalize_merchant(merchant)
+        month = month_key(row_date)
+        weights_by_month[month][name] += 1
+        merchants_by_key[(month, category)].add(name)
+
+    # Merchant counts only change for new rows, moved rows only join another category
+    if counted:
+        update_top_merchants(db, weights_by_month)
+    update_distinct_merchants(db, merchants_by_key)
+
+
+def record_inserted_sketches(db: Session | Connection, rows: list[dict]) -> None:
+    # Inserted rows are counted and added to the distinct merchants of their category
+    record_sketch_rows(db, ((row["date"], row["merchant"], row["category"]) for row in rows))
+
+
+def rebuild_merchant_sketches(db: Session | Connection) -> None:
+    # Exact merchant counts per month and category are read in one grouped scan
+    month_expr = func.strftime("%Y-%m", Transaction.date)
+    grouped_rows = db.execute(
+        select(month_expr, Transaction.category, Transaction.merchant, func.count()).group_by(
+            month_expr, Transaction.category, Transaction.merchant
+        )
+    )
+
+    # Archived rows are counted from the merchant and category columns of their segments
+    grouped_rows = chain(grouped_rows, iter_archived_merchants(db))
+
+    # Counts are summed per normalized merchant
+    normalized: dict[str, str] = {}
+    counts_by_month: dict[str, Counter] = defaultdict(Counter)
+    merchants_by_key: dict[tuple[str, str], set[str]] = defaultdict(set)
+    for month, category, merchant, count in grouped_rows:
+        name = normalized.get(merchant)
+        if name is None:
+            name = normalized[merchant] = normalize_merchant(merchant)
+        counts_by_month[month][name] += count
+        merchants_by_key[(month, category)].add(name)
+
+    # Stored sketches are replaced with sketches built from the exact counts
+    db.execute(delete(MonthlyTopMerchants))
+    db.execute(delete(MonthlyTopMerchantCounter))
+    db.execute(delete(MonthlyMerchantSketch))
+    if counts_by_month:
+        top_rows = []
+        counter_rows = []
+        for month, counts in counts_by_month.items():
+            sketch = SpaceSaving.from_exact(settings.top_merchant_capacity, counts)
+            top_rows.append({"month": month, "transaction_count": sum(counts.values()), "floor_count": sketch.floor})
+            counter_rows.extend(
+                {"month": month, "merchant": merchant, "count": count, "error": error}
+                for merchant, (count, error) in sketch.counters.items()
+            )
+        db.execute(insert(MonthlyTopMerchants), top_rows)
+        db.execute(insert(MonthlyTopMerchantCounter), counter_rows)
+
+        sketch_rows = []
+        for (month, category), merchants in merchants_by_key.items():
+            sketch = HyperLogLog()
+            for merchant in merchants:
+                sketch.add(merchant_hash(merchant))
+            sketch_rows.append({"month": month, "category": category, "registers": bytes(sketch.registers)})
+        db.execute(insert(MonthlyMerchantSketch), sketch_rows)
@@ -0,0 +1,25 @@
+# Money conversion helpers are defined in this file
+# Amounts are stored as integer cents and exposed as decimals at the API edge
+from decimal import ROUND_HALF_EVEN, Decimal
+
+# Number of minor units in one major unit
+CENTS_PER_UNIT = 100
+
+# Quantum used when rounding amounts to whole cents
+CENT = Decimal("0.01")
+
+
+def to_cents(amount: Decimal | int | float | str) -> int:
+    # Amount is rounded to whole cents with banker's rounding
+    return int((Decimal(str(amount)) * CENTS_PER_UNIT).to_integral_value(ROUND_HALF_EVEN))
+
+
+def from_cents(cents: int) -> Decimal:
+    # Integer cents are converted back to an exact decimal amount
+    return (Decimal(cents) / CENTS_PER_UNIT).quantize(CENT)
+
+
+def cents_to_float(cents: int) -> float:
+    # Cents are converted to the nearest float for JSON output
+    # Dividing an integer by 100 gives the shortest round-tripping decimal representation
+    return cents / CENTS_PER_UNIT
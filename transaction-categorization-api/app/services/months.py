@@ -0,0 +1,45 @@
+# Calendar month helpers are defined in this file
+# Months are handled as half-open date ranges so date columns stay index friendly
+from datetime import date
+
+# Pattern accepted for month parameters
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+
+def parse_month(month: str) -> date:
+    # Month string in YYYY-MM form is converted to its first day
+    year, month_number = month.split("-")
+    return date(int(year), int(month_number), 1)
+
+
+def next_month(first_day: date) -> date:
+    # First day of the following month is returned
+    if first_day.month == 12:
+        return date(first_day.year + 1, 1, 1)
+    return date(first_day.year, first_day.month + 1, 1)
+
+
+def month_bounds(month: str) -> tuple[date, date]:
+    # Inclusive start and exclusive end of the month are returned
+    first_day = parse_month(month)
+    return first_day, next_month(first_day)
+
+
+def month_key(day: date) -> str:
+    # Date is reduced to its YYYY-MM month key
+    return f"{day.year:04d}-{day.month:02d}"
+
+
+def shift_months(first_day: date, months: int) -> date:
+    # First day of the month the given number of months away is returned
+    index = first_day.year * 12 + first_day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_keys_between(start: str, end: str) -> list[str]:
+    # Month keys from start to end inclusive are listed in order
+    # Months are counted by index, so the month after the last is never built and 9999-12 can end a range
+    first, last = parse_month(start), parse_month(end)
+    first_index = first.year * 12 + first.month - 1
+    last_index = last.year * 12 + last.month - 1
+    return [f"{index // 12:04d}-{index % 12 + 1:02d}" for index in range(first_index, last_index + 1)]
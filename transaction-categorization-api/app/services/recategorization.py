@@ -0,0 +1,204 @@
+# Background re-categorization of stored transactions is defined in this file
+# The table is walked in id order and every chunk is written back in its own short transaction
+# With partitioning the writable year shards are walked one after another
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.db.shards import is_year_writable, shard_sessions, write_session
+from app.models.recategorization_job import RecategorizationJob
+from app.models.transaction import Transaction
+from app.services.categorizer import categorize_merchants, get_rule_engine
+from app.services.changes import allocate_change_seqs
+from app.services.merchant_sketches import record_sketch_rows
+from app.services.rollups import apply_rollup_deltas, merge_deltas, rollup_deltas
+
+# Ids of the jobs currently being processed by this process
+_active_jobs: set[int] = set()
+_active_jobs_lock = threading.Lock()
+
+
+class RecategorizationAlreadyRunning(Exception):
+    # Raised when a job is started while it is already running
+    pass
+
+
+def is_recategorization_running(job_id: int) -> bool:
+    # Jobs claimed by a worker of this process are reported as running
+    with _active_jobs_lock:
+        return job_id in _active_jobs
+
+
+def create_recategorization_job(db: Session) -> RecategorizationJob:
+    # The job covers every row that exists now
+    # Rows inserted afterwards are categorized with the current rules on the way in
+    # Read-only shards cannot be rewritten and are not covered
+    target_id, total_rows = 0, 0
+    for year, session in shard_sessions(db):
+        if not is_year_writable(db, year):
+            continue
+        shard_max_id, shard_rows = session.execute(
+            select(func.max(Transaction.id), func.count(Transaction.id))
+        ).one()
+        target_id = max(target_id, shard_max_id or 0)
+        total_rows += shard_rows
+    job = RecategorizationJob(
+        status="pending",
+        target_id=target_id,
+        total_rows=total_rows,
+        checkpoint_year=0,
+        checkpoint_id=0,
+        rows_scanned=0,
+        rows_changed=0,
+        elapsed_seconds=0.0,
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def recategorize_chunk(db: Session, rows: list[tuple[int, str, str]], year: int = 0) -> int:
+    # Rows are rewritten in the shard of their year, change numbers come from the main database
+    shard_db = write_session(db, year)
+
+    # Rows of the chunk are categorized in one batch with the current rules
+    # Active rules are read once, so every moved row records the same rules version
+    rule_engine = get_rule_engine()
+    categorizations = categorize_merchants([merchant for _, merchant, _ in rows], rule_engine)
+
+    # Changed rows are grouped by their old and new category and the source of the new one
+    # Each group is rewritten by a single UPDATE
+    changed: dict[tuple[str, str, str], list[int]] = defaultdict(list)
+    for (transaction_id, _, old_category), (new_category, source) in zip(rows, categorizations):
+        if new_category != old_category:
+            changed[(old_category, new_category, source)].append(transaction_id)
+
+    # A row is only rewritten while it still holds the category it was read with
+    # The returned rows are exactly the ones moved, so rollups follow them precisely
+    # Moved rows record the rules version that moved them and the source of their category, unchanged rows are not rewritten
+    deltas = []
+    moved_merchants = []
+    moved_ids = []
+    rows_changed = 0
+    for (old_category, new_category, source), transaction_ids in changed.items():
+        moved = shard_db.execute(
+            update(Transaction)
+            .where(Transaction.id.in_(transaction_ids), Transaction.category == old_category)
+            .values(category=new_category, rules_version=rule_engine.version, category_source=source)
+            .returning(Transaction.id, Transaction.date, Transaction.amount_cents, Transaction.merchant)
+            .execution_options(synchronize_session=False)
+        ).all()
+        deltas.append(rollup_deltas(((row_date, old_category, cents) for _, row_date, cents, _ in moved), sign=-1))
+        deltas.append(rollup_deltas((row_date, new_category, cents) for _, row_date, cents, _ in moved))
+        moved_merchants.extend((row_date, merchant, new_category) for _, row_date, _, merchant in moved)
+        moved_ids.extend(transaction_id for transaction_id, _, _, _ in moved)
+        rows_changed += len(moved)
+
+    # Moved rows take new change numbers, so change feed clients fetch their new category
+    if moved_ids:
+        first_seq = allocate_change_seqs(db, len(moved_ids))
+        shard_db.execute(
+            update(Transaction).execution_options(synchronize_session=False),
+            [{"id": transaction_id, "change_seq": first_seq + offset} for offset, transaction_id in enumerate(moved_ids)],
+        )
+
+    # Moved amounts leave their old category and join the new one in the same transaction
+    apply_rollup_deltas(shard_db, merge_deltas(*deltas))
+
+    # Moved merchants join the distinct merchants of their new category
+    # Sketches cannot forget a merchant, so the old category keeps counting it until sketches are rebuilt
+    record_sketch_rows(shard_db, moved_merchants, counted=False)
+    return rows_changed
+
+
+def run_recategorization(
+    job_id: int,
+    session_factory=SessionLocal,
+    chunk_size: int | None = None,
+    on_progress: Callable[[RecategorizationJob], None] | None = None,
+) -> str:
+    # Default chunk size comes from the settings
+    chunk_size = chunk_size or settings.recategorize_chunk_size
+
+    # A job is only processed by one worker of this process at a time
+    with _active_jobs_lock:
+        if job_id in _active_jobs:
+            raise RecategorizationAlreadyRunning(f"Re-categorization job {job_id} is already running")
+        _active_jobs.add(job_id)
+
+    try:
+        with session_factory() as db:
+            job = db.get(RecategorizationJob, job_id)
+            if job is None:
+                raise LookupError(f"Re-categorization job {job_id} does not exist")
+
+            # Completed jobs are never run twice
+            if job.status == "completed":
+                return job.status
+
+            job.status = "running"
+            job.error = None
+            db.commit()
+
+            try:
+                for year, shard_db in shard_sessions(db):
+                    # Shards before the checkpoint are complete, read-only shards are skipped
+                    if year < job.checkpoint_year or not is_year_writable(db, year):
+                        continue
+
+                    # A shard after the checkpoint is walked from its first id
+                    if year > job.checkpoint_year:
+                        job.checkpoint_year = year
+                        job.checkpoint_id = 0
+
+                    while True:
+                        started = time.perf_counter()
+
+                        # Next chunk is read after the checkpoint without taking the write lock
+                        rows = shard_db.execute(
+                            select(Transaction.id, Transaction.merchant, Transaction.category)
+                            .where(Transaction.id > job.checkpoint_id, Transaction.id <= job.target_id)
+                            .order_by(Transaction.id)
+                            .limit(chunk_size)
+                        ).all()
+                        if not rows:
+                            break
+
+                        # Changed rows, rollups and the checkpoint are committed together
+                        # A resumed job therefore never skips or repeats a row
+                        # With partitioning the shard commits first, and a chunk repeated after a crash
+                        # between the two commits finds its rows already moved and changes nothing
+                        job.rows_changed += recategorize_chunk(db, rows, year)
+                        job.checkpoint_id = rows[-1][0]
+                        job.rows_scanned += len(rows)
+                        job.elapsed_seconds += time.perf_counter() - started
+                        job.updated_at = func.current_timestamp()
+                        db.commit()
+
+                        # Progress is reported after every committed chunk
+                        if on_progress is not None:
+                            on_progress(job)
+
+                # Every row up to the target id has been categorized
+                job.status = "completed"
+                job.checkpoint_id = job.target_id
+                job.updated_at = func.current_timestamp()
+                db.commit()
+            except Exception as exc:
+                # Uncommitted changes are discarded and the job is left resumable
+                db.rollback()
+                job.status = "failed"
+                job.error = str(exc)
+                job.updated_at = func.current_timestamp()
+                db.commit()
+
+            return job.status
+    finally:
+        with _active_jobs_lock:
+            _active_jobs.discard(job_id)
@@ -0,0 +1,140 @@
+# Monthly rollup maintenance is defined in this file
+# Rollups are updated in the same transaction as the rows they summarize
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import date
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.rollup import MonthlyCategoryTotal
+from app.models.transaction import Transaction
+from app.services.archive import archived_category_totals
+from app.services.months import month_key
+
+# Rollup delta keyed by (month, category) holding (count, total cents)
+RollupDeltas = dict[tuple[str, str], tuple[int, int]]
+
+
+def rollup_deltas(rows: Iterable[tuple[date, str, int]], sign: int = 1) -> RollupDeltas:
+    # Count and cent changes are accumulated per month and category
+    counts: dict[tuple[str, str], int] = defaultdict(int)
+    totals: dict[tuple[str, str], int] = defaultdict(int)
+    for row_date, category, amount_cents in rows:
+        key = (month_key(row_date), category)
+        counts[key] += sign
+        totals[key] += sign * amount_cents
+
+    return {key: (counts[key], totals[key]) for key in counts}
+
+
+def merge_deltas(*deltas: RollupDeltas) -> RollupDeltas:
+    # Several delta sets are combined into one
+    merged: dict[tuple[str, str], tuple[int, int]] = {}
+    for delta in deltas:
+        for key, (count, total) in delta.items():
+            merged_count, merged_total = merged.get(key, (0, 0))
+            merged[key] = (merged_count + count, merged_total + total)
+    return merged
+
+
+def apply_rollup_deltas(db: Session, deltas: RollupDeltas) -> None:
+    # Nothing is written when no totals changed
+    changes = [
+        {"month": month, "category": category, "transaction_count": count, "total_cents": total}
+        for (month, category), (count, total) in deltas.items()
+        if count or total
+    ]
+    if not changes:
+        return
+
+    # Totals are added to existing rows or inserted as new ones
+    statement = sqlite_insert(MonthlyCategoryTotal)
+    statement = statement.on_conflict_do_update(
+        index_elements=[MonthlyCategoryTotal.month, MonthlyCategoryTotal.category],
+        set_={
+            "transaction_count": MonthlyCategoryTotal.transaction_count
+            + statement.excluded.transaction_count,
+            "total_cents": MonthlyCategoryTotal.total_cents + statement.excluded.total_cents,
+        },
+    )
+    db.execute(statement, changes)
+
+    # Categories that no longer hold any transaction are removed
+    if any(count < 0 for count, _ in deltas.values()):
+        db.execute(
+            delete(MonthlyCategoryTotal).where(MonthlyCategoryTotal.transaction_count <= 0)
+        )
+
+
+def record_inserted_rows(db: Session, rows: list[dict]) -> None:
+    # Inserted rows are added to their monthly totals
+    apply_rollup_deltas(
+        db,
+        rollup_deltas((row["date"], row["category"], row["amount_cents"]) for row in rows),
+    )
+
+
+def compute_rollups_from_transactions(db: Session) -> RollupDeltas:
+    # Totals are recomputed from the raw transactions table
+    # Integer cents are summed exactly by SQLite
+    month_expr = func.strftime("%Y-%m", Transaction.date)
+    grouped_rows = db.execute(
+        select(
+            month_expr,
+            Transaction.category,
+            func.count(Transaction.id),
+            func.sum(Transaction.amount_cents),
+        ).group_by(month_expr, Transaction.category)
+    )
+    stored = {
+        (month, category): (int(count), int(total or 0))
+        for month, category, count, total in grouped_rows
+    }
+
+    # Archived rows are no longer in the table, so their totals come from the archive catalog
+    return merge_deltas(stored, archived_category_totals(db))
+
+
+def find_rollup_drift(db: Session) -> list[dict]:
+    # Stored rollups are compared with totals recomputed from raw rows
+    expected = compute_rollups_from_transactions(db)
+    stored = {
+        (row.month, row.category): (row.transaction_count, row.total_cents)
+        for row in db.scalars(select(MonthlyCategoryTotal))
+    }
+
+    # Every mismatching month and category is reported
+    drift = []
+    for key in sorted(expected.keys() | stored.keys()):
+        expected_count, expected_total = expected.get(key, (0, 0))
+        stored_count, stored_total = stored.get(key, (0, 0))
+
+        # Cent totals are exact, so any difference is drift
+        if expected_count != stored_count or expected_total != stored_total:
+            drift.append(
+                {
+                    "month": key[0],
+                    "category": key[1],
+                    "expected_count": expected_count,
+                    "stored_count": stored_count,
+                    "expected_total_cents": expected_total,
+                    "stored_total_cents": stored_total,
+                }
+            )
+    return drift
+
+
+def rebuild_rollups(db: Session) -> None:
+    # Rollup table is replaced with totals recomputed from raw rows
+    expected = compute_rollups_from_transactions(db)
+    db.execute(delete(MonthlyCategoryTotal))
+    if expected:
+        db.execute(
+            insert(MonthlyCategoryTotal),
+            [
+                {"month": month, "category": category, "transaction_count": count, "total_cents": total}
+                for (month, category), (count, total) in expected.items()
+            ],
+        )
@@ -0,0 +1,126 @@
+# Compiled multi-pattern rule engine is defined in this file
+# All merchant patterns are compiled into one Aho-Corasick automaton
+import csv
+import hashlib
+from collections import deque
+from collections.abc import Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+# Rules shipped with the application are stored next to the app package
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent.parent / "data" / "category_rules.csv"
+
+# Category assigned when no rule matches
+DEFAULT_CATEGORY = "Uncategorized"
+
+
+# A single categorization rule is defined
+# Higher priority wins, ties go to the rule listed first
+class CategoryRule(NamedTuple):
+    pattern: str
+    category: str
+    priority: int = 0
+
+
+def load_rules(path: str | Path = DEFAULT_RULES_PATH) -> list[CategoryRule]:
+    # Rules are read from a CSV file with pattern, category and priority columns
+    with open(path, newline="", encoding="utf-8") as rules_file:
+        return [
+            CategoryRule(
+                pattern=row["pattern"],
+                category=row["category"],
+                priority=int(row.get("priority") or 0),
+            )
+            for row in csv.DictReader(rules_file)
+            if row.get("pattern")
+        ]
+
+
+def rules_version(rules: Iterable[CategoryRule], default_category: str = DEFAULT_CATEGORY) -> str:
+    # Version is a digest of the rules themselves, so every worker loading the same rules agrees on it
+    digest = hashlib.sha256(default_category.encode())
+    for rule in rules:
+        digest.update(f"\n{rule.pattern}\t{rule.category}\t{rule.priority}".encode())
+    return digest.hexdigest()[:12]
+
+
+class RuleEngine:
+    def __init__(
+        self,
+        rules: Iterable[CategoryRule],
+        default_category: str = DEFAULT_CATEGORY,
+    ):
+        # Rules are kept in their declared order
+        self.rules = tuple(rules)
+        self.default_category = default_category
+
+        # Version identifies the rule set the engine was compiled from
+        # Engines are never modified after compilation, so the version always describes their matches
+        self.version = rules_version(self.rules, default_category)
+
+        # Rules are ranked by priority and then by declaration order
+        # A higher rank wins, so the best match is a plain integer maximum
+        self._ranked = sorted(
+            range(len(self.rules)),
+            key=lambda rule_index: (self.rules[rule_index].priority, -rule_index),
+        )
+        rank_of = {rule_index: rank for rank, rule_index in enumerate(self._ranked)}
+
+        # Trie transitions, failure links and best rank per state are built
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._best: list[int] = [-1]
+
+        # Every pattern is added to the trie
+        for rule_index, rule in enumerate(self.rules):
+            state = 0
+            for char in rule.pattern.lower():
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._best.append(-1)
+                state = next_state
+            self._best[state] = max(self._best[state], rank_of[rule_index])
+
+        # Failure links are computed breadth first
+        # Each state also inherits the best match reachable through its failure link
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                fail_state = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = fail_state
+                self._best[next_state] = max(self._best[next_state], self._best[fail_state])
+                queue.append(next_state)
+
+    def match(self, merchant: str) -> CategoryRule | None:
+        # The merchant is scanned once, so cost depends on its length only
+        goto = self._goto
+        fail = self._fail
+        best = self._best
+        state = 0
+        found = -1
+
+        for char in merchant.lower():
+            # Failure links are followed until a transition exists
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            # Best rule ending at this position is tracked
+            if best[state] > found:
+                found = best[state]
+
+        # Winning rule is returned when any pattern matched
+        return self.rules[self._ranked[found]] if found >= 0 else None
+
+    def categorize(self, merchant: str) -> str:
+        # Category of the winning rule is returned, or the default category
+        rule = self.match(merchant)
+        return rule.category if rule is not None else self.default_category
@@ -0,0 +1,117 @@
+# Categorization rules file watcher is defined in this file
+# Changed rules are compiled on a background thread and swapped in without restarting workers
+import os
+import threading
+from collections.abc import Callable
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.metrics import register_callback
+from app.services.categorizer import build_rule_engine, get_rules_version, rules_path, set_rule_engine
+from app.services.rule_engine import load_rules
+
+
+def file_signature(path: Path) -> tuple[int, int, int] | None:
+    # Modification time, size and inode change whenever the file is edited or replaced
+    # A file that cannot be read is treated as missing and keeps the active rules
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class RulesWatcher:
+    def __init__(
+        self,
+        path_factory: Callable[[], Path] = rules_path,
+        interval_s: float = 5.0,
+    ):
+        # Watched file and polling interval are stored
+        self.path_factory = path_factory
+        self.interval_s = interval_s
+
+        # Signature of the rules file the active engine was compiled from
+        self._signature = file_signature(path_factory())
+
+        # Reload outcomes are counted, and the last failure kept, for reporting
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: str | None = None
+
+        # Watcher thread is started explicitly and stopped through an event
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            # Only one watcher thread is ever running, and none when polling is disabled
+            if self.interval_s <= 0 or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="rules-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+
+        # The thread wakes up from its wait and exits
+        if thread is not None:
+            self._stopped.set()
+            thread.join(timeout)
+
+    def check(self) -> bool:
+        # Nothing is done while the file is unchanged or missing
+        path = self.path_factory()
+        signature = file_signature(path)
+        if signature is None or signature == self._signature:
+            return False
+
+        # Rules are compiled on this thread while requests keep using the active engine
+        try:
+            rule_engine = build_rule_engine(load_rules(path))
+        except Exception as exc:
+            # A broken rules file leaves the active rules in place until the file changes again
+            self.failures += 1
+            self.last_error = f"{path}: {exc}"
+            self._signature = signature
+            return False
+
+        # A file that changed while it was read is still being written and is read again on the next check
+        if file_signature(path) != signature:
+            return False
+        self._signature = signature
+        self.last_error = None
+
+        # The compiled engine is swapped in only when the rules differ from the active ones
+        if rule_engine.version == get_rules_version():
+            return False
+        set_rule_engine(rule_engine)
+        self.reloads += 1
+        return True
+
+    def _run(self) -> None:
+        # The file is checked once per interval until the watcher is stopped
+        while not self._stopped.wait(self.interval_s):
+            self.check()
+
+
+# Shared watcher started by every worker
+rules_watcher = RulesWatcher(interval_s=settings.rules_reload_interval_s)
+
+# Reload outcomes are reported at scrape time
+register_callback(
+    "rules_reloads_total",
+    "Categorization rule sets swapped in after the rules file changed",
+    "counter",
+    lambda: rules_watcher.reloads,
+)
+register_callback(
+    "rules_reload_failures_total",
+    "Changed rules files that could not be loaded",
+    "counter",
+    lambda: rules_watcher.failures,
+)
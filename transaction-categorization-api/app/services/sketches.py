@@ -0,0 +1,111 @@
+# Streaming sketches used by the analytics endpoints are defined in this file
+# Both sketches are small, mergeable across months and updated incrementally as rows arrive
+import hashlib
+import heapq
+import math
+
+# HyperLogLog register count is 2 ** HLL_PRECISION
+# 4096 one-byte registers give a relative standard error of 1.04 / sqrt(4096), about 1.6%
+HLL_PRECISION = 12
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_RELATIVE_ERROR = 1.04 / math.sqrt(HLL_REGISTERS)
+
+# Bias correction constant for 4096 registers
+_HLL_ALPHA = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+
+# Bits of the hash left after the register index
+_HLL_RANK_BITS = 64 - HLL_PRECISION
+
+# Powers 2 ** -rank for every possible register value
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(_HLL_RANK_BITS + 2)]
+
+
+def merchant_hash(merchant: str) -> int:
+    # A stable 64-bit hash is used, so sketches written by different processes agree
+    return int.from_bytes(hashlib.blake2b(merchant.encode(), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    def __init__(self, registers: bytes | None = None):
+        # Registers hold the largest rank seen for their bucket
+        self.registers = bytearray(registers) if registers is not None else bytearray(HLL_REGISTERS)
+
+    def add(self, value_hash: int) -> bool:
+        # Leading bits choose the register, the rank is the position of the first set bit in the rest
+        index = value_hash >> _HLL_RANK_BITS
+        rank = _HLL_RANK_BITS - (value_hash & ((1 << _HLL_RANK_BITS) - 1)).bit_length() + 1
+
+        # Whether the sketch changed is returned, so unchanged sketches need not be stored
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, *others: "HyperLogLog") -> None:
+        # Union of sketches keeps the largest register of each bucket
+        # All sketches are merged in one pass over the registers, merging none leaves the sketch unchanged
+        if others:
+            self.registers = bytearray(map(max, self.registers, *(other.registers for other in others)))
+
+    def count(self) -> int:
+        # Harmonic mean estimate over all registers
+        estimate = _HLL_ALPHA * HLL_REGISTERS * HLL_REGISTERS / sum(map(_INVERSE_POWERS.__getitem__, self.registers))
+
+        # Small cardinalities are estimated by linear counting of empty registers
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * HLL_REGISTERS and zeros:
+            estimate = HLL_REGISTERS * math.log(HLL_REGISTERS / zeros)
+        return round(estimate)
+
+
+class SpaceSaving:
+    def __init__(self, capacity: int, counters: dict[str, list[int]] | None = None, floor: int = 0):
+        # Counters map a tracked item to its [count, error]
+        # The true count of a tracked item lies in [count - error, count]
+        self.capacity = capacity
+        self.counters: dict[str, list[int]] = counters if counters is not None else {}
+
+        # Largest count ever evicted, so an untracked item never occurred more often than this
+        self.floor = floor
+
+    def untracked_bound(self) -> int:
+        # Items without a counter occurred at most as often as the smallest counter of a full sketch
+        if self.counters and len(self.counters) >= self.capacity:
+            return max(self.floor, min(count for count, _ in self.counters.values()))
+        return self.floor
+
+    def update(self, weights: dict[str, int]) -> None:
+        # Counts of tracked items are increased in place
+        new_items = []
+        for item, weight in weights.items():
+            counter = self.counters.get(item)
+            if counter is not None:
+                counter[0] += weight
+            else:
+                new_items.append((weight, item))
+        if not new_items:
+            return
+
+        # Smallest counters are kept in a heap while new items arrive, heaviest first
+        heap = [(count, item) for item, (count, _) in self.counters.items()]
+        heapq.heapify(heap)
+        for weight, item in sorted(new_items, reverse=True):
+            if len(self.counters) < self.capacity:
+                # A free slot takes the item, carrying any count lost to earlier evictions as error
+                count = self.floor + weight
+                self.counters[item] = [count, self.floor]
+            else:
+                # The smallest counter is replaced and its count becomes the new item's error
+                evicted_count, evicted_item = heapq.heappop(heap)
+                del self.counters[evicted_item]
+                self.floor = max(self.floor, evicted_count)
+                count = evicted_count + weight
+                self.counters[item] = [count, evicted_count]
+            heapq.heappush(heap, (count, item))
+
+    @classmethod
+    def from_exact(cls, capacity: int, counts: dict[str, int]) -> "SpaceSaving":
+        # Exact counts are reduced to the heaviest items without any error
+        ranked = sorted(counts.items(), key=lambda pair: pair[1], reverse=True)
+        floor = ranked[capacity][1] if len(ranked) > capacity else 0
+        return cls(capacity, {item: [count, 0] for item, count in ranked[:capacity]}, floor)
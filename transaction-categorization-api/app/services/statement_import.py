@@ -0,0 +1,337 @@
+# Streaming bank statement import is defined in this file
+# Files are read in fixed size blocks and written in checkpointed chunks, so memory stays flat
+import csv
+import html
+import os
+import re
+import threading
+from collections.abc import Callable, Iterator
+from datetime import datetime
+from itertools import islice
+from typing import BinaryIO
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.import_job import ImportJob
+from app.services.ingest import ingest_chunk
+
+# Statement formats understood by the importer
+STATEMENT_FORMATS = ("csv", "ofx")
+
+# File extensions mapped to their statement format
+FORMAT_BY_EXTENSION = {".csv": "csv", ".ofx": "ofx", ".qfx": "ofx"}
+
+# CSV header names accepted for each transaction field, compared in lowercase
+CSV_FIELD_ALIASES = {
+    "date": ("date", "transaction date", "posted date", "posting date"),
+    "amount": ("amount", "transaction amount"),
+    "merchant": ("merchant", "description", "payee", "name"),
+}
+
+# CSV header names of optional fields, compared in lowercase
+CSV_OPTIONAL_FIELD_ALIASES = {
+    "external_id": ("external id", "external_id", "transaction id", "reference", "fitid"),
+}
+
+# Date formats accepted in CSV statements
+CSV_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y")
+
+# OFX transaction blocks and the leaf elements inside them are matched on raw bytes
+OFX_TRANSACTION = re.compile(rb"<STMTTRN>(.*?)</STMTTRN>", re.IGNORECASE | re.DOTALL)
+OFX_TRANSACTION_START = re.compile(rb"<STMTTRN>", re.IGNORECASE)
+OFX_FIELD = re.compile(rb"<([A-Z0-9.]+)>([^<\r\n]*)", re.IGNORECASE)
+
+# Jobs currently being imported by this process
+_active_jobs: set[int] = set()
+_active_jobs_lock = threading.Lock()
+
+
+class StatementFormatError(ValueError):
+    # Raised when a statement file cannot be parsed at all
+    pass
+
+
+class ImportAlreadyRunning(Exception):
+    # Raised when a job is started while it is already running
+    pass
+
+
+def detect_format(path: str) -> str:
+    # Format is inferred from the file extension
+    file_format = FORMAT_BY_EXTENSION.get(os.path.splitext(path)[1].lower())
+    if file_format is None:
+        raise StatementFormatError(f"Cannot infer statement format of {path}")
+    return file_format
+
+
+def iter_lines(stream: BinaryIO, read_size: int) -> Iterator[tuple[int, bytes]]:
+    # Lines are yielded with the byte offset just after their newline
+    offset = stream.tell()
+    pending = b""
+    while block := stream.read(read_size):
+        pending += block
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            offset += len(line) + 1
+            yield offset, line + b"\n"
+
+    # Final line without a trailing newline is emitted
+    if pending:
+        yield offset + len(pending), pending
+
+
+def parse_statement_amount(value: str) -> str:
+    # Currency symbols and thousands separators are removed
+    amount = value.strip().replace(",", "").replace("$", "")
+
+    # Accounting style parentheses mark a negative amount
+    if amount.startswith("(") and amount.endswith(")"):
+        amount = "-" + amount[1:-1]
+    return amount
+
+
+def parse_statement_date(value: str) -> str:
+    # Known date layouts are converted to ISO dates
+    # Unknown layouts are passed through so row validation reports them
+    value = value.strip()
+    for date_format in CSV_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return value
+
+
+def _csv_columns(header: list[str]) -> dict[str, int]:
+    # Each transaction field is mapped to the position of its column
+    names = [name.strip().lower() for name in header]
+    columns = {}
+    for field, aliases in CSV_FIELD_ALIASES.items():
+        position = next((names.index(alias) for alias in aliases if alias in names), None)
+        if position is None:
+            raise StatementFormatError(f"CSV header has no {field} column")
+        columns[field] = position
+
+    # Optional fields are read when the header has them
+    for field, aliases in CSV_OPTIONAL_FIELD_ALIASES.items():
+        position = next((names.index(alias) for alias in aliases if alias in names), None)
+        if position is not None:
+            columns[field] = position
+    return columns
+
+
+def iter_csv_records(stream: BinaryIO, read_size: int, start_offset: int = 0) -> Iterator[tuple[int, dict]]:
+    # Offset of the last line handed to the CSV reader is tracked
+    # The reader pulls lines lazily, so after each record it points at the record end
+    position = 0
+
+    def decoded_lines(lines: Iterator[tuple[int, bytes]]) -> Iterator[str]:
+        nonlocal position
+        for end_offset, line in lines:
+            position = end_offset
+            yield line.decode("utf-8", errors="replace")
+
+    # Header is always read from the start of the file
+    stream.seek(0)
+    reader = csv.reader(decoded_lines(iter_lines(stream, read_size)))
+    header = next(reader, None)
+    if header is None:
+        raise StatementFormatError("CSV file is empty")
+    header[0] = header[0].lstrip("\ufeff")
+    columns = _csv_columns(header)
+
+    # Reading continues from the checkpoint when resuming
+    if start_offset > position:
+        stream.seek(start_offset)
+        reader = csv.reader(decoded_lines(iter_lines(stream, read_size)))
+
+    for record in reader:
+        # Blank lines are skipped
+        if not any(field.strip() for field in record):
+            continue
+
+        # Fields missing from short records are left out and reported by row validation
+        fields = {field: record[index] for field, index in columns.items() if index < len(record)}
+        if "date" in fields:
+            fields["date"] = parse_statement_date(fields["date"])
+        if "amount" in fields:
+            fields["amount"] = parse_statement_amount(fields["amount"])
+        if "merchant" in fields:
+            fields["merchant"] = fields["merchant"].strip()
+
+        # Blank external ids are left out, so the row is stored without one
+        if "external_id" in fields:
+            fields["external_id"] = fields["external_id"].strip() or None
+        yield position, fields
+
+
+def _ofx_record(block: bytes) -> dict:
+    # Leaf elements of the transaction block are collected by tag name
+    fields = {
+        tag.upper().decode(): html.unescape(value.decode("utf-8", errors="replace")).strip()
+        for tag, value in OFX_FIELD.findall(block)
+    }
+
+    # OFX dates start with YYYYMMDD, optionally followed by a time and zone
+    posted = fields.get("DTPOSTED", "")
+    row_date = f"{posted[:4]}-{posted[4:6]}-{posted[6:8]}" if len(posted) >= 8 else posted
+
+    # The bank's transaction id is kept as the external id, so overlapping statements are not stored twice
+    return {
+        "date": row_date,
+        "amount": parse_statement_amount(fields.get("TRNAMT", "")),
+        "merchant": fields.get("NAME") or fields.get("PAYEE") or fields.get("MEMO", ""),
+        "external_id": fields.get("FITID") or None,
+    }
+
+
+def iter_ofx_records(stream: BinaryIO, read_size: int, start_offset: int = 0) -> Iterator[tuple[int, dict]]:
+    # Reading starts at the checkpoint, which always lies between transaction blocks
+    stream.seek(start_offset)
+    buffer_offset = start_offset
+    buffer = b""
+
+    while True:
+        block = stream.read(read_size)
+        buffer += block
+
+        # Every complete transaction block in the buffer is emitted
+        consumed = 0
+        for match in OFX_TRANSACTION.finditer(buffer):
+            consumed = match.end()
+            yield buffer_offset + consumed, _ofx_record(match.group(1))
+
+        if not block:
+            return
+
+        # Only an unfinished transaction block, or a possible partial tag, is kept
+        tail = buffer[consumed:]
+        start = OFX_TRANSACTION_START.search(tail)
+        keep_from = start.start() if start else max(len(tail) - len(b"<STMTTRN>"), 0)
+        buffer_offset += consumed + keep_from
+        buffer = tail[keep_from:]
+
+
+def iter_statement_records(
+    stream: BinaryIO,
+    file_format: str,
+    read_size: int,
+    start_offset: int = 0,
+) -> Iterator[tuple[int, dict]]:
+    # Records are yielded as (end offset, raw row) pairs by the format's parser
+    if file_format == "csv":
+        return iter_csv_records(stream, read_size, start_offset)
+    if file_format == "ofx":
+        return iter_ofx_records(stream, read_size, start_offset)
+    raise StatementFormatError(f"Unsupported statement format: {file_format}")
+
+
+def is_import_running(job_id: int) -> bool:
+    # Jobs claimed by a worker of this process are reported as running
+    with _active_jobs_lock:
+        return job_id in _active_jobs
+
+
+def create_import_job(db: Session, source_path: str, file_format: str) -> ImportJob:
+    # A pending job is recorded for the statement file
+    if file_format not in STATEMENT_FORMATS:
+        raise StatementFormatError(f"Unsupported statement format: {file_format}")
+    job = ImportJob(
+        source_path=os.path.abspath(source_path),
+        file_format=file_format,
+        status="pending",
+        total_bytes=os.path.getsize(source_path),
+        checkpoint_offset=0,
+        rows_read=0,
+        rows_inserted=0,
+        rows_failed=0,
+        rows_duplicate=0,
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def run_import(
+    job_id: int,
+    session_factory=SessionLocal,
+    chunk_size: int | None = None,
+    read_size: int | None = None,
+    on_progress: Callable[[ImportJob], None] | None = None,
+) -> str:
+    # Defaults come from the bulk ingest and import settings
+    chunk_size = chunk_size or settings.bulk_chunk_size
+    read_size = read_size or settings.import_read_size
+
+    # A job is only imported by one worker of this process at a time
+    with _active_jobs_lock:
+        if job_id in _active_jobs:
+            raise ImportAlreadyRunning(f"Import job {job_id} is already running")
+        _active_jobs.add(job_id)
+
+    try:
+        with session_factory() as db:
+            job = db.get(ImportJob, job_id)
+            if job is None:
+                raise LookupError(f"Import job {job_id} does not exist")
+
+            # Completed jobs are never imported twice
+            if job.status == "completed":
+                return job.status
+
+            job.status = "running"
+            job.error = None
+            db.commit()
+
+            try:
+                with open(job.source_path, "rb") as stream:
+                    records = iter_statement_records(
+                        stream, job.file_format, read_size, job.checkpoint_offset
+                    )
+
+                    # Records are written one chunk at a time
+                    while chunk := list(islice(records, chunk_size)):
+                        results = ingest_chunk(
+                            db,
+                            [(job.rows_read + index, raw_row) for index, (_, raw_row) in enumerate(chunk)],
+                        )
+                        stored = sum(1 for row_result in results if row_result.id is not None)
+                        duplicates = sum(1 for row_result in results if row_result.duplicate)
+
+                        # Checkpoint is committed in the same transaction as the chunk's rows
+                        # A resumed import therefore never skips or repeats a record
+                        # With partitioning the year shards commit before the checkpoint, so a crash
+                        # between those commits may write the last chunk again when the job resumes
+                        # Records with an external id are then found stored and counted as duplicates
+                        job.checkpoint_offset = chunk[-1][0]
+                        job.rows_read += len(chunk)
+                        job.rows_inserted += stored - duplicates
+                        job.rows_duplicate += duplicates
+                        job.rows_failed += len(chunk) - stored
+                        job.updated_at = func.current_timestamp()
+                        db.commit()
+
+                        # Progress is reported after every committed chunk
+                        if on_progress is not None:
+                            on_progress(job)
+
+                # Whole file has been read
+                job.status = "completed"
+                job.checkpoint_offset = job.total_bytes
+                job.updated_at = func.current_timestamp()
+                db.commit()
+            except Exception as exc:
+                # Uncommitted rows are discarded and the job is left resumable
+                db.rollback()
+                job.status = "failed"
+                job.error = str(exc)
+                job.updated_at = func.current_timestamp()
+                db.commit()
+
+            return job.status
+    finally:
+        with _active_jobs_lock:
+            _active_jobs.discard(job_id)
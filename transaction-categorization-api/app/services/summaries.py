@@ -0,0 +1,137 @@
+# Summary logic is defined in this file
+# Totals are read from the monthly rollup table in one query per year shard
+from datetime import MINYEAR
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.shards import shard_sessions
+from app.models.rollup import MonthlyCategoryTotal
+from app.services.money import from_cents
+from app.services.months import month_key, month_keys_between, parse_month, shift_months
+
+# Largest number of months served by a single range summary
+MAX_SUMMARY_MONTHS = 120
+
+
+def check_summary_range(start: str, end: str, yoy: bool = False) -> None:
+    # Range must be ordered and bounded
+    # Violations are reported as a ValueError
+    first, last = parse_month(start), parse_month(end)
+    month_count = (last.year - first.year) * 12 + last.month - first.month + 1
+    if month_count <= 0:
+        raise ValueError("start must not be after end")
+    if month_count > MAX_SUMMARY_MONTHS:
+        raise ValueError(f"Range may cover at most {MAX_SUMMARY_MONTHS} months")
+
+    # Year over year deltas compare with the months a year earlier, which must exist as dates
+    if yoy and first.year <= MINYEAR:
+        raise ValueError(f"yoy requires start to be in year {MINYEAR + 1:04d} or later")
+
+
+def month_summary(db: Session, month: str) -> dict:
+    # Precomputed totals are read from the monthly rollup table
+    # Only one row per category is touched, whatever the transaction volume
+    # With partitioning only the shard of the month's year is read
+    statement = select(
+        MonthlyCategoryTotal.category,
+        MonthlyCategoryTotal.transaction_count,
+        MonthlyCategoryTotal.total_cents,
+    ).where(MonthlyCategoryTotal.month == month)
+    year = int(month[:4])
+    grouped_rows = [row for _, session in shard_sessions(db, year, year) for row in session.execute(statement)]
+
+    # Totals by category container is created
+    totals_by_category: dict[str, int] = {}
+
+    # Overall total and transaction count accumulators are created
+    overall_cents = 0
+    transaction_count = 0
+
+    # Grouped rows are accumulated in integer cents
+    for category, category_count, category_cents in grouped_rows:
+        totals_by_category[category] = int(category_cents or 0)
+
+        # Overall total and count are accumulated
+        overall_cents += totals_by_category[category]
+        transaction_count += int(category_count or 0)
+
+    # Summary response is returned with exact decimal amounts
+    return {
+        "month": month,
+        "transaction_count": transaction_count,
+        "overall_total": from_cents(overall_cents),
+        "totals_by_category": {
+            category: from_cents(cents) for category, cents in totals_by_category.items()
+        },
+    }
+
+
+def range_summary(db: Session, start: str, end: str, yoy: bool = False) -> dict:
+    # Months of the requested range are listed in order
+    months = month_keys_between(start, end)
+
+    # Prior year months are included in the same query when deltas are requested
+    first_month = month_key(shift_months(parse_month(start), -12)) if yoy else start
+
+    # Per-month, per-category totals are read in a single query
+    # With partitioning the same query runs on each shard of the covered years only
+    statement = select(
+        MonthlyCategoryTotal.month,
+        MonthlyCategoryTotal.category,
+        MonthlyCategoryTotal.transaction_count,
+        MonthlyCategoryTotal.total_cents,
+    ).where(MonthlyCategoryTotal.month >= first_month, MonthlyCategoryTotal.month <= end)
+    rows = [
+        row
+        for _, session in shard_sessions(db, int(first_month[:4]), int(end[:4]))
+        for row in session.execute(statement)
+    ]
+
+    # Totals in integer cents are indexed by month and category
+    totals: dict[tuple[str, str], int] = {}
+    counts: dict[str, int] = {}
+    for month, category, transaction_count, total_cents in rows:
+        totals[(month, category)] = int(total_cents or 0)
+        counts[month] = counts.get(month, 0) + int(transaction_count or 0)
+
+    # Categories present in the requested range become columns
+    categories = sorted({category for month, category in totals if month >= start})
+
+    # One totals array per category is built, aligned with the months array
+    totals_by_category = {
+        category: [totals.get((month, category), 0) for month in months]
+        for category in categories
+    }
+
+    # Overall totals and counts are aligned with the months array
+    overall_totals = [
+        sum(totals_by_category[category][index] for category in categories)
+        for index in range(len(months))
+    ]
+
+    # Columnar summary response is built with exact decimal amounts
+    summary = {
+        "months": months,
+        "transaction_counts": [counts.get(month, 0) for month in months],
+        "overall_totals": [from_cents(cents) for cents in overall_totals],
+        "totals_by_category": {
+            category: [from_cents(cents) for cents in column]
+            for category, column in totals_by_category.items()
+        },
+    }
+
+    # Year over year deltas are null when the prior year month has no data
+    if yoy:
+        prior_months = [month_key(shift_months(parse_month(month), -12)) for month in months]
+        summary["yoy_deltas_by_category"] = {
+            category: [
+                from_cents(totals.get((month, category), 0) - totals.get((prior, category), 0))
+                if prior in counts
+                else None
+                for month, prior in zip(months, prior_months)
+            ]
+            for category in categories
+        }
+
+    return summary
@@ -0,0 +1,80 @@
+# Startup warm-up is defined in this file
+# Work done here runs once per worker before it serves requests, never at import time
+from sqlalchemy import Engine, select
+
+from app.core.config import settings
+from app.db.migrations import check_schema_version
+from app.db.session import SessionLocal, engine, shard_router
+from app.db.shards import shard_sessions
+from app.models.transaction import Transaction
+from app.services.categorizer import prefill_category_cache
+
+
+def warm_pool(pool_engine: Engine, size: int) -> None:
+    # Connections are opened side by side so the pool keeps that many ready connections
+    # Connection pragmas are applied now rather than on the first requests
+    connections = []
+    try:
+        for _ in range(size):
+            connection = pool_engine.connect()
+            connections.append(connection)
+            connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+def warm_category_cache(rows: int) -> int:
+    # Merchants of the most recent transactions are categorized in one batch, most recent first
+    # The cache is filled without counting categorizer calls or cache lookups, so metrics start from zero
+    # The id range is read backwards from the end of the table, so the cost does not grow with its size
+    if rows <= 0:
+        return 0
+    # With partitioning the most recent rows are read from the latest year shard
+    with SessionLocal() as db:
+        shards = shard_sessions(db)
+        if not shards:
+            return 0
+        _, session = shards[-1]
+        merchants = list(
+            session.scalars(select(Transaction.merchant).order_by(Transaction.id.desc()).limit(rows))
+        )
+    prefill_category_cache(merchants)
+    return len(merchants)
+
+
+def warm_up() -> int:
+    # Schema version is checked first, so an unmigrated database fails startup with a clear error
+    version = check_schema_version(engine)
+
+    # Every year shard must be migrated as well
+    # Rows left in the main database would be invisible once partitioning is enabled
+    if shard_router is not None:
+        for year in shard_router.years():
+            check_schema_version(shard_router.engine(year))
+        with engine.connect() as connection:
+            if connection.execute(select(Transaction.id).limit(1)).first() is not None:
+                raise RuntimeError(
+                    "PARTITION_DIR is set but the main database still holds transactions; "
+                    "run python -m scripts.partition_by_year"
+                )
+
+    # Pooled connections and the category cache are filled before the first request
+    warm_pool(engine, settings.db_pool_size)
+    warm_category_cache(settings.category_cache_warm_rows)
+    return version
+
+
+async def warm_async_pool(size: int) -> None:
+    from app.db.async_session import async_engine
+
+    # Async connections are opened side by side, as for the sync pool
+    connections = []
+    try:
+        for _ in range(size):
+            connection = await async_engine.connect()
+            connections.append(connection)
+            await connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in connections:
+            await connection.close()
@@ -0,0 +1,155 @@
+# Group commit write-behind queue is defined in this file
+# Single-row creates are batched so many requests share one commit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from app.core.config import settings
+from app.core.metrics import register_callback
+from app.db.session import SessionLocal
+from app.services.ingest import insert_unique_rows
+
+# Marker placed on the queue to stop the writer thread
+_STOP = object()
+
+
+class WriteQueueFull(Exception):
+    # Raised when the queue stays full for longer than the submit timeout
+    pass
+
+
+class GroupCommitWriter:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        max_batch_rows: int = 500,
+        max_delay_ms: float = 5.0,
+        queue_size: int = 10_000,
+    ):
+        # Flush limits are stored
+        self.session_factory = session_factory
+        self.max_batch_rows = max_batch_rows
+        self.max_delay = max_delay_ms / 1000
+
+        # Bounded queue provides backpressure when the writer falls behind
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+
+        # Writer thread is started lazily on the first submission
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            # Only one writer thread is ever running
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="group-commit-writer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+
+        # Queued rows are flushed before the thread exits
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(self, row: dict, timeout: float = 0.1) -> Future:
+        # Writer is started on demand
+        self.start()
+
+        # The future resolves to the stored row and whether it was inserted only after its group is committed
+        future: Future = Future()
+        try:
+            if timeout > 0:
+                self._queue.put((row, future), timeout=timeout)
+            else:
+                self._queue.put_nowait((row, future))
+        except queue.Full:
+            raise WriteQueueFull("Write queue is full") from None
+        return future
+
+    def queue_depth(self) -> int:
+        # Approximate number of rows waiting to be written is returned
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            # Writer blocks until at least one row is waiting
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            # More rows are collected until the batch is full or the delay expires
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch_rows:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+
+        # Rows still queued at shutdown are flushed in full batches
+        while True:
+            batch = []
+            while len(batch) < self.max_batch_rows:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    batch.append(item)
+            if not batch:
+                break
+            self._flush(batch)
+
+    def _flush(self, batch: list[tuple[dict, Future]]) -> None:
+        # Requests that were cancelled while waiting are dropped
+        batch = [(row, future) for row, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        # The whole group is written and committed in one transaction
+        # Rows repeating a stored external id are matched with the stored row instead
+        try:
+            with self.session_factory() as db:
+                stored_rows = insert_unique_rows(db, [row for row, _ in batch])
+                db.commit()
+        except Exception as exc:
+            # Every waiting request sees the failure, nothing was committed
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+
+        # Waiting requests are resolved with their stored row, and whether it was inserted, after the commit
+        for (_, future), stored in zip(batch, stored_rows):
+            future.set_result(stored)
+
+
+# Shared writer used by the create endpoints when write-behind is enabled
+write_behind = GroupCommitWriter(
+    max_batch_rows=settings.write_behind_max_batch_rows,
+    max_delay_ms=settings.write_behind_max_delay_ms,
+    queue_size=settings.write_behind_queue_size,
+)
+
+# Queue depth is reported at scrape time
+register_callback(
+    "write_behind_queue_depth",
+    "Rows waiting in the group commit queue",
+    "gauge",
+    write_behind.queue_depth,
+)
@@ -0,0 +1,154 @@
+# In-process API load benchmark
+# Run from the project root with: python -m benchmarks.bench_api_load --rows 10000 1000000 10000000
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from benchmarks.common import latency_summary, write_results
+from benchmarks.datagen import cached_database, generate_rows
+
+# Generated databases are cached here between runs
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent / "data"
+
+# Operations measured at every dataset size
+OPERATIONS = ("create", "list", "summary")
+
+# Date range covered by the generated data
+DATA_START = date(2022, 1, 1)
+DATA_DAYS = 3 * 365
+
+
+def request_factory(operation: str, seed: int):
+    # Request parameters are drawn from a seeded generator so runs are comparable
+    rng = random.Random(seed)
+    rows = generate_rows(10**9, seed=seed + 1)
+
+    async def create(client):
+        return await client.post("/transactions/", json=next(rows))
+
+    async def list_page(client):
+        start = DATA_START + timedelta(days=rng.randrange(DATA_DAYS))
+        return await client.get("/transactions/", params={"start": start.isoformat(), "limit": 50})
+
+    async def summary(client):
+        month = DATA_START + timedelta(days=rng.randrange(DATA_DAYS))
+        return await client.get("/transactions/summary", params={"month": month.strftime("%Y-%m")})
+
+    return {"create": create, "list": list_page, "summary": summary}[operation]
+
+
+async def run_operation(app, operation: str, clients: int, requests: int, warmup: int) -> dict:
+    import httpx
+
+    # Requests go through the ASGI interface directly, without sockets
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        send = request_factory(operation, seed=len(operation))
+
+        # Warm-up requests fill caches and the connection pool
+        for _ in range(warmup):
+            await send(client)
+
+        latencies: list[float] = []
+        errors = 0
+        remaining = requests
+
+        async def worker() -> None:
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                response = await send(client)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code >= 400:
+                    errors += 1
+
+        # Concurrent clients share the request budget
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    return {"operation": operation, "clients": clients, "errors": errors, **latency_summary(latencies, elapsed)}
+
+
+def run_worker(database_path: str, clients: int, requests: int, warmup: int, output: str) -> None:
+    # Database is copied so creates never alter the cached dataset
+    work_dir = tempfile.mkdtemp(prefix="txn-load-")
+    working_copy = os.path.join(work_dir, "bench.db")
+    shutil.copyfile(database_path, working_copy)
+    os.environ["DATABASE_URL"] = f"sqlite:///{working_copy}"
+
+    from app.main import app
+
+    # Operations run one after another, all on one event loop
+    async def run_all() -> list[dict]:
+        return [await run_operation(app, operation, clients, requests, warmup) for operation in OPERATIONS]
+
+    try:
+        results = asyncio.run(run_all())
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(output, "w") as handle:
+        json.dump(results, handle)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure API latency and throughput at several dataset sizes")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR))
+    parser.add_argument("--output", help="result file, benchmarks/results by default")
+    parser.add_argument("--worker", metavar="DATABASE", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.clients, args.requests, args.warmup, args.worker_output)
+        return
+
+    results = []
+    print(f"{'rows':>11} {'operation':>9} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for row_count in args.rows:
+        # Datasets are generated once per size and reused by later runs
+        database_path = cached_database(args.data_dir, row_count)
+
+        # Each size runs in a fresh process because settings are read at import
+        with tempfile.NamedTemporaryFile(suffix=".json") as worker_output:
+            subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.bench_api_load",
+                    "--worker", database_path, "--worker-output", worker_output.name,
+                    "--clients", str(args.clients), "--requests", str(args.requests),
+                    "--warmup", str(args.warmup),
+                ],
+                check=True,
+            )
+            size_results = json.loads(Path(worker_output.name).read_text())
+
+        for result in size_results:
+            result["rows"] = row_count
+            results.append(result)
+            print(
+                f"{row_count:>11,} {result['operation']:>9} {result['throughput_rps']:>9,.0f} "
+                f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['errors']:>7}",
+                flush=True,
+            )
+
+    path = write_results("api_load", results, args.output)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
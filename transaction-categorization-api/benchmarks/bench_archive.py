@@ -0,0 +1,181 @@
+# Cold month archival benchmark, hot table size and list latency before and after archiving
+# Run from the project root with: python -m benchmarks.bench_archive --rows 1000000 10000000
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import date
+from pathlib import Path
+
+from benchmarks.common import write_results
+from benchmarks.datagen import cached_database
+
+# Generated databases are cached here between runs
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent / "data"
+
+
+def median_ms(run: Callable[[int], object], repeat: int) -> float:
+    # Each repeat gets its own index so queries move across the data
+    latencies = []
+    for index in range(repeat):
+        started = time.perf_counter()
+        run(index)
+        latencies.append(time.perf_counter() - started)
+    return round(statistics.median(latencies) * 1e3, 3)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure archiving closed months into compressed segments")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000], help="rows in the generated databases")
+    parser.add_argument("--before", default="2024-01", help="months before this one are archived")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR))
+    parser.add_argument("--output", help="result file, benchmarks/results by default")
+    args = parser.parse_args()
+
+    # Database URL is exported before any application module loads the settings
+    # Streaming opens its own session, so every size is copied to this one path in turn
+    workdir = tempfile.mkdtemp(prefix="txn-archive-")
+    database_path = os.path.join(workdir, "transactions.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{database_path}"
+    os.environ["ARCHIVE_DIR"] = os.path.join(workdir, "archive")
+
+    from app.core.config import settings
+    from app.db.session import SessionLocal, engine
+    from app.services import archive
+    from app.services.listing import fetch_transaction_rows, iter_transaction_rows
+    from app.services.summaries import month_summary
+
+    results = []
+    try:
+        for row_count in args.rows:
+            # Cached database is copied, so its rows are never modified
+            # Segments of the previous size are removed and forgotten, since their file names repeat
+            source_path = cached_database(args.data_dir, row_count)
+            engine.dispose()
+            shutil.rmtree(settings.archive_dir, ignore_errors=True)
+            shutil.copyfile(source_path, database_path)
+            archive.clear_segment_caches()
+
+            # Page starts are drawn once from the archived and the hot months
+            rng = random.Random(0)
+            archived_starts = [
+                date(rng.randint(2022, 2023), rng.randint(1, 12), rng.randint(1, 28)) for _ in range(args.repeat)
+            ]
+            hot_starts = [date(2024, rng.randint(1, 12), rng.randint(1, 28)) for _ in range(args.repeat)]
+            months = sorted({f"{start.year}-{start.month:02d}" for start in archived_starts})
+
+            with SessionLocal() as db:
+                # Reference answers are taken while every row is still in the table
+                expected_pages = [
+                    fetch_transaction_rows(db, start, None, None, args.page_size) for start in archived_starts
+                ]
+                expected_summaries = [month_summary(db, month) for month in months]
+                list_before_ms = median_ms(
+                    lambda index: fetch_transaction_rows(db, archived_starts[index], None, None, args.page_size),
+                    args.repeat,
+                )
+                year_before_s = time.perf_counter()
+                year_rows = sum(1 for _ in iter_transaction_rows(date(2023, 1, 1), date(2023, 12, 31)))
+                year_before_s = time.perf_counter() - year_before_s
+                db.rollback()
+
+            # The table is compacted first, so both sizes are measured the same way
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                connection.exec_driver_sql("VACUUM")
+            size_before = os.path.getsize(database_path)
+
+            with SessionLocal() as db:
+                # Months are archived one transaction at a time, as scripts.archive_months does
+                started = time.perf_counter()
+                months_to_archive = archive.archivable_months(db, args.before)
+                db.rollback()
+                archived_rows = segment_bytes = 0
+                for month in months_to_archive:
+                    segment = archive.archive_month(db, month)
+                    db.commit()
+                    archived_rows += segment["rows"]
+                    segment_bytes += segment["file_size"]
+                archive_s = time.perf_counter() - started
+
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                connection.exec_driver_sql("VACUUM")
+            size_after = os.path.getsize(database_path)
+
+            with SessionLocal() as db:
+                # Archived pages and summaries must match the answers from the table
+                pages = [fetch_transaction_rows(db, start, None, None, args.page_size) for start in archived_starts]
+                if [([tuple(row) for row in rows], cursor) for rows, cursor in pages] != [
+                    ([tuple(row) for row in rows], cursor) for rows, cursor in expected_pages
+                ]:
+                    raise SystemExit("archived pages differ from the rows they replaced")
+                if [month_summary(db, month) for month in months] != expected_summaries:
+                    raise SystemExit("month summaries changed after archiving")
+
+                # A page from a row group not yet decoded pays for reading it once
+                archive.clear_segment_caches()
+                cold_started = time.perf_counter()
+                fetch_transaction_rows(db, archived_starts[0], None, None, args.page_size)
+                cold_ms = round((time.perf_counter() - cold_started) * 1e3, 3)
+
+                list_after_ms = median_ms(
+                    lambda index: fetch_transaction_rows(db, archived_starts[index], None, None, args.page_size),
+                    args.repeat,
+                )
+                hot_ms = median_ms(
+                    lambda index: fetch_transaction_rows(db, hot_starts[index], None, None, args.page_size),
+                    args.repeat,
+                )
+                summary_ms = median_ms(lambda index: month_summary(db, months[index % len(months)]), args.repeat)
+                year_after_s = time.perf_counter()
+                if sum(1 for _ in iter_transaction_rows(date(2023, 1, 1), date(2023, 12, 31))) != year_rows:
+                    raise SystemExit("streamed year differs after archiving")
+                year_after_s = time.perf_counter() - year_after_s
+
+            results.append(
+                {
+                    "rows": row_count,
+                    "archived_rows": archived_rows,
+                    "archive_seconds": round(archive_s, 2),
+                    "database_bytes_before": size_before,
+                    "database_bytes_after": size_after,
+                    "segment_bytes": segment_bytes,
+                    "archived_list_page_before_ms": list_before_ms,
+                    "archived_list_page_ms": list_after_ms,
+                    "archived_list_page_cold_ms": cold_ms,
+                    "hot_list_page_ms": hot_ms,
+                    "archived_month_summary_ms": summary_ms,
+                    "stream_year_rows": year_rows,
+                    "stream_year_before_seconds": round(year_before_s, 3),
+                    "stream_year_archived_seconds": round(year_after_s, 3),
+                }
+            )
+    finally:
+        engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for result in results:
+        print(
+            f"{result['rows']:>12,} rows: archived {result['archived_rows']:,} in {result['archive_seconds']:.1f} s, "
+            f"database {result['database_bytes_before'] / 1e6:.1f} -> {result['database_bytes_after'] / 1e6:.1f} MB "
+            f"+ {result['segment_bytes'] / 1e6:.1f} MB segments"
+        )
+        print(
+            f"{'':>18}archived page {result['archived_list_page_before_ms']:.2f} -> "
+            f"{result['archived_list_page_ms']:.2f} ms (cold {result['archived_list_page_cold_ms']:.1f} ms), "
+            f"hot page {result['hot_list_page_ms']:.2f} ms, summary {result['archived_month_summary_ms']:.3f} ms, "
+            f"stream {result['stream_year_rows']:,} rows {result['stream_year_before_seconds']:.2f} -> "
+            f"{result['stream_year_archived_seconds']:.2f} s"
+        )
+
+    path = write_results("archive", results, args.output)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# Sync versus async database path concurrency benchmark
+# Run from the project root with: python -m benchmarks.bench_async_concurrency
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import synthetic_rows, use_temp_database
+
+
+async def client_session(
+    client,
+    requests_per_client: int,
+    latencies: list[float],
+    errors: list[int],
+    seed: int,
+) -> None:
+    # Each client cycles through create, list and summary requests
+    rows = synthetic_rows(requests_per_client, seed=seed)
+    for index, row in enumerate(rows):
+        started = time.perf_counter()
+        if index % 3 == 0:
+            response = await client.post("/transactions/", json=row)
+        elif index % 3 == 1:
+            response = await client.get("/transactions/", params={"start": row["date"], "limit": 50})
+        else:
+            response = await client.get("/transactions/summary", params={"month": row["date"][:7]})
+        latencies.append(time.perf_counter() - started)
+
+        # Failed requests, such as pool checkout timeouts, are counted
+        if response.status_code >= 400:
+            errors.append(response.status_code)
+
+
+async def run_level(app, clients: int, requests_per_client: int) -> tuple[float, float, float, int]:
+    import httpx
+
+    # All clients share one in-process ASGI transport
+    # Application errors are returned as responses so they can be counted
+    latencies: list[float] = []
+    errors: list[int] = []
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                client_session(client, requests_per_client, latencies, errors, seed)
+                for seed in range(clients)
+            )
+        )
+        elapsed = time.perf_counter() - started
+
+    # Throughput, median and 95th percentile latency and errors are returned
+    percentiles = statistics.quantiles(latencies, n=100)
+    return len(latencies) / elapsed, percentiles[49] * 1000, percentiles[94] * 1000, len(errors)
+
+
+def run_mode(levels: list[int], requests_per_client: int) -> None:
+    # Database is isolated before the application is imported
+    use_temp_database()
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    # Some history is loaded so list and summary requests have work to do
+    TestClient(app).post("/transactions/bulk", json=synthetic_rows(20_000)).raise_for_status()
+
+    mode = "async" if os.environ.get("USE_ASYNC_DB") == "true" else "sync"
+
+    # All levels share one event loop because pooled async connections are bound to it
+    async def run_levels() -> None:
+        for clients in levels:
+            throughput, p50, p95, errors = await run_level(app, clients, requests_per_client)
+            print(
+                f"{mode:>5} {clients:>6} clients {throughput:>8,.0f} req/s  "
+                f"p50 {p50:8.1f} ms  p95 {p95:8.1f} ms  errors {errors}",
+                flush=True,
+            )
+
+    asyncio.run(run_levels())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare sync and async routes under concurrency")
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--requests-per-client", type=int, default=6)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_mode(args.clients, args.requests_per_client)
+        return
+
+    # Each mode runs in its own process because settings are read at import
+    for use_async in ("false", "true"):
+        subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.bench_async_concurrency", "--worker",
+                "--requests-per-client", str(args.requests_per_client),
+                "--clients", *map(str, args.clients),
+            ],
+            env={**os.environ, "USE_ASYNC_DB": use_async},
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
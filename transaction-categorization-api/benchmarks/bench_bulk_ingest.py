@@ -0,0 +1,56 @@
+# Bulk ingest throughput benchmark
+# Run from the project root with: python -m benchmarks.bench_bulk_ingest
+import argparse
+import json
+import time
+
+from benchmarks.common import synthetic_rows, use_temp_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare per-row and bulk ingest throughput")
+    parser.add_argument("--rows", type=int, default=20_000, help="rows sent through each bulk path")
+    parser.add_argument("--single-rows", type=int, default=1_000, help="rows sent one request at a time")
+    args = parser.parse_args()
+
+    # Database is isolated before the application is imported
+    use_temp_database()
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    client = TestClient(app)
+    rows = synthetic_rows(args.rows)
+
+    # Baseline is measured with one POST per row
+    started = time.perf_counter()
+    for row in rows[: args.single_rows]:
+        client.post("/transactions/", json=row).raise_for_status()
+    single_elapsed = time.perf_counter() - started
+
+    # Bulk ingest is measured with a JSON array body
+    started = time.perf_counter()
+    response = client.post("/transactions/bulk", json=rows)
+    response.raise_for_status()
+    array_elapsed = time.perf_counter() - started
+
+    # Bulk ingest is measured with an NDJSON body
+    body = "\n".join(json.dumps(row) for row in rows)
+    started = time.perf_counter()
+    response = client.post(
+        "/transactions/bulk",
+        content=body,
+        headers={"content-type": "application/x-ndjson"},
+    )
+    response.raise_for_status()
+    ndjson_elapsed = time.perf_counter() - started
+
+    # Throughput is reported in rows per second
+    print(f"single POST  : {args.single_rows / single_elapsed:12,.0f} rows/s")
+    print(f"bulk (array) : {args.rows / array_elapsed:12,.0f} rows/s")
+    print(f"bulk (ndjson): {args.rows / ndjson_elapsed:12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
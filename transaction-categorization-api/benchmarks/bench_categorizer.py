@@ -0,0 +1,93 @@
+# Categorizer micro-benchmarks
+# Run from the project root with: python -m benchmarks.bench_categorizer
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+
+from app.services.categorizer import (
+    categorize_batch,
+    categorize_transaction,
+    get_rule_engine,
+    set_rule_engine,
+)
+from app.services.merchant import normalize_merchant
+from benchmarks.common import write_results
+from benchmarks.datagen import generate_rows
+
+
+def time_per_op(run: Callable[[], int], repeat: int, setup: Callable[[], None] | None = None) -> dict:
+    # Each repeat times one full pass, the median pass is reported per operation
+    per_op = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        operations = run()
+        per_op.append((time.perf_counter() - started) / operations)
+    return {
+        "median_ns": round(statistics.median(per_op) * 1e9, 1),
+        "best_ns": round(min(per_op) * 1e9, 1),
+        "operations": operations,
+    }
+
+
+def clear_category_cache() -> None:
+    # Reinstalling the active engine flushes the category cache
+    set_rule_engine(get_rule_engine())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure categorizer cost per merchant")
+    parser.add_argument("--merchants", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="result file, benchmarks/results by default")
+    args = parser.parse_args()
+
+    # Merchants follow the generator's Zipf distribution, like real statement traffic
+    merchants = [row["merchant"] for row in generate_rows(args.merchants, seed=1)]
+    distinct = list(dict.fromkeys(merchants))
+    normalized = [normalize_merchant(merchant) for merchant in distinct]
+    engine = get_rule_engine()
+
+    def run_each(function: Callable[[str], object], values: list[str]) -> Callable[[], int]:
+        def run() -> int:
+            for value in values:
+                function(value)
+            return len(values)
+        return run
+
+    def run_batches() -> int:
+        for start in range(0, len(merchants), 500):
+            categorize_batch(merchants[start:start + 500])
+        return len(merchants)
+
+    cases = {
+        # Normalization alone
+        "normalize_merchant": time_per_op(run_each(normalize_merchant, distinct), args.repeat),
+        # Compiled rule engine scan on normalized names, without the cache
+        "rule_engine_categorize": time_per_op(run_each(engine.categorize, normalized), args.repeat),
+        # Every lookup misses: normalization, engine scan and cache insert
+        "categorize_transaction_cold": time_per_op(
+            run_each(categorize_transaction, distinct), args.repeat, setup=clear_category_cache
+        ),
+        # Skewed traffic against a warm cache, the steady state in production
+        "categorize_transaction_warm": time_per_op(run_each(categorize_transaction, merchants), args.repeat),
+        # Bulk ingest path, deduplicating merchants within 500 row chunks
+        "categorize_batch_500": time_per_op(run_batches, args.repeat, setup=clear_category_cache),
+    }
+
+    print(f"{len(distinct):,} distinct merchants in {len(merchants):,} lookups")
+    for name, result in cases.items():
+        print(f"{name:>28}: {result['median_ns']:10.1f} ns/op")
+
+    path = write_results(
+        "categorizer",
+        [{"case": name, **result} for name, result in cases.items()],
+        args.output,
+    )
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# Change feed benchmark, incremental sync against re-downloading the whole table
+# Run from the project root with: python -m benchmarks.bench_change_feed --rows 1000000 10000000
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from benchmarks.common import write_results
+from benchmarks.datagen import cached_database, generate_rows
+
+# Generated databases are cached here between runs
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent / "data"
+
+
+def median_ms(run: Callable[[], object], repeat: int) -> tuple[float, object]:
+    # Median wall time is returned with the result of the last run
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        latencies.append(time.perf_counter() - started)
+    return round(statistics.median(latencies) * 1e3, 3), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure change feed reads against a full re-download")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000], help="rows in the generated databases")
+    parser.add_argument("--changes", type=int, default=1000, help="rows inserted, moved and deleted after the sync")
+    parser.add_argument("--limit", type=int, default=1000, help="changes per feed page")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR))
+    parser.add_argument("--output", help="result file, benchmarks/results by default")
+    args = parser.parse_args()
+
+    from sqlalchemy import select, update
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core.responses import dumps_json
+    from app.db.session import create_shard_engine
+    from app.models.transaction import Transaction
+    from app.services.changes import allocate_change_seqs, delete_transaction, largest_change_seq, read_changes
+    from app.services.ingest import ingest_chunk
+    from app.services.listing import decode_cursor, fetch_transaction_rows, transaction_rows_content
+
+    results = []
+    for row_count in args.rows:
+        source_path = cached_database(args.data_dir, row_count)
+        workdir = tempfile.mkdtemp(prefix="txn-changes-")
+        try:
+            # Cached database is copied, so its rows are never modified
+            database_path = os.path.join(workdir, "transactions.db")
+            shutil.copyfile(source_path, database_path)
+            engine = create_shard_engine(database_path)
+            session_factory = sessionmaker(bind=engine, autoflush=False)
+
+            with session_factory() as db:
+                # A client that synced everything holds the current cursor
+                cursor = largest_change_seq(db.connection())
+
+                # Full re-download walks every page of the list endpoint, as clients did before the feed
+                def full_download() -> int:
+                    after, size = None, 0
+                    while True:
+                        rows, next_cursor = fetch_transaction_rows(db, None, None, after, args.limit)
+                        size += len(dumps_json(transaction_rows_content(rows)))
+                        if next_cursor is None:
+                            return size
+                        after = decode_cursor(next_cursor)
+
+                full_ms, full_bytes = median_ms(full_download, 1)
+
+                # A poll without changes only probes the ends of the sequence index
+                empty_ms, empty = median_ms(lambda: read_changes(db, cursor, args.limit), args.repeat)
+
+                # Changes are made as clients would see them: half new rows, a quarter moved and a quarter deleted
+                ingest_chunk(db, list(enumerate(generate_rows(args.changes // 2, seed=11))))
+                old_ids = db.execute(
+                    select(Transaction.id).order_by(Transaction.id).limit(args.changes // 2)
+                ).scalars().all()
+                moved_ids, deleted_ids = old_ids[::2], old_ids[1::2]
+
+                # Moved rows are renumbered as re-categorization does, without depending on the rules
+                first_seq = allocate_change_seqs(db, len(moved_ids))
+                db.execute(
+                    update(Transaction).execution_options(synchronize_session=False),
+                    [{"id": row_id, "change_seq": first_seq + offset} for offset, row_id in enumerate(moved_ids)],
+                )
+                for row_id in deleted_ids:
+                    delete_transaction(db, row_id)
+                db.commit()
+
+                # The delta is read page by page from the old cursor
+                def sync() -> tuple[int, int]:
+                    since, count, size = cursor, 0, 0
+                    while True:
+                        page = read_changes(db, since, args.limit)
+                        count += len(page["changes"])
+                        size += len(dumps_json(page))
+                        since = page["next_since"]
+                        if not page["has_more"]:
+                            return count, size
+
+                delta_ms, (delta_count, delta_bytes) = median_ms(sync, args.repeat)
+
+            engine.dispose()
+            results.append(
+                {
+                    "rows": row_count,
+                    "full_download_ms": full_ms,
+                    "full_download_bytes": full_bytes,
+                    "empty_poll_ms": empty_ms,
+                    "empty_poll_bytes": len(dumps_json(empty)),
+                    "changes": delta_count,
+                    "delta_sync_ms": delta_ms,
+                    "delta_sync_bytes": delta_bytes,
+                }
+            )
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    for result in results:
+        print(
+            f"{result['rows']:>12,} rows: full download {result['full_download_ms']:9.1f} ms "
+            f"{result['full_download_bytes'] / 1e6:8.1f} MB  empty poll {result['empty_poll_ms']:6.3f} ms  "
+            f"{result['changes']:,} changes {result['delta_sync_ms']:7.2f} ms {result['delta_sync_bytes'] / 1e3:7.1f} kB"
+        )
+
+    path = write_results("change_feed", results, args.output)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
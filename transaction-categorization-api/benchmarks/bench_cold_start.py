@@ -0,0 +1,104 @@
+# Cold start benchmark, from application import to the first served request
+# Run from the project root with: python -m benchmarks.bench_cold_start --rows 1000000
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.common import write_results
+from benchmarks.datagen import cached_database
+
+# Generated databases are cached here between runs
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent / "data"
+
+# Phases reported by every worker process, in order
+PHASES = ("import_ms", "startup_ms", "first_request_ms", "total_ms")
+
+
+def run_worker() -> None:
+    # The client library is imported first so it is not counted in any phase
+    import httpx
+
+    # Application import is timed on its own
+    started = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    async def start_and_request() -> tuple[float, float]:
+        # Lifespan startup runs as a server would run it before accepting connections
+        async with app.router.lifespan_context(app):
+            ready = time.perf_counter()
+
+            # First request is a list page, which touches the pool, the query path and the encoder
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                response = await client.get("/transactions/", params={"limit": 50})
+                response.raise_for_status()
+            served = time.perf_counter()
+        return ready, served
+
+    ready, served = asyncio.run(start_and_request())
+    print(
+        json.dumps(
+            {
+                "import_ms": (imported - started) * 1e3,
+                "startup_ms": (ready - imported) * 1e3,
+                "first_request_ms": (served - ready) * 1e3,
+                "total_ms": (served - started) * 1e3,
+            }
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure import to first request latency of a fresh worker")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows in the generated database")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR))
+    parser.add_argument("--output", help="result file, benchmarks/results by default")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker()
+        return
+
+    # Database is generated and migrated once, as a deployment migrates before starting workers
+    database_path = cached_database(args.data_dir, args.rows)
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database_path}"}
+
+    # Every run is a new interpreter, so nothing is cached between runs
+    runs = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_cold_start", "--worker"],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        run = json.loads(completed.stdout.strip().splitlines()[-1])
+        run["process_ms"] = (time.perf_counter() - started) * 1e3
+        runs.append(run)
+
+    # Median of each phase is reported
+    results = [
+        {"phase": phase, "median_ms": round(statistics.median(run[phase] for run in runs), 2)}
+        for phase in (*PHASES, "process_ms")
+    ]
+    print(f"{args.runs} cold starts against {args.rows:,} rows")
+    for result in results:
+        print(f"{result['phase']:>18}: {result['median_ms']:9.2f} ms")
+
+    path = write_results("cold_start", results, args.output)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
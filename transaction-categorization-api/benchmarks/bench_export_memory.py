@@ -0,0 +1,94 @@
+# Export peak memory benchmark
+# Run from the project root with: python -m benchmarks.bench_export_memory
+import argparse
+import sqlite3
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchmarks.bench_monthly_summary import POPULATE_SQL
+from benchmarks.common import use_temp_database
+
+
+def measure(label: str, produce) -> None:
+    # Peak Python heap usage and wall time are reported for one export
+    tracemalloc.start()
+    started = time.perf_counter()
+    total_bytes = produce()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>22}: peak {peak / 2**20:8.1f} MiB  {total_bytes / 2**20:9.1f} MiB out  {elapsed:7.2f} s")
+
+
+def run_worker(row_count: int, buffered_max_rows: int) -> None:
+    # Database is isolated before the application is imported
+    database_url = use_temp_database()
+
+    # Synthetic rows are generated inside SQLite
+    connection = sqlite3.connect(database_url.removeprefix("sqlite:///"))
+    connection.execute(POPULATE_SQL, {"rows": row_count})
+    connection.commit()
+    connection.close()
+
+    from app.db.session import SessionLocal
+    from app.schemas.transaction import TransactionRead
+    from app.services.listing import (
+        csv_chunks,
+        fetch_transaction_page,
+        gzip_chunks,
+        iter_transaction_rows,
+        ndjson_chunks,
+    )
+
+    print(f"== {row_count:,} rows", flush=True)
+    measure("csv stream", lambda: sum(map(len, csv_chunks(iter_transaction_rows()))))
+    measure("ndjson stream", lambda: sum(map(len, ndjson_chunks(iter_transaction_rows()))))
+    measure("csv stream + gzip", lambda: sum(map(len, gzip_chunks(csv_chunks(iter_transaction_rows())))))
+
+    # The buffered JSON list path is measured for comparison on smaller sizes
+    if row_count <= buffered_max_rows:
+
+        def buffered() -> int:
+            with SessionLocal() as db:
+                transactions, _ = fetch_transaction_page(db)
+                payload = [
+                    TransactionRead.model_validate(row).model_dump(mode="json")
+                    for row in transactions
+                ]
+                return len(str(payload))
+
+        measure("buffered list", buffered)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure peak memory of streamed exports")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument(
+        "--buffered-max-rows",
+        type=int,
+        default=1_000_000,
+        help="largest size also measured with the buffered list path",
+    )
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.rows[0], args.buffered_max_rows)
+        return
+
+    # Each size runs in its own process with its own database
+    for row_count in args.rows:
+        subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.bench_export_memory", "--worker",
+                "--rows", str(row_count),
+                "--buffered-max-rows", str(args.buffered_max_rows),
+            ],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Fallback categorizer inference benchmark
+# Run from the project root with: python -m benchmarks.bench_fallback_model
+import argparse
+import statistics
+import time
+from collections import Counter
+
+from app.services.categorizer import get_rule_engine
+from app.services.fallback_model import NaiveBayesFallback
+from app.services.merchant import normalize_merchant
+from benchmarks.common import write_results
+from benchmarks.datagen import MerchantDistribution
+
+# Batch sizes measured, from a single create up to a bulk ingest chunk
+BATCH_SIZES = (1, 100, 1_000, 10_000)
+
+
+def labelled_merchants(merchant_count: int, seed: int) -> tuple[list[str], list[str]]:
+    # Generated merchants are labelled by the shipped rules, like the training script does
+    engine = get_rule_engine()
+    names = [normalize_merchant(name) for name, _ in MerchantDistribution(merchant_count, seed=seed).merchants]
+    labels = [engine.categorize(name) for name in names]
+    labelled = [(name, label) for name, label in zip(names, labels) if label != engine.default_category]
+    return [name for name, _ in labelled], [label for _, label in labelled]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure fallback categorizer inference cost per batch")
+    parser.add_argument("--merchants", type=int, default=20_000)
+    parser.add_argument("--bits", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="result file, benchmarks/results by default")
+    args = parser.parse_args()
+
+    # Model is trained on one merchant universe and evaluated on another
+    # Store numbers, reference ids and cities differ between the two
+    train_names, train_labels = labelled_merchants(args.merchants, seed=0)
+    test_names, test_labels = labelled_merchants(args.merchants, seed=1)
+    started = time.perf_counter()
+    model = NaiveBayesFallback.train(train_names, train_labels, bits=args.bits)
+    train_seconds = time.perf_counter() - started
+
+    # Holdout accuracy is reported for every prediction and for confident ones only
+    probabilities = model.predict_proba(test_names)
+    predicted = model.classes[probabilities.argmax(axis=1)]
+    correct = predicted == test_labels
+    confident = probabilities.max(axis=1) >= 0.8
+    print(
+        f"trained on {len(train_names):,} merchants in {train_seconds * 1e3:.0f} ms, "
+        f"model {model.feature_log_prob.nbytes / 1024:.0f} KiB for {len(model.classes)} categories"
+    )
+    print(
+        f"holdout accuracy {correct.mean():.1%}, "
+        f"{confident.mean():.1%} confident at 0.8 with accuracy {correct[confident].mean():.1%}"
+    )
+
+    # Each batch size is timed over repeated predict calls, the median call is reported
+    results = []
+    print(f"{'batch':>7} {'us/batch':>12} {'us/merchant':>12}")
+    for batch_size in BATCH_SIZES:
+        batch = (test_names * (batch_size // len(test_names) + 1))[:batch_size]
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            model.predict(batch, 0.8)
+            timings.append(time.perf_counter() - started)
+        per_batch_us = statistics.median(timings) * 1e6
+        results.append({
+            "batch_size": batch_size,
+            "median_us_per_batch": round(per_batch_us, 1),
+            "median_us_per_merchant": round(per_batch_us / batch_size, 3),
+        })
+        print(f"{batch_size:>7,} {per_batch_us:>12.1f} {per_batch_us / batch_size:>12.3f}")
+
+    path = write_results(
+        "fallback_model",
+        [{
+            "case": "holdout",
+            "train_merchants": len(train_names),
+            "categories": dict(Counter(train_labels)),
+            "accuracy": round(float(correct.mean()), 4),
+            "confident_share": round(float(confident.mean()), 4),
+            "confident_accuracy": round(float(correct[confident].mean()), 4),
+        }] + results,
+        args.output,
+    )
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
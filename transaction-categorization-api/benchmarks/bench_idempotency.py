@@ -0,0 +1,110 @@
+# Idempotent ingest benchmark, external id lookups and their cost on bulk ingest
+# Run from the project root with: python -m benchmarks.bench_idempotency --rows 1000000 10000000
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from benchmarks.common import write_results
+from benchmarks.datagen import cached_database, generate_rows
+
+# Generated databases are cached here between runs
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent / "data"
+
+
+def median_us(run: Callable[[int], object], repeat: int) -> float:
+    # Each repeat gets its own index so lookups move across the table
+    latencies = []
+    for index in range(repeat):
+        started = time.perf_counter()
+        run(index)
+        latencies.append(time.perf_counter() - started)
+    return round(statistics.median(latencies) * 1e6, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure external id lookups and idempotent ingest")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000], help="rows in the generated databases")
+    parser.add_argument("--chunk", type=int, default=1000, help="rows per ingest chunk and per batched lookup")
+    parser.add_argument("--ingest-rows", type=int, default=50_000, help="rows ingested in each mode")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR))
+    parser.add_argument("--output", help="result file, benchmarks/results by default")
+    args = parser.parse_args()
+
+    from sqlalchemy import text
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db.session import create_shard_engine
+    from app.services.ingest import find_external_rows, ingest_chunk
+
+    results = []
+    for row_count in args.rows:
+        source_path = cached_database(args.data_dir, row_count)
+        workdir = tempfile.mkdtemp(prefix="txn-idempotency-")
+        try:
+            # Every copied row gets an external id, so the unique index holds the whole table
+            database_path = os.path.join(workdir, "transactions.db")
+            shutil.copyfile(source_path, database_path)
+            engine = create_shard_engine(database_path)
+            started = time.perf_counter()
+            with engine.begin() as connection:
+                connection.execute(text("UPDATE transactions SET external_id = 'ext-' || id"))
+            backfill_seconds = time.perf_counter() - started
+            session_factory = sessionmaker(bind=engine, autoflush=False)
+
+            rng = random.Random(0)
+            with session_factory() as db:
+                last_id = db.execute(text("SELECT max(id) FROM transactions")).scalar_one()
+
+                # Single ids and full chunks are looked up, stored ones and unknown ones
+                def single_hit(index: int) -> None:
+                    find_external_rows(db, [f"ext-{rng.randint(1, last_id)}"])
+
+                def single_miss(index: int) -> None:
+                    find_external_rows(db, [f"missing-{index}"])
+
+                def chunk_hit(index: int) -> None:
+                    find_external_rows(db, [f"ext-{rng.randint(1, last_id)}" for _ in range(args.chunk)])
+
+                result = {
+                    "rows": row_count,
+                    "external_id_backfill_s": round(backfill_seconds, 1),
+                    "single_hit_us": median_us(single_hit, args.repeat),
+                    "single_miss_us": median_us(single_miss, args.repeat),
+                    "chunk_hit_us_per_row": round(median_us(chunk_hit, max(args.repeat // 20, 5)) / args.chunk, 2),
+                }
+
+                # The same rows are ingested without keys, with new keys, and again as a retry of the keyed ingest
+                raw_rows = list(generate_rows(args.ingest_rows, seed=7))
+                for mode, key in (("no_key", None), ("new_keys", "bench"), ("retried_keys", "bench")):
+                    started = time.perf_counter()
+                    for offset in range(0, len(raw_rows), args.chunk):
+                        chunk = list(enumerate(raw_rows[offset:offset + args.chunk], start=offset))
+                        ingest_chunk(db, chunk, key)
+                        db.commit()
+                    result[f"{mode}_rows_per_second"] = round(len(raw_rows) / (time.perf_counter() - started))
+            engine.dispose()
+            results.append(result)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    for result in results:
+        print(
+            f"{result['rows']:>12,} rows: lookup hit {result['single_hit_us']:7.1f} us  "
+            f"miss {result['single_miss_us']:7.1f} us  chunk {result['chunk_hit_us_per_row']:6.2f} us/row  "
+            f"ingest no key {result['no_key_rows_per_second']:>7,}  new keys {result['new_keys_rows_per_second']:>7,}  "
+            f"retried {result['retried_keys_rows_per_second']:>7,} rows/s"
+        )
+
+    path = write_results("idempotency", results, args.output)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
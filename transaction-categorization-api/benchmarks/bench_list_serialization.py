@@ -0,0 +1,141 @@
+# Transaction list serialization benchmark
+# Run from the project root with: python -m benchmarks.bench_list_serialization --page-size 1000
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections.abc import Callable
+from datetime import date
+from pathlib import Path
+
+from benchmarks.common import write_results
+from benchmarks.datagen import cached_database
+
+# Generated databases are cached here between runs
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent / "data"
+
+# Page start dates cycle through the generated range so pages differ between requests
+PAGE_STARTS = [date(2022, month, 1) for month in range(1, 13)]
+
+
+def time_per_row(run: Callable[[], int], repeat: int) -> dict:
+    # Each repeat encodes one page, the median page is reported per row
+    per_row = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = run()
+        per_row.append((time.perf_counter() - started) / rows)
+    return {"median_us_per_row": round(statistics.median(per_row) * 1e6, 3), "rows": rows}
+
+
+async def time_requests(app, path: str, page_size: int, repeat: int) -> dict:
+    import httpx
+
+    # Requests go through the ASGI interface directly, so the whole route pipeline is measured
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies = []
+        for index in range(repeat):
+            params = {"start": PAGE_STARTS[index % len(PAGE_STARTS)].isoformat(), "limit": page_size}
+            started = time.perf_counter()
+            response = await client.get(path, params=params)
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+    median = statistics.median(latencies)
+    return {"median_ms": round(median * 1e3, 3), "median_us_per_row": round(median / page_size * 1e6, 3)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure per-row cost of the transaction list response")
+    parser.add_argument("--rows", type=int, default=100_000, help="rows in the generated database")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR))
+    parser.add_argument("--output", help="result file, benchmarks/results by default")
+    args = parser.parse_args()
+
+    # Database URL is exported before generation, which already imports the application settings
+    # The database is generated once and only read by this benchmark
+    database_path = os.path.join(args.data_dir, f"transactions-{args.rows}-0.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{database_path}"
+    cached_database(args.data_dir, args.rows)
+
+    from fastapi import APIRouter, Depends
+    from pydantic import TypeAdapter
+
+    from app.api.routes.transactions import get_db
+    from app.core.responses import orjson
+    from app.db.session import SessionLocal
+    from app.main import app
+    from app.schemas.transaction import TransactionRead
+    from app.services.listing import fetch_transaction_page, fetch_transaction_rows, transaction_rows_content
+
+    # Former list route is mounted next to the current one for an end-to-end comparison
+    # It returns ORM objects that FastAPI validates against the response model row by row
+    baseline = APIRouter()
+
+    @baseline.get("/bench/validated", response_model=list[TransactionRead])
+    def validated_list(start: date, limit: int, db=Depends(get_db)):
+        transactions, _ = fetch_transaction_page(db, start, None, None, limit)
+        return transactions
+
+    app.include_router(baseline)
+
+    # One page is loaded once in both shapes, so only encoding is timed below
+    with SessionLocal() as db:
+        transactions, _ = fetch_transaction_page(db, PAGE_STARTS[0], None, None, args.page_size)
+        rows, _ = fetch_transaction_rows(db, PAGE_STARTS[0], None, None, args.page_size)
+        db.expunge_all()
+
+    adapter = TypeAdapter(list[TransactionRead])
+
+    def response_model_path() -> int:
+        # ORM rows are validated into models and dumped, as FastAPI does for a response model
+        adapter.dump_json(adapter.validate_python(transactions, from_attributes=True))
+        return len(transactions)
+
+    def stdlib_path() -> int:
+        # Column tuples are shaped into dicts and encoded by the standard library
+        json.dumps(transaction_rows_content(rows), ensure_ascii=False, separators=(",", ":")).encode()
+        return len(rows)
+
+    def orjson_path() -> int:
+        # Column tuples are shaped into dicts and encoded by orjson
+        orjson.dumps(transaction_rows_content(rows))
+        return len(rows)
+
+    cases = {
+        "response_model_validation": time_per_row(response_model_path, args.repeat),
+        "tuples_stdlib_json": time_per_row(stdlib_path, args.repeat),
+    }
+    if orjson is not None:
+        cases["tuples_orjson"] = time_per_row(orjson_path, args.repeat)
+
+    print(f"serialization of a {args.page_size} row page")
+    for name, result in cases.items():
+        print(f"{name:>28}: {result['median_us_per_row']:8.3f} us/row")
+
+    # Whole requests are timed against both routes, including the query
+    async def run_requests() -> dict:
+        return {
+            "request_validated_route": await time_requests(app, "/bench/validated", args.page_size, args.repeat),
+            "request_fast_route": await time_requests(app, "/transactions/", args.page_size, args.repeat),
+        }
+
+    requests = asyncio.run(run_requests())
+    print(f"GET of a {args.page_size} row page")
+    for name, result in requests.items():
+        print(f"{name:>28}: {result['median_ms']:8.2f} ms  {result['median_us_per_row']:8.3f} us/row")
+
+    path = write_results(
+        "list_serialization",
+        [{"case": name, "page_size": args.page_size, **result} for name, result in {**cases, **requests}.items()],
+        args.output,
+    )
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# Merchant sketch benchmark, sketch-backed analytics against exact GROUP BY queries
+# Run from the project root with: python -m benchmarks.bench_merchant_sketches --rows 10000000
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from collections import Counter
+from collections.abc import Callable
+from pathlib import Path
+
+from benchmarks.common import write_results
+from benchmarks.datagen import cached_database
+
+# Generated databases are cached here between runs
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent / "data"
+
+
+def median_ms(run: Callable[[], object], repeat: int) -> tuple[float, object]:
+    # Median wall time is returned with the result of the last run
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = run()
+        latencies.append(time.perf_counter() - started)
+    return round(statistics.median(latencies) * 1e3, 3), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare merchant sketches with exact merchant queries")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows in the generated database")
+    parser.add_argument("--capacity", type=int, help="top merchant counters per month, the setting by default")
+    parser.add_argument("--limit", type=int, default=20, help="merchants in the top list")
+    parser.add_argument("--chunk", type=int, default=1000, help="rows per streamed sketch update")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR))
+    parser.add_argument("--output", help="result file, benchmarks/results by default")
+    args = parser.parse_args()
+
+    # Capacity is exported before any application module loads the settings
+    if args.capacity:
+        os.environ["TOP_MERCHANT_CAPACITY"] = str(args.capacity)
+    source_path = cached_database(args.data_dir, args.rows)
+
+    from sqlalchemy import delete, func, select
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core.config import settings
+    from app.db.session import create_shard_engine
+    from app.models.merchant_sketch import MonthlyMerchantSketch, MonthlyTopMerchantCounter, MonthlyTopMerchants
+    from app.models.transaction import Transaction
+    from app.services.analytics import distinct_merchants, top_merchants
+    from app.services.merchant import normalize_merchant
+    from app.services.merchant_sketches import record_sketch_rows
+
+    workdir = tempfile.mkdtemp(prefix="txn-sketches-")
+    try:
+        # Cached database is copied, so its sketches are never modified
+        database_path = os.path.join(workdir, "transactions.db")
+        shutil.copyfile(source_path, database_path)
+        engine = create_shard_engine(database_path)
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+
+        with session_factory() as db:
+            # Sketches are rebuilt by streaming the rows in insertion order, as ingest maintains them
+            db.execute(delete(MonthlyTopMerchants))
+            db.execute(delete(MonthlyTopMerchantCounter))
+            db.execute(delete(MonthlyMerchantSketch))
+            started = time.perf_counter()
+            rows = db.execute(
+                select(Transaction.date, Transaction.merchant, Transaction.category).order_by(Transaction.id)
+            )
+            while batch := rows.fetchmany(args.chunk):
+                record_sketch_rows(db, batch)
+            db.commit()
+            stream_seconds = time.perf_counter() - started
+
+            last_month = db.execute(select(func.max(Transaction.date))).scalar_one().strftime("%Y-%m")
+            year = int(last_month[:4]) - 1
+
+            # Exact answers normalize every distinct spelling of the range, as the sketches do
+            def exact(start: str, end: str) -> tuple[Counter, int]:
+                month = func.strftime("%Y-%m", Transaction.date)
+                counts: Counter = Counter()
+                for merchant, count in db.execute(
+                    select(Transaction.merchant, func.count())
+                    .where(month >= start, month <= end)
+                    .group_by(Transaction.merchant)
+                ):
+                    counts[normalize_merchant(merchant)] += count
+                return counts, len(counts)
+
+            results = []
+            for label, start, end in (
+                ("quarter", f"{year}-04", f"{year}-06"),
+                ("year", f"{year}-01", f"{year}-12"),
+            ):
+                exact_ms, (counts, distinct) = median_ms(lambda: exact(start, end), args.repeat)
+                top_ms, top = median_ms(lambda: top_merchants(db, start, end, args.limit), args.repeat)
+                distinct_ms, estimate = median_ms(lambda: distinct_merchants(db, start, end), args.repeat)
+
+                # Recall compares the reported list with the true top merchants
+                # Count error is the largest gap between a reported count and the true one
+                true_top = {merchant for merchant, _ in counts.most_common(args.limit)}
+                reported = top["merchants"]
+                count_errors = [(item["count"] - counts[item["merchant"]]) / counts[item["merchant"]] for item in reported]
+                bound_violations = sum(
+                    not item["count_lower_bound"] <= counts[item["merchant"]] <= item["count"] for item in reported
+                )
+                distinct_estimate = estimate["distinct_merchants"]["estimate"]
+                results.append(
+                    {
+                        "range": label,
+                        "start": start,
+                        "end": end,
+                        "exact_ms": exact_ms,
+                        "top_merchants_ms": top_ms,
+                        "distinct_merchants_ms": distinct_ms,
+                        "top_recall": round(len(true_top & {item["merchant"] for item in reported}) / len(true_top), 4),
+                        "max_count_error": round(max(count_errors), 5),
+                        "bound_violations": bound_violations,
+                        "guaranteed": sum(item["guaranteed"] for item in reported),
+                        "distinct_exact": distinct,
+                        "distinct_estimate": distinct_estimate,
+                        "distinct_error": round((distinct_estimate - distinct) / distinct, 5),
+                    }
+                )
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(
+        f"{args.rows:,} rows, {settings.top_merchant_capacity} counters per month, "
+        f"sketches streamed in {stream_seconds:.1f} s"
+    )
+    for result in results:
+        print(
+            f"{result['range']:>8}: exact {result['exact_ms']:9.2f} ms  "
+            f"top {result['top_merchants_ms']:7.2f} ms  distinct {result['distinct_merchants_ms']:7.2f} ms  "
+            f"recall {result['top_recall']:.3f}  count error {result['max_count_error']:+.3%}  "
+            f"guaranteed {result['guaranteed']}/{args.limit}  "
+            f"distinct {result['distinct_estimate']:,} vs {result['distinct_exact']:,} ({result['distinct_error']:+.2%})"
+        )
+
+    path = write_results("merchant_sketches", results, args.output)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
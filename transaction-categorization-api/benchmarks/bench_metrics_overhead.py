@@ -0,0 +1,90 @@
+# Metrics collection overhead benchmark
+# Run from the project root with: python -m benchmarks.bench_metrics_overhead
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import synthetic_rows, use_temp_database
+
+# Requests issued in each round, cycling through cheap read and write routes
+REQUEST_MIX = ("list", "summary", "create", "health")
+
+
+async def run_round(app, requests: int) -> list[float]:
+    import httpx
+
+    # A single client issues requests back to back so per-request cost is visible
+    rows = synthetic_rows(requests, seed=7)
+    latencies: list[float] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for index, row in enumerate(rows):
+            kind = REQUEST_MIX[index % len(REQUEST_MIX)]
+            started = time.perf_counter()
+            if kind == "list":
+                response = await client.get("/transactions/", params={"start": row["date"], "limit": 20})
+            elif kind == "summary":
+                response = await client.get("/transactions/summary", params={"month": row["date"][:7]})
+            elif kind == "create":
+                response = await client.post("/transactions/", json=row)
+            else:
+                response = await client.get("/health")
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+    return latencies
+
+
+def run_mode(requests: int, rounds: int) -> None:
+    # Database is isolated before the application is imported
+    use_temp_database()
+
+    from fastapi.testclient import TestClient
+
+    from app.core.config import settings
+    from app.main import app
+
+    # Some history is loaded so list and summary requests have work to do
+    TestClient(app).post("/transactions/bulk", json=synthetic_rows(20_000)).raise_for_status()
+
+    # Best round is reported to reduce noise from other processes
+    async def run_rounds() -> list[list[float]]:
+        return [await run_round(app, requests) for _ in range(rounds)]
+
+    best = min(asyncio.run(run_rounds()), key=statistics.mean)
+    mode = "enabled" if settings.metrics_enabled else "disabled"
+    print(
+        f"metrics {mode:>8}: mean {statistics.mean(best) * 1e6:8.1f} us  "
+        f"p50 {statistics.median(best) * 1e6:8.1f} us",
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure request latency with and without metrics")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_mode(args.requests, args.rounds)
+        return
+
+    # Each mode runs in its own process because settings are read at import
+    for enabled in ("false", "true"):
+        subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.bench_metrics_overhead", "--worker",
+                "--requests", str(args.requests), "--rounds", str(args.rounds),
+            ],
+            env={**os.environ, "METRICS_ENABLED": enabled},
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
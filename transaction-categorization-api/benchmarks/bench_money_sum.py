@@ -0,0 +1,141 @@
+# Float amounts versus integer cents benchmark
+# Run from the project root with: python -m benchmarks.bench_money_sum
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from decimal import Decimal
+
+# Same synthetic rows are written to both layouts, amounts are whole cents
+POPULATE_SQL = """
+    WITH RECURSIVE seq(n) AS (
+        SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows
+    )
+    INSERT INTO source (n, cents, merchant, category, date)
+    SELECT
+        n,
+        abs(random()) % 25000 + 1,
+        'MERCHANT ' || (abs(random()) % 5000),
+        CASE abs(random()) % 4
+            WHEN 0 THEN 'Food & Dining'
+            WHEN 1 THEN 'Transportation'
+            WHEN 2 THEN 'Groceries'
+            ELSE 'Uncategorized'
+        END,
+        date('2022-01-01', '+' || (abs(random()) % 1095) || ' days')
+    FROM seq
+"""
+
+# Table and covering index of each layout, keyed by label
+LAYOUTS = {
+    "float": ("amount FLOAT NOT NULL", "amount", "cents / 100.0"),
+    "cents": ("amount_cents INTEGER NOT NULL", "amount_cents", "cents"),
+}
+
+
+def build_database(directory: str, label: str, row_count: int, seed_path: str) -> str:
+    # Each layout gets its own file so on-disk size can be compared
+    column_sql, column, source_expr = LAYOUTS[label]
+    path = os.path.join(directory, f"{label}.db")
+    connection = sqlite3.connect(path)
+    connection.execute(
+        f"""
+        CREATE TABLE transactions (
+            id INTEGER NOT NULL PRIMARY KEY,
+            {column_sql},
+            merchant VARCHAR NOT NULL,
+            category VARCHAR NOT NULL,
+            date DATE NOT NULL
+        )
+        """
+    )
+    connection.execute(
+        f"CREATE INDEX ix_transactions_date_category ON transactions (date, category, {column})"
+    )
+
+    # Rows are copied from the shared seed database
+    connection.execute("ATTACH DATABASE ? AS seed", (seed_path,))
+    connection.execute(
+        f"""
+        INSERT INTO transactions ({column}, merchant, category, date)
+        SELECT {source_expr}, merchant, category, date FROM seed.source ORDER BY n
+        """
+    )
+    connection.commit()
+    connection.execute("DETACH DATABASE seed")
+    connection.execute("VACUUM")
+    connection.close()
+    return path
+
+
+def timed(connection: sqlite3.Connection, query: str, params: tuple, repeat: int) -> tuple[float, object]:
+    # Best wall time in milliseconds and the last result are returned
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = connection.execute(query, params).fetchall()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare REAL amounts with INTEGER cents")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for row_count in args.rows:
+        with tempfile.TemporaryDirectory(prefix="bench-money-") as directory:
+            # Seed rows are generated once and shared by both layouts
+            seed_path = os.path.join(directory, "seed.db")
+            seed = sqlite3.connect(seed_path)
+            seed.execute(
+                "CREATE TABLE source (n INTEGER PRIMARY KEY, cents INTEGER, merchant, category, date)"
+            )
+            seed.execute(POPULATE_SQL, {"rows": row_count})
+            seed.commit()
+
+            # Exact reference total is computed from the integer source
+            (exact_cents,) = seed.execute("SELECT sum(cents) FROM source").fetchone()
+            seed.close()
+            exact_total = Decimal(exact_cents) / 100
+
+            print(f"== {row_count:,} rows, exact total {exact_total}")
+            for label in LAYOUTS:
+                path = build_database(directory, label, row_count, seed_path)
+                column = LAYOUTS[label][1]
+                connection = sqlite3.connect(path)
+
+                # Whole table total, the worst case for accumulated float error
+                full_ms, full_rows = timed(
+                    connection, f"SELECT sum({column}) FROM transactions", (), args.repeat
+                )
+
+                # Month summary shaped query answered from the covering index
+                month_ms, _ = timed(
+                    connection,
+                    f"""
+                    SELECT category, count(id), sum({column})
+                    FROM transactions
+                    WHERE date >= ? AND date < ?
+                    GROUP BY category
+                    """,
+                    ("2023-06-01", "2023-07-01"),
+                    args.repeat,
+                )
+                connection.close()
+
+                # Float totals are compared with the exact decimal total
+                total = full_rows[0][0]
+                reported = Decimal(total) / 100 if label == "cents" else Decimal(repr(total))
+                size_mib = os.path.getsize(path) / (1024 * 1024)
+                print(
+                    f"{label:>6}: full sum {full_ms:9.2f} ms, month summary {month_ms:8.2f} ms, "
+                    f"file {size_mib:8.1f} MiB, error {reported - exact_total}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Monthly summary query benchmark
+# Run from the project root with: python -m benchmarks.bench_monthly_summary
+import argparse
+import sqlite3
+import time
+
+from benchmarks.common import use_temp_database
+
+# Summary query as it was written before the rewrite
+STRFTIME_QUERY = """
+    SELECT category, count(id), sum(amount_cents)
+    FROM transactions
+    WHERE strftime('%Y-%m', date) = :month
+    GROUP BY category
+"""
+
+# Summary query using a half-open date range
+RANGE_QUERY = """
+    SELECT category, count(id), sum(amount_cents)
+    FROM transactions
+    WHERE date >= :month_start AND date < :month_end
+    GROUP BY category
+"""
+
+# Synthetic rows spread over three years are generated inside SQLite
+POPULATE_SQL = """
+    WITH RECURSIVE seq(n) AS (
+        SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows
+    )
+    INSERT INTO transactions (amount_cents, merchant, category, date)
+    SELECT
+        abs(random()) % 25000,
+        'MERCHANT ' || (abs(random()) % 5000),
+        CASE abs(random()) % 4
+            WHEN 0 THEN 'Food & Dining'
+            WHEN 1 THEN 'Transportation'
+            WHEN 2 THEN 'Groceries'
+            ELSE 'Uncategorized'
+        END,
+        date('2022-01-01', '+' || (abs(random()) % 1095) || ' days')
+    FROM seq
+"""
+
+
+def timed(connection: sqlite3.Connection, query: str, params: dict, repeat: int) -> float:
+    # Best wall time over several runs is returned in milliseconds
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        connection.execute(query, params).fetchall()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def query_plan(connection: sqlite3.Connection, query: str, params: dict) -> list[str]:
+    # EXPLAIN QUERY PLAN output is returned one step per line
+    return [row[-1] for row in connection.execute("EXPLAIN QUERY PLAN " + query, params)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare strftime and date range summaries")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    params = {"month": "2023-06", "month_start": "2023-06-01", "month_end": "2023-07-01"}
+
+    for row_count in args.rows:
+        # Each size gets a fresh database with the migrated schema
+        database_url = use_temp_database()
+
+        connection = sqlite3.connect(database_url.removeprefix("sqlite:///"))
+        connection.execute(POPULATE_SQL, {"rows": row_count})
+        connection.commit()
+        connection.execute("ANALYZE")
+
+        print(f"== {row_count:,} rows")
+        for label, query in (("strftime", STRFTIME_QUERY), ("date range", RANGE_QUERY)):
+            elapsed = timed(connection, query, params, args.repeat)
+            print(f"{label:>10}: {elapsed:10.2f} ms")
+            for step in query_plan(connection, query, params):
+                print(f"{'':>12}{step}")
+
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# Time partitioning benchmark, one transactions file against per-year shards
+# Run from the project root with: python -m benchmarks.bench_partitioning --rows 10000000
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import date
+from pathlib import Path
+
+from benchmarks.common import write_results
+from benchmarks.datagen import cached_database, generate_rows
+
+# Generated databases are cached here between runs
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent / "data"
+
+
+def median_ms(run: Callable[[int], None], repeat: int) -> float:
+    # Each repeat gets its own index so queries move across the data
+    latencies = []
+    for index in range(repeat):
+        started = time.perf_counter()
+        run(index)
+        latencies.append(time.perf_counter() - started)
+    return round(statistics.median(latencies) * 1e3, 3)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare a single transactions file with per-year shards")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="rows in the generated database")
+    parser.add_argument("--insert-rows", type=int, default=100_000, help="rows appended to the latest year")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR))
+    parser.add_argument("--output", help="result file, benchmarks/results by default")
+    args = parser.parse_args()
+
+    # Main database URL is exported before any application module loads the settings
+    workdir = tempfile.mkdtemp(prefix="txn-partition-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'main.db')}"
+    source_path = cached_database(args.data_dir, args.rows)
+
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core.config import settings
+    from app.db.migrations import run_migrations
+    from app.db.session import create_shard_engine
+    from app.db.shards import PartitionedSession, ShardRouter, shard_path
+    from app.models.transaction import Transaction
+    from app.services.categorizer import categorize_batch
+    from app.services.ingest import insert_transaction_rows
+    from app.services.listing import fetch_transaction_rows
+    from app.services.money import to_cents
+    from app.services.summaries import month_summary, range_summary
+    from scripts.partition_by_year import copy_year
+
+    try:
+        # Single file layout is a copy of the cached database, so the cache is never modified
+        single_path = os.path.join(workdir, "single.db")
+        shutil.copyfile(source_path, single_path)
+        single_engine = create_shard_engine(single_path)
+        with single_engine.connect() as connection:
+            first_date, last_date = connection.execute(
+                select(func.min(Transaction.date), func.max(Transaction.date))
+            ).one()
+        years = list(range(first_date.year, last_date.year + 1))
+
+        # Shard layout holds the same rows, split by year with their ids
+        shard_dir = os.path.join(workdir, "shards")
+        os.makedirs(shard_dir)
+        for year in years:
+            shard_engine = create_shard_engine(shard_path(shard_dir, year))
+            run_migrations(shard_engine)
+            copy_year(single_path, shard_engine, year)
+            shard_engine.dispose()
+        main_engine = create_shard_engine(os.path.join(workdir, "main.db"))
+        run_migrations(main_engine)
+
+        # Both layouts are driven through the same service functions
+        layouts = {
+            "single_file": sessionmaker(bind=single_engine, autoflush=False),
+            "per_year_shards": sessionmaker(
+                bind=main_engine,
+                autoflush=False,
+                class_=PartitionedSession,
+                router=ShardRouter(shard_dir, create_shard_engine),
+            ),
+        }
+
+        # Query months are drawn once, so both layouts answer the same requests
+        rng = random.Random(0)
+        months = [(rng.choice(years), rng.randint(1, 12)) for _ in range(args.repeat)]
+
+        # Rows appended to the latest year are categorized once for both layouts
+        new_rows = list(generate_rows(args.insert_rows, seed=1, start=date(years[-1], 1, 1), days=365))
+        categories = categorize_batch([row["merchant"] for row in new_rows])
+        insert_rows = [
+            {
+                "amount_cents": to_cents(row["amount"]),
+                "merchant": row["merchant"],
+                "category": category,
+                "date": date.fromisoformat(row["date"]),
+            }
+            for row, category in zip(new_rows, categories)
+        ]
+        chunk = settings.bulk_chunk_size
+
+        results = []
+        for layout, session_factory in layouts.items():
+            with session_factory() as db:
+                # One month page of the list endpoint
+                def list_page(index: int) -> None:
+                    year, month = months[index]
+                    fetch_transaction_rows(db, date(year, month, 1), date(year, month, 28), None, 1000)
+
+                # Month summary and a twelve month range summary
+                def summary(index: int) -> None:
+                    year, month = months[index]
+                    month_summary(db, f"{year}-{month:02d}")
+
+                def yearly_range(index: int) -> None:
+                    year, _ = months[index]
+                    range_summary(db, f"{year}-01", f"{year}-12", yoy=True)
+
+                result = {
+                    "layout": layout,
+                    "list_page_ms": median_ms(list_page, args.repeat),
+                    "month_summary_ms": median_ms(summary, args.repeat),
+                    "range_summary_ms": median_ms(yearly_range, args.repeat),
+                }
+
+                # Appends are committed chunk by chunk, as bulk ingest and imports do
+                started = time.perf_counter()
+                for offset in range(0, len(insert_rows), chunk):
+                    insert_transaction_rows(db, insert_rows[offset:offset + chunk])
+                    db.commit()
+                result["insert_rows_per_second"] = round(len(insert_rows) / (time.perf_counter() - started))
+
+            # Size of the file written by the appends
+            written_path = single_path if layout == "single_file" else shard_path(shard_dir, years[-1])
+            result["written_file_mb"] = round(
+                sum(os.path.getsize(name) for name in (written_path, f"{written_path}-wal") if os.path.exists(name))
+                / 1e6,
+                1,
+            )
+            results.append(result)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{args.rows:,} rows over {len(years)} years, {args.insert_rows:,} rows appended")
+    for result in results:
+        print(
+            f"{result['layout']:>16}: list {result['list_page_ms']:7.2f} ms  "
+            f"month {result['month_summary_ms']:6.2f} ms  range {result['range_summary_ms']:6.2f} ms  "
+            f"insert {result['insert_rows_per_second']:>8,} rows/s  written file {result['written_file_mb']:7.1f} MB"
+        )
+
+    path = write_results("partitioning", results, args.output)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# Shared helpers for the benchmark scripts are defined in this file
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+# Default directory for benchmark result files
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Merchant names used when synthetic rows are generated
+SAMPLE_MERCHANTS = [
+    "STARBUCKS #1042",
+    "UBER *TRIP 1234",
+    "LYFT RIDE 88213",
+    "WALMART SUPERCENTER 5521",
+    "CORNER GROCERY",
+    "THAI RESTAURANT",
+    "AMAZON MKTPLACE",
+    "SHELL OIL 5738",
+]
+
+
+def use_temp_database() -> str:
+    # A throwaway SQLite file is created for the benchmark run
+    directory = tempfile.mkdtemp(prefix="txn-bench-")
+    database_url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+
+    # The URL is exported before the application settings are imported
+    os.environ["DATABASE_URL"] = database_url
+
+    # Schema is created by the migrations, as a deployment would before starting workers
+    migrate_database(database_url)
+    return database_url
+
+
+def migrate_database(database_url: str) -> None:
+    from sqlalchemy import create_engine
+
+    from app.db.migrations import run_migrations
+
+    # A short lived engine is used so no application settings are loaded
+    migration_engine = create_engine(database_url)
+    run_migrations(migration_engine)
+    migration_engine.dispose()
+
+
+def synthetic_rows(count: int, seed: int = 0) -> list[dict]:
+    # Random generator is seeded so runs are comparable
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+
+    # JSON ready transaction payloads are generated
+    return [
+        {
+            "amount": round(rng.uniform(1, 250), 2),
+            "merchant": rng.choice(SAMPLE_MERCHANTS),
+            "date": (start + timedelta(days=rng.randrange(366))).isoformat(),
+        }
+        for _ in range(count)
+    ]
+
+
+def latency_summary(latencies: list[float], elapsed: float) -> dict:
+    # Throughput and latency percentiles in milliseconds are summarized
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentiles[49] * 1000, 3),
+        "p95_ms": round(percentiles[94] * 1000, 3),
+        "p99_ms": round(percentiles[98] * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+
+def git_commit() -> str | None:
+    # Commit of the working tree is recorded so results can be compared between commits
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+def run_metadata() -> dict:
+    # Environment details that affect the numbers are recorded with every result file
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "argv": sys.argv[1:],
+    }
+
+
+def write_results(benchmark: str, results: list[dict], output: str | None = None) -> Path:
+    # Results are written as JSON next to the run metadata
+    if output is None:
+        commit = (git_commit() or "unknown")[:12]
+        output = RESULTS_DIR / f"{benchmark}-{commit}.json"
+    path = Path(output)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps({"benchmark": benchmark, "metadata": run_metadata(), "results": results}, indent=2) + "\n"
+    )
+    return path
@@ -0,0 +1,64 @@
+# Benchmark result comparison
+# Run from the project root with: python -m benchmarks.compare_results BASELINE.json CANDIDATE.json
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Metrics where a larger value is better, every other numeric metric is better when smaller
+HIGHER_IS_BETTER = {"throughput_rps"}
+
+# Fields that identify a result rather than measure it
+KEY_FIELDS = ("case", "operation", "rows", "clients", "size", "mode")
+
+# Fields that are neither identity nor performance measurements
+IGNORED_FIELDS = {"requests", "operations", "errors"}
+
+
+def result_key(result: dict) -> tuple:
+    # Results are matched across files by their identifying fields
+    return tuple((field, result[field]) for field in KEY_FIELDS if field in result)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.baseline).read_text())
+    candidate = json.loads(Path(args.candidate).read_text())
+    print(f"baseline  {baseline['metadata'].get('commit')}")
+    print(f"candidate {candidate['metadata'].get('commit')}")
+
+    baseline_results = {result_key(result): result for result in baseline["results"]}
+    regressions = 0
+    for result in candidate["results"]:
+        previous = baseline_results.get(result_key(result))
+        if previous is None:
+            continue
+
+        label = " ".join(f"{field}={value}" for field, value in result_key(result))
+        for metric, value in result.items():
+            if metric in KEY_FIELDS or metric in IGNORED_FIELDS or not isinstance(value, (int, float)):
+                continue
+            old = previous.get(metric)
+            if not old:
+                continue
+
+            # Change is expressed so that a positive number is always a slowdown
+            change = (value - old) / old * 100
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            flag = "REGRESSION" if change > args.threshold else ""
+            regressions += bool(flag)
+            print(f"{label:<40} {metric:>16} {old:>12g} -> {value:<12g} {change:+7.1f}% {flag}")
+
+    # Exit status is 1 when any metric regressed beyond the threshold
+    print(f"{regressions} regressions beyond {args.threshold:g}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# Synthetic transaction data generator
+# Run from the project root with: python -m benchmarks.datagen --rows 100000 --out rows.ndjson
+import argparse
+import bisect
+import csv
+import itertools
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+from collections.abc import Iterator
+from datetime import date, timedelta
+
+from benchmarks.common import migrate_database
+
+# Merchant families with their brand spellings, reference style and typical amount
+# Amounts are drawn from a log-normal distribution around the median, in cents
+MERCHANT_FAMILIES = (
+    ("STARBUCKS #{store}", 650),
+    ("STARBUCKS STORE {store}", 650),
+    ("UBER *TRIP {ref}", 1800),
+    ("UBER *EATS {ref}", 2900),
+    ("LYFT *RIDE {ref}", 1700),
+    ("WALMART SUPERCENTER {store}", 6400),
+    ("WAL-MART #{store}", 5200),
+    ("{city} GROCERY", 4300),
+    ("WHOLE FOODS MKT {store}", 7100),
+    ("{city} THAI RESTAURANT", 3600),
+    ("{city} PIZZA RESTAURANT", 2800),
+    ("AMAZON MKTPLACE PMTS {ref}", 3300),
+    ("AMZN Mktp US*{ref}", 2400),
+    ("SHELL OIL {store}", 4500),
+    ("CHEVRON {store}", 4700),
+    ("NETFLIX.COM", 1549),
+    ("SPOTIFY USA", 1099),
+    ("COMCAST CABLE", 8999),
+    ("PAYPAL *{city}", 2500),
+    ("SQ *{city} COFFEE", 550),
+)
+
+# City names used to vary local merchants
+CITIES = (
+    "SEATTLE", "PORTLAND", "AUSTIN", "DENVER", "BOSTON", "CHICAGO",
+    "OAKLAND", "PHOENIX", "ATLANTA", "MIAMI", "DALLAS", "TAMPA",
+)
+
+# Spread of amounts around each family's median on the log scale
+AMOUNT_SIGMA = 0.6
+
+
+class MerchantDistribution:
+    def __init__(self, merchant_count: int = 5_000, zipf_exponent: float = 1.1, seed: int = 0):
+        rng = random.Random(seed)
+
+        # A fixed universe of merchant spellings is built from the families
+        # Store numbers and reference ids vary the raw names like real statements do
+        self.merchants: list[tuple[str, int]] = []
+        for index in range(merchant_count):
+            template, median_cents = MERCHANT_FAMILIES[index % len(MERCHANT_FAMILIES)]
+            name = template.format(
+                store=rng.randint(100, 99999),
+                ref=rng.randint(1000, 9_999_999),
+                city=rng.choice(CITIES),
+            )
+            self.merchants.append((name, median_cents))
+        rng.shuffle(self.merchants)
+
+        # Popularity follows a Zipf law, so a few merchants dominate the volume
+        weights = [1 / (rank ** zipf_exponent) for rank in range(1, merchant_count + 1)]
+        self._cumulative = list(itertools.accumulate(weights))
+
+    def sample(self, rng: random.Random) -> tuple[str, int]:
+        # Merchant is drawn by inverting the cumulative popularity
+        position = rng.random() * self._cumulative[-1]
+        return self.merchants[bisect.bisect_left(self._cumulative, position)]
+
+
+def generate_rows(
+    count: int,
+    seed: int = 0,
+    start: date = date(2022, 1, 1),
+    days: int = 3 * 365,
+    merchant_count: int = 5_000,
+) -> Iterator[dict]:
+    # Same seed always yields the same rows
+    rng = random.Random(seed)
+    distribution = MerchantDistribution(merchant_count, seed=seed)
+
+    for _ in range(count):
+        merchant, median_cents = distribution.sample(rng)
+
+        # Weekends carry more spending than weekdays
+        row_date = start + timedelta(days=rng.randrange(days))
+        if row_date.weekday() < 5 and rng.random() < 0.2:
+            row_date += timedelta(days=5 - row_date.weekday())
+
+        # Amounts are log-normal around the merchant's median and kept positive
+        cents = max(1, int(median_cents * math.exp(rng.gauss(0, AMOUNT_SIGMA))))
+        yield {
+            "amount": f"{cents // 100}.{cents % 100:02d}",
+            "merchant": merchant,
+            "date": row_date.isoformat(),
+        }
+
+
+def populate_database(database_path: str, count: int, seed: int = 0, chunk_size: int = 50_000) -> None:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from app.db.migrations import run_migrations
+    from app.services.categorizer import categorize_batch
+    from app.services.money import to_cents
+    from app.services.rollups import rebuild_rollups
+
+    # Schema is created through the application migrations
+    engine = create_engine(f"sqlite:///{database_path}")
+    run_migrations(engine)
+
+    # Rows are loaded with plain executemany and without journaling for speed
+    # The application applies its own pragmas when it later connects
+    connection = sqlite3.connect(database_path)
+    connection.execute("PRAGMA journal_mode = OFF")
+    connection.execute("PRAGMA synchronous = OFF")
+    rows = generate_rows(count, seed)
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        categories = categorize_batch([row["merchant"] for row in chunk])
+        connection.executemany(
+            "INSERT INTO transactions (amount_cents, merchant, category, date) VALUES (?, ?, ?, ?)",
+            [
+                (to_cents(row["amount"]), row["merchant"], category, row["date"])
+                for row, category in zip(chunk, categories)
+            ],
+        )
+        connection.commit()
+    connection.execute("ANALYZE")
+    connection.close()
+
+    # Monthly rollups are rebuilt from the loaded rows
+    with Session(engine) as db:
+        rebuild_rollups(db)
+        db.commit()
+    engine.dispose()
+
+
+def cached_database(data_dir: str, count: int, seed: int = 0) -> str:
+    # Generated databases are reused across runs with the same size and seed
+    os.makedirs(data_dir, exist_ok=True)
+    database_path = os.path.join(data_dir, f"transactions-{count}-{seed}.db")
+    if not os.path.exists(database_path):
+        partial_path = database_path + ".partial"
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        populate_database(partial_path, count, seed)
+        os.replace(partial_path, database_path)
+    else:
+        # Databases cached by an older checkout are brought up to the current schema
+        migrate_database(f"sqlite:///{database_path}")
+    return database_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic transactions")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=("ndjson", "csv", "sqlite"), default="ndjson")
+    parser.add_argument("--out", help="output file, standard output when omitted")
+    args = parser.parse_args()
+
+    # SQLite output builds a ready to serve database
+    if args.format == "sqlite":
+        if not args.out:
+            parser.error("--out is required for sqlite output")
+        populate_database(args.out, args.rows, args.seed)
+        return
+
+    output = open(args.out, "w", newline="") if args.out else sys.stdout
+    try:
+        rows = generate_rows(args.rows, args.seed)
+        if args.format == "csv":
+            writer = csv.DictWriter(output, fieldnames=("date", "merchant", "amount"))
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                output.write(json.dumps(row) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# Reader latency under heavy write load
+# Run from the project root with: python -m benchmarks.stress_wal_readers
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import date
+
+from benchmarks.common import use_temp_database
+
+# Synthetic rows are generated and inserted entirely inside SQLite
+HEAVY_INSERT_SQL = """
+    WITH RECURSIVE seq(n) AS (
+        SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows
+    )
+    INSERT INTO transactions (amount_cents, merchant, category, date)
+    SELECT
+        abs(random()) % 25000,
+        'MERCHANT ' || (abs(random()) % 5000),
+        'Uncategorized',
+        date('2024-01-01', '+' || (abs(random()) % 366) || ' days')
+    FROM seq
+"""
+
+
+def run_worker(seconds: float, writers: int, readers: int, rows_per_commit: int) -> None:
+    # Database is isolated before the application is imported
+    use_temp_database()
+
+    from sqlalchemy import select, text
+    from sqlalchemy.exc import OperationalError
+
+    from app.core.config import settings
+    from app.db.session import SessionLocal
+    from app.services.listing import transaction_list_statement
+    from app.services.summaries import month_summary
+
+    stop = threading.Event()
+    reader_latencies: list[float] = []
+    reader_errors: list[str] = []
+    writer_errors: list[str] = []
+    written = [0]
+
+    def writer() -> None:
+        # Large single statement transactions keep the write lock busy
+        # The insert runs inside SQLite, so readers compete for locks rather than the GIL
+        while not stop.is_set():
+            with SessionLocal() as db:
+                try:
+                    db.execute(text(HEAVY_INSERT_SQL), {"rows": rows_per_commit})
+                    db.commit()
+                    written[0] += rows_per_commit
+                except OperationalError as exc:
+                    writer_errors.append(str(exc.orig))
+
+    def reader() -> None:
+        # Readers alternate between a page query and a summary query
+        statement = transaction_list_statement(start=date(2024, 6, 1)).limit(100)
+        while not stop.is_set():
+            started = time.perf_counter()
+            with SessionLocal() as db:
+                try:
+                    db.scalars(statement).all()
+                    month_summary(db, "2024-06")
+                    db.scalar(select(1))
+                except OperationalError as exc:
+                    reader_errors.append(str(exc.orig))
+                    continue
+            reader_latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    # Reader latency percentiles and lock errors are reported
+    percentiles = statistics.quantiles(reader_latencies, n=100) if len(reader_latencies) > 1 else [0.0] * 99
+    print(
+        f"journal_mode={settings.sqlite_journal_mode:<6} "
+        f"rows written {written[0]:>9,}  reads {len(reader_latencies):>7,}  "
+        f"read p50 {percentiles[49] * 1000:7.1f} ms  p99 {percentiles[98] * 1000:8.1f} ms  "
+        f"max {max(reader_latencies, default=0) * 1000:8.1f} ms  "
+        f"reader errors {len(reader_errors)}  writer errors {len(writer_errors)}",
+        flush=True,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure reader latency during a heavy write load")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--writers", type=int, default=1)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--rows-per-commit", type=int, default=200_000)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.seconds, args.writers, args.readers, args.rows_per_commit)
+        return
+
+    # Rollback journal and WAL modes run in separate processes
+    for journal_mode in ("DELETE", "WAL"):
+        subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.stress_wal_readers", "--worker",
+                "--seconds", str(args.seconds),
+                "--writers", str(args.writers),
+                "--readers", str(args.readers),
+                "--rows-per-commit", str(args.rows_per_commit),
+            ],
+            env={**os.environ, "SQLITE_JOURNAL_MODE": journal_mode},
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
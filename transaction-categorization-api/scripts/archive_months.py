@@ -0,0 +1,74 @@
+# scripts/archive_months.py
+# Run from the project root with: python -m scripts.archive_months [--before YYYY-MM] [--dry-run]
+import argparse
+import re
+from datetime import date
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.db.shards import is_year_writable, shard_sessions
+from app.services.archive import archivable_months, archive_month
+from app.services.months import MONTH_PATTERN, month_key, shift_months
+
+
+def month_argument(value: str) -> str:
+    # Months are given in YYYY-MM form
+    if not re.match(MONTH_PATTERN, value):
+        raise argparse.ArgumentTypeError("month must be in YYYY-MM form")
+    return value
+
+
+# Closed months are moved from the transactions table into compressed archive segments.
+# Each month is written and removed in its own transaction, so an interrupted run keeps every finished month.
+# Rollups are left in place, so month summaries are unchanged and listing reads the segments instead of the rows.
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move closed months into compressed archive segments")
+    parser.add_argument(
+        "--before",
+        type=month_argument,
+        help=f"archive months before this one, {settings.archive_after_months} months ago by default",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="list the months that would be archived")
+    args = parser.parse_args()
+
+    before = args.before or month_key(shift_months(date.today().replace(day=1), -settings.archive_after_months))
+
+    with SessionLocal() as db:
+        # Months are found in every year shard, or in the database itself without partitioning
+        months = [
+            (year, month) for year, session in shard_sessions(db) for month in archivable_months(session, before)
+        ]
+        if not months:
+            print(f"no months before {before} hold rows to archive")
+            return
+
+        # Read transactions are ended, so every month takes the write lock before reading its rows
+        db.rollback()
+
+        archived_rows = archived_bytes = 0
+        for year, month in months:
+            # Read-only shards are left as they are
+            if not is_year_writable(db, year):
+                print(f"{month}: shard {year} is read-only and was not archived")
+                continue
+            if args.dry_run:
+                print(f"{month}: would be archived")
+                continue
+
+            segment = archive_month(db, month)
+            db.commit()
+            if segment is None:
+                continue
+            archived_rows += segment["rows"]
+            archived_bytes += segment["file_size"]
+            print(f"{month}: {segment['rows']} rows -> {segment['file_name']} ({segment['file_size'] / 1e3:.1f} kB)")
+
+        if archived_rows:
+            print(
+                f"{archived_rows} rows archived into {archived_bytes / 1e6:.1f} MB; "
+                "run VACUUM on the databases to return the space"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# scripts/compact_shard.py
+# Run from the project root with: python -m scripts.compact_shard [YEAR ...] [--force]
+import argparse
+import os
+
+from app.db.session import create_shard_engine, shard_router
+from app.db.shards import shard_path
+
+
+def file_size(path: str) -> int:
+    # Database size includes its write-ahead log
+    return sum(os.path.getsize(name) for name in (path, f"{path}-wal") if os.path.exists(name))
+
+
+def compact_shard(path: str) -> tuple[int, int]:
+    # A compacted copy is written next to the shard
+    compacted = f"{path}.compact"
+    if os.path.exists(compacted):
+        os.remove(compacted)
+
+    before = file_size(path)
+    shard_engine = create_shard_engine(path)
+    try:
+        with shard_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            # Log is folded into the file and planner statistics are refreshed before copying
+            connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+            connection.exec_driver_sql("ANALYZE")
+            expected = connection.exec_driver_sql("SELECT count(*) FROM transactions").scalar()
+
+            # VACUUM INTO writes a defragmented copy without free pages, leaving the shard untouched
+            connection.exec_driver_sql("VACUUM INTO ?", (compacted,))
+    finally:
+        shard_engine.dispose()
+
+    # Copy uses a rollback journal, so it opens read-only without WAL side files
+    copy_engine = create_shard_engine(compacted)
+    try:
+        with copy_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.exec_driver_sql("PRAGMA journal_mode = DELETE")
+            check = connection.exec_driver_sql("PRAGMA quick_check").scalar()
+            copied = connection.exec_driver_sql("SELECT count(*) FROM transactions").scalar()
+    finally:
+        copy_engine.dispose()
+    if check != "ok" or copied != expected:
+        os.remove(compacted)
+        raise SystemExit(f"{path}: compacted copy failed verification ({check}, {copied} of {expected} rows)")
+
+    # Copy replaces the shard in one rename and stale log files are removed
+    os.replace(compacted, path)
+    for side_file in (f"{path}-wal", f"{path}-shm"):
+        if os.path.exists(side_file):
+            os.remove(side_file)
+    return before, file_size(path)
+
+
+# Year shards are compacted offline into a defragmented, read-only friendly file.
+# Only shards served read-only are compacted unless --force is given, since writes made
+# by a running server during the copy would be lost when the copy replaces the shard.
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compact per-year shard files offline")
+    parser.add_argument("years", nargs="*", type=int, help="years to compact, every read-only shard by default")
+    parser.add_argument("--force", action="store_true", help="also compact writable shards; stop every writer first")
+    args = parser.parse_args()
+
+    if shard_router is None:
+        parser.error("PARTITION_DIR must be set to the shard directory")
+
+    years = args.years or [year for year in shard_router.years() if not shard_router.is_writable(year)]
+    if not years:
+        print("no read-only shards to compact; set PARTITION_READONLY_BEFORE or name the years")
+        return
+
+    for year in years:
+        path = shard_path(shard_router.directory, year)
+        if not os.path.exists(path):
+            parser.error(f"no shard for {year}")
+        if shard_router.is_writable(year) and not args.force:
+            parser.error(f"shard {year} is writable; pass --force once writers are stopped")
+
+        before, after = compact_shard(path)
+        print(f"{year}: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
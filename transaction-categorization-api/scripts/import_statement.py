@@ -0,0 +1,62 @@
+# scripts/import_statement.py
+# Run from the project root with: python -m scripts.import_statement FILE [--format csv|ofx]
+# or resume a failed import with: python -m scripts.import_statement --resume JOB_ID
+import argparse
+import sys
+
+from app.db.migrations import run_migrations
+from app.db.session import SessionLocal, engine
+from app.models.import_job import ImportJob
+from app.services.statement_import import create_import_job, detect_format, run_import
+
+
+# Progress is printed on a single line after every committed chunk
+def print_progress(job: ImportJob) -> None:
+    print(
+        f"\r{job.progress:6.1%}  {job.rows_read} read, "
+        f"{job.rows_inserted} inserted, {job.rows_duplicate} duplicate, {job.rows_failed} rejected",
+        end="",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+# A statement file is imported in checkpointed chunks.
+# The exit status is 1 when the import failed; it can then be resumed by job id.
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import a CSV or OFX bank statement")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("path", nargs="?", help="statement file to import")
+    source.add_argument("--resume", type=int, metavar="JOB_ID", help="resume a failed import")
+    parser.add_argument("--format", choices=("csv", "ofx"), help="statement format, inferred from the extension by default")
+    parser.add_argument("--chunk-size", type=int, help="records written per transaction")
+    args = parser.parse_args()
+
+    # Schema is brought up to date before the import job table is used
+    run_migrations(engine)
+
+    # A new job is created unless an existing one is resumed
+    job_id = args.resume
+    if job_id is None:
+        with SessionLocal() as db:
+            job_id = create_import_job(db, args.path, args.format or detect_format(args.path)).id
+        print(f"import job {job_id}", file=sys.stderr)
+
+    status = run_import(job_id, chunk_size=args.chunk_size, on_progress=print_progress)
+    print(file=sys.stderr)
+
+    # Final counters are reported
+    with SessionLocal() as db:
+        job = db.get(ImportJob, job_id)
+        print(
+            f"job {job.id} {job.status}: {job.rows_read} read, "
+            f"{job.rows_inserted} inserted, {job.rows_duplicate} duplicate, {job.rows_failed} rejected"
+        )
+        if job.error:
+            print(f"error: {job.error}")
+
+    sys.exit(0 if status == "completed" else 1)
+
+
+if __name__ == "__main__":
+    main()
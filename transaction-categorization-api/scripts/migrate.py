@@ -0,0 +1,57 @@
+# scripts/migrate.py
+# Run from the project root with: python -m scripts.migrate [--check]
+import argparse
+import sys
+
+from app.db.migrations import SchemaOutdated, check_schema_version, current_version, run_migrations
+from app.db.session import create_shard_engine, engine, shard_router
+from app.db.shards import shard_path
+from app.services.changes import advance_change_sequence, largest_change_seq
+
+
+# Pending schema migrations are applied once, before the application workers start.
+# The exit status is 1 when the schema is outdated in check-only mode.
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--check", action="store_true", help="report whether migrations are pending without applying them")
+    args = parser.parse_args()
+
+    # Year shards carry the same schema and are migrated after the main database
+    # Read-only shards are opened writable here, as migrating runs offline
+    databases = [("database", engine)]
+    if shard_router is not None:
+        databases += [
+            (f"shard {year}", create_shard_engine(shard_path(shard_router.directory, year)))
+            for year in shard_router.years()
+        ]
+
+    if args.check:
+        outdated = False
+        for name, database_engine in databases:
+            try:
+                print(f"{name} schema is at version {check_schema_version(database_engine)}")
+            except SchemaOutdated as exc:
+                print(f"{name}: {exc}")
+                outdated = True
+        sys.exit(1 if outdated else 0)
+
+    for name, database_engine in databases:
+        with database_engine.connect() as connection:
+            before = current_version(connection)
+        after = run_migrations(database_engine)
+        print(
+            f"{name} schema migrated from version {before} to {after}"
+            if after != before
+            else f"{name} schema is at version {after}"
+        )
+
+    # Shards migrated from an older schema numbered their existing rows themselves
+    # The main sequence continues after every one of those numbers, so no change is numbered twice
+    if shard_router is not None:
+        with engine.begin() as connection:
+            for _, shard_engine in databases[1:]:
+                with shard_engine.connect() as shard_connection:
+                    advance_change_sequence(connection, largest_change_seq(shard_connection))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# scripts/partition_by_year.py
+# Run from the project root with: PARTITION_DIR=shards python -m scripts.partition_by_year [--clear-source]
+import argparse
+import os
+
+from sqlalchemy import Connection, Engine, func, select, text
+from sqlalchemy.orm import Session
+
+from app.db.migrations import run_migrations
+from app.db.session import create_shard_engine, engine, shard_router
+from app.db.shards import shard_path
+from app.models.archive_segment import ArchiveSegment
+from app.models.transaction import Transaction
+from app.services.merchant_sketches import rebuild_merchant_sketches
+from app.services.rollups import rebuild_rollups
+
+
+# Year filter on the ISO date column, bound to the first day of the year and of the next one
+YEAR_FILTER = "date >= :first AND date < :after"
+
+# Year filter on the month key of archive segments
+ARCHIVE_YEAR_FILTER = "month >= :first AND month < :after"
+
+
+def year_bounds(year: int) -> dict:
+    # Parameters of the year filter for one year
+    return {"first": f"{year}-01-01", "after": f"{year + 1}-01-01"}
+
+
+def archive_year_bounds(year: int) -> dict:
+    # Parameters of the archive year filter for one year
+    return {"first": f"{year}-01", "after": f"{year + 1}-01"}
+
+
+def year_contents(connection: Connection, year: int | None = None) -> tuple[int, int, int]:
+    # Row count, cent total and archive segment count identify what a year, or a whole shard, holds
+    rows_query = "SELECT count(*), coalesce(sum(amount_cents), 0) FROM transactions"
+    segments_query = "SELECT count(*) FROM archive_segments"
+    if year is None:
+        rows, cents = connection.execute(text(rows_query)).one()
+        return rows, cents, connection.execute(text(segments_query)).scalar()
+
+    rows, cents = connection.execute(text(f"{rows_query} WHERE {YEAR_FILTER}"), year_bounds(year)).one()
+    segments = connection.execute(
+        text(f"{segments_query} WHERE {ARCHIVE_YEAR_FILTER}"), archive_year_bounds(year)
+    ).scalar()
+    return rows, cents, segments
+
+
+def copy_year(source_path: str, shard_engine: Engine, year: int) -> None:
+    # Rows are copied by SQLite itself from the attached source, with their ids
+    with shard_engine.connect() as connection:
+        connection.execute(text("ATTACH DATABASE :path AS source"), {"path": source_path})
+        connection.execute(
+            text(
+                "INSERT INTO transactions "
+                "(id, amount_cents, merchant, category, date, external_id, rules_version, category_source, change_seq) "
+                "SELECT id, amount_cents, merchant, category, date, external_id, rules_version, category_source, "
+                "change_seq "
+                f"FROM source.transactions WHERE {YEAR_FILTER}"
+            ),
+            year_bounds(year),
+        )
+
+        # Tombstones of the year's deleted rows follow them, so change feed cursors stay valid
+        connection.execute(
+            text(
+                "INSERT INTO transaction_tombstones (change_seq, transaction_id, date) "
+                f"SELECT change_seq, transaction_id, date FROM source.transaction_tombstones WHERE {YEAR_FILTER}"
+            ),
+            year_bounds(year),
+        )
+
+        # Archive catalog entries of the year's months follow them, the segment files stay where they are
+        connection.execute(
+            text(
+                "INSERT INTO archive_segments (id, month, file_name, row_count, max_id, file_size, category_totals) "
+                "SELECT id, month, file_name, row_count, max_id, file_size, category_totals "
+                f"FROM source.archive_segments WHERE {ARCHIVE_YEAR_FILTER}"
+            ),
+            archive_year_bounds(year),
+        )
+
+        # External ids of the year's archived rows stay reserved in its shard
+        connection.execute(
+            text(
+                "INSERT INTO archived_external_ids "
+                "(external_id, transaction_id, amount_cents, merchant, category, date, rules_version) "
+                "SELECT external_id, transaction_id, amount_cents, merchant, category, date, rules_version "
+                f"FROM source.archived_external_ids WHERE {YEAR_FILTER}"
+            ),
+            year_bounds(year),
+        )
+        connection.commit()
+        connection.execute(text("DETACH DATABASE source"))
+
+    # Rollups and merchant sketches of the shard are recomputed from its rows and archive segments
+    with Session(bind=shard_engine) as shard_db:
+        rebuild_rollups(shard_db)
+        rebuild_merchant_sketches(shard_db)
+        shard_db.commit()
+
+
+# Transactions of an unpartitioned database are copied into one shard per year.
+# Ids are kept, so cursors and references stay valid; every shard is verified against its source rows.
+# The source rows are only deleted with --clear-source, after every year has been verified.
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Split the transactions table into per-year shards")
+    parser.add_argument("--clear-source", action="store_true", help="delete the copied rows from the main database")
+    args = parser.parse_args()
+
+    if shard_router is None:
+        parser.error("PARTITION_DIR must be set to the shard directory")
+
+    # Years present in the source are found from the date index bounds and the archived months
+    with engine.connect() as connection:
+        first_date, last_date = connection.execute(
+            select(func.min(Transaction.date), func.max(Transaction.date))
+        ).one()
+        first_month, last_month = connection.execute(
+            select(func.min(ArchiveSegment.month), func.max(ArchiveSegment.month))
+        ).one()
+    years = {value.year for value in (first_date, last_date) if value is not None}
+    years |= {int(month[:4]) for month in (first_month, last_month) if month is not None}
+    if not years:
+        print("main database holds no transactions")
+        return
+
+    source_path = engine.url.database
+    os.makedirs(shard_router.directory, exist_ok=True)
+    for year in range(min(years), max(years) + 1):
+        # Row count, cent total and archive segments of the year in the source are the reference
+        with engine.connect() as connection:
+            expected = year_contents(connection, year)
+        if expected == (0, 0, 0):
+            continue
+
+        # Shard is created and migrated; read-only years are written here as this runs offline
+        shard_engine = create_shard_engine(shard_path(shard_router.directory, year))
+        run_migrations(shard_engine)
+        try:
+            with shard_engine.connect() as connection:
+                copied = year_contents(connection)
+
+                # Years copied by an earlier run are skipped, partial shards are never merged into
+                if copied == expected:
+                    print(f"{year}: {expected[0]} rows and {expected[2]} archive segments already copied")
+                    continue
+                if copied[0] or copied[2]:
+                    raise SystemExit(
+                        f"{year}: shard already holds {copied[0]} other rows "
+                        f"and {copied[2]} archive segments, nothing was copied"
+                    )
+
+            copy_year(source_path, shard_engine, year)
+
+            # Copy is verified against the source before anything else happens
+            with shard_engine.connect() as connection:
+                copied = year_contents(connection)
+            if copied != expected:
+                raise SystemExit(f"{year}: copied {copied} but expected {expected}")
+            print(f"{year}: copied {expected[0]} rows and {expected[2]} archive segments")
+        finally:
+            shard_engine.dispose()
+
+    # Source rows and rollups are only removed once every year has been copied and verified
+    if args.clear_source:
+        with engine.begin() as connection:
+            connection.execute(text("DELETE FROM transactions"))
+            connection.execute(text("DELETE FROM monthly_category_totals"))
+            connection.execute(text("DELETE FROM transaction_tombstones"))
+            connection.execute(text("DELETE FROM archive_segments"))
+            connection.execute(text("DELETE FROM archived_external_ids"))
+        print("source rows deleted; run VACUUM on the main database to return the space")
+
+
+if __name__ == "__main__":
+    main()
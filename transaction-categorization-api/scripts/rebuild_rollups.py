@@ -0,0 +1,44 @@
+# scripts/rebuild_rollups.py
+# Run from the project root with: python -m scripts.rebuild_rollups [--check]
+import argparse
+import sys
+
+from app.db.session import SessionLocal
+from app.db.shards import is_year_writable, shard_sessions
+from app.services.money import from_cents
+from app.services.rollups import find_rollup_drift, rebuild_rollups
+
+
+# Monthly rollups are checked for drift and optionally rebuilt from raw rows.
+# The exit status is 1 when drift was found in check-only mode.
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check and rebuild monthly category rollups")
+    parser.add_argument("--check", action="store_true", help="report drift without rewriting rollups")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        # Every year shard is checked on its own, or the database itself without partitioning
+        shards = shard_sessions(db)
+        drift = [entry for _, session in shards for entry in find_rollup_drift(session)]
+        for entry in drift:
+            print(
+                f"{entry['month']} {entry['category']}: "
+                f"stored {entry['stored_count']} / {from_cents(entry['stored_total_cents'])}, "
+                f"expected {entry['expected_count']} / {from_cents(entry['expected_total_cents'])}"
+            )
+        print(f"{len(drift)} drifted rollup rows")
+
+        if args.check:
+            sys.exit(1 if drift else 0)
+
+        # Read-only shards are left as they are
+        for year, session in shards:
+            if not is_year_writable(db, year):
+                print(f"shard {year} is read-only and was not rebuilt")
+                continue
+            rebuild_rollups(session)
+        db.commit()
+        print("rollups rebuilt")
+
+if __name__ == "__main__":
+    main()
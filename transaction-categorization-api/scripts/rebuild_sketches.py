@@ -0,0 +1,27 @@
+# scripts/rebuild_sketches.py
+# Run from the project root with: python -m scripts.rebuild_sketches
+import argparse
+
+from app.db.session import SessionLocal
+from app.db.shards import is_year_writable, shard_sessions
+from app.services.merchant_sketches import rebuild_merchant_sketches
+
+
+# Monthly merchant sketches are rebuilt from exact counts of the raw rows.
+# Sketches only grow, so this drops merchants that left a category through re-categorization.
+def main() -> None:
+    argparse.ArgumentParser(description="Rebuild monthly merchant sketches from raw rows").parse_args()
+
+    with SessionLocal() as db:
+        # Every writable year shard is rebuilt, or the database itself without partitioning
+        for year, session in shard_sessions(db):
+            if not is_year_writable(db, year):
+                print(f"shard {year} is read-only and was not rebuilt")
+                continue
+            rebuild_merchant_sketches(session)
+        db.commit()
+        print("merchant sketches rebuilt")
+
+
+if __name__ == "__main__":
+    main()
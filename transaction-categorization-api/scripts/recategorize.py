@@ -0,0 +1,59 @@
+# scripts/recategorize.py
+# Run from the project root with: python -m scripts.recategorize
+# or resume a failed job with: python -m scripts.recategorize --resume JOB_ID
+import argparse
+import sys
+
+from app.db.migrations import run_migrations
+from app.db.session import SessionLocal, engine
+from app.models.recategorization_job import RecategorizationJob
+from app.services.recategorization import create_recategorization_job, run_recategorization
+
+
+# Progress is printed on a single line after every committed chunk
+def print_progress(job: RecategorizationJob) -> None:
+    print(
+        f"\r{job.progress:6.1%}  {job.rows_scanned} scanned, "
+        f"{job.rows_changed} changed, {job.rows_per_second:,.0f} rows/s",
+        end="",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+# Stored transactions are categorized again with the current rules in checkpointed chunks.
+# The exit status is 1 when the job failed; it can then be resumed by job id.
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-categorize stored transactions with the current rules")
+    parser.add_argument("--resume", type=int, metavar="JOB_ID", help="resume a failed job")
+    parser.add_argument("--chunk-size", type=int, help="rows categorized per transaction")
+    args = parser.parse_args()
+
+    # Schema is brought up to date before the job table is used
+    run_migrations(engine)
+
+    # A new job is created unless an existing one is resumed
+    job_id = args.resume
+    if job_id is None:
+        with SessionLocal() as db:
+            job_id = create_recategorization_job(db).id
+        print(f"re-categorization job {job_id}", file=sys.stderr)
+
+    status = run_recategorization(job_id, chunk_size=args.chunk_size, on_progress=print_progress)
+    print(file=sys.stderr)
+
+    # Final counters are reported
+    with SessionLocal() as db:
+        job = db.get(RecategorizationJob, job_id)
+        print(
+            f"job {job.id} {job.status}: {job.rows_scanned} scanned, "
+            f"{job.rows_changed} changed, {job.rows_per_second:,.0f} rows/s"
+        )
+        if job.error:
+            print(f"error: {job.error}")
+
+    sys.exit(0 if status == "completed" else 1)
+
+
+if __name__ == "__main__":
+    main()
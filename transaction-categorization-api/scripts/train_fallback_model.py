@@ -0,0 +1,64 @@
+# scripts/train_fallback_model.py
+# Run from the project root with: python -m scripts.train_fallback_model --out fallback_model.npz
+import argparse
+
+from sqlalchemy import func, select
+
+from app.db.migrations import run_migrations
+from app.db.session import SessionLocal, engine
+from app.db.shards import shard_sessions
+from app.models.transaction import Transaction
+from app.services.categorizer import SOURCE_MODEL
+from app.services.fallback_model import NaiveBayesFallback
+from app.services.merchant import normalize_merchant
+from app.services.rule_engine import DEFAULT_CATEGORY
+
+
+# A fallback model is trained offline on the rows in the database categorized by rules.
+# Each distinct merchant and category pair is one sample weighted by its row count.
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train the fallback categorizer on labelled transactions")
+    parser.add_argument("--out", default="fallback_model.npz", help="model file to write")
+    parser.add_argument("--bits", type=int, default=16, help="log2 of the number of hashed n-gram buckets")
+    parser.add_argument("--alpha", type=float, default=0.1, help="additive smoothing of n-gram counts")
+    args = parser.parse_args()
+
+    # Schema is brought up to date before the transactions table is read
+    run_migrations(engine)
+
+    # Labelled merchants are streamed with their row counts
+    # Rows left in the default category carry no label and are skipped
+    # Rows labelled by the fallback model itself are skipped, so retraining never learns from its own predictions
+    names: list[str] = []
+    labels: list[str] = []
+    weights: list[int] = []
+    statement = (
+        select(Transaction.merchant, Transaction.category, func.count())
+        .where(
+            Transaction.category != DEFAULT_CATEGORY,
+            Transaction.category_source.is_distinct_from(SOURCE_MODEL),
+        )
+        .group_by(Transaction.merchant, Transaction.category)
+    )
+    # Year shards are read one after another, their counts add up in training
+    with SessionLocal() as db:
+        for _, session in shard_sessions(db):
+            for merchant, category, count in session.execute(statement).yield_per(10_000):
+                names.append(normalize_merchant(merchant))
+                labels.append(category)
+                weights.append(count)
+
+    if not names:
+        parser.error("no categorized transactions to train on")
+
+    # Model is trained and written as a compressed NumPy archive
+    model = NaiveBayesFallback.train(names, labels, weights, bits=args.bits, alpha=args.alpha)
+    model.save(args.out)
+    print(
+        f"trained on {len(names)} merchants ({sum(weights)} rows) "
+        f"across {len(model.classes)} categories, written to {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Shared test fixtures are defined in this file
+# Every test runs against its own migrated SQLite database in a temporary directory
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.db.migrations import run_migrations
+from app.db.session import SessionLocal, create_shard_engine, engine
+from app.main import app
+from app.services.archive import clear_segment_caches
+
+
+def pytest_configure(config) -> None:
+    # Long running concurrency tests can be deselected with -m "not slow"
+    config.addinivalue_line("markers", "slow: long running concurrency test")
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    # A fresh database is migrated and bound to the session factory used by routes and services
+    test_engine = create_shard_engine(str(tmp_path / "transactions.db"))
+    run_migrations(test_engine)
+    SessionLocal.configure(bind=test_engine)
+
+    # Archive segments are written under the test directory, and segments of earlier tests are forgotten
+    monkeypatch.setattr(settings, "archive_dir", str(tmp_path / "archive"))
+    clear_segment_caches()
+
+    yield test_engine
+
+    # The configured engine is bound again once the test has finished
+    SessionLocal.configure(bind=engine)
+    test_engine.dispose()
+
+
+@pytest.fixture
+def db(database):
+    # A session on the test database is closed after the test
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def client(database):
+    # Requests go through the ASGI app without starting the worker lifespan
+    return TestClient(app)
+
+
+@pytest.fixture
+def async_client(database, tmp_path):
+    # The async routes are mounted on their own app, bound to the test database through aiosqlite
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.api.routes import transactions_async
+    from app.db.async_session import AsyncSessionLocal, async_engine
+
+    test_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'transactions.db'}")
+    AsyncSessionLocal.configure(bind=test_engine)
+    async_app = FastAPI()
+    async_app.include_router(transactions_async.router)
+    with TestClient(async_app) as test_client:
+        yield test_client
+        test_client.portal.call(test_engine.dispose)
+    AsyncSessionLocal.configure(bind=async_engine)
@@ -0,0 +1,100 @@
+# Shared test helpers are defined in this file
+# Rows are generated deterministically and written and read back through the API
+import json
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from app.services.categorizer import CATEGORIZER_CALLS
+from app.services.statement_import import create_import_job, run_import
+
+
+# Merchants covering every shipped rule and the default category
+MERCHANTS = ("Starbucks 123", "Uber Trip", "Lyft Ride", "Walmart #42", "Fresh Grocery", "Corner Bookshop")
+
+
+def generated_rows(count: int, seed: int = 0, start: date = date(2022, 1, 1), days: int = 900) -> list[dict]:
+    # Rows share few dates, so pages often break inside a day
+    rng = random.Random(seed)
+    return [
+        {
+            "amount": f"{rng.randint(1, 50_000) / 100:.2f}",
+            "merchant": rng.choice(MERCHANTS),
+            "date": (start + timedelta(days=rng.randrange(0, days, 7))).isoformat(),
+        }
+        for _ in range(count)
+    ]
+
+
+def bulk_create(client, rows: list[dict], **headers) -> dict:
+    # Rows are written through the bulk endpoint and its outcome is returned
+    response = client.post("/transactions/bulk", json=rows, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def walk_pages(client, limit: int, **params) -> list[dict]:
+    # Pages are followed through their cursors until the last one
+    rows = []
+    after = None
+    while True:
+        query = {**params, "limit": limit, **({"after": after} if after else {})}
+        response = client.get("/transactions/", params=query)
+        assert response.status_code == 200, response.text
+        rows.extend(response.json())
+        after = response.headers.get("x-next-cursor")
+        if after is None:
+            return rows
+
+
+def stream_rows(client, **params) -> list[dict]:
+    # Streamed NDJSON lines are decoded
+    response = client.get("/transactions/", params={**params, "stream": "true"})
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def grouped_totals(db) -> dict[tuple[str, str], tuple[int, int]]:
+    # Monthly totals are recomputed from the stored rows with a plain GROUP BY
+    return {
+        (month, category): (count, cents)
+        for month, category, count, cents in db.execute(
+            text(
+                "SELECT strftime('%Y-%m', date), category, count(*), sum(amount_cents) "
+                "FROM transactions GROUP BY 1, 2"
+            )
+        )
+    }
+
+
+def rollup_totals(db) -> dict[tuple[str, str], tuple[int, int]]:
+    # Monthly totals are read from the rollup table
+    return {
+        (month, category): (count, cents)
+        for month, category, count, cents in db.execute(
+            text("SELECT month, category, transaction_count, total_cents FROM monthly_category_totals")
+        )
+    }
+
+
+def ofx_statement(records: list[tuple[str, str, str, str]]) -> str:
+    # Statement transactions are written as OFX blocks of FITID, date, amount and name
+    blocks = "".join(
+        f"<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>{posted}<TRNAMT>{amount}<FITID>{fitid}<NAME>{name}</STMTTRN>\n"
+        for fitid, posted, amount, name in records
+    )
+    return f"OFXHEADER:100\n<OFX><BANKTRANLIST>\n{blocks}</BANKTRANLIST></OFX>\n"
+
+
+def import_statement(db, path) -> tuple[int, int, int]:
+    # Statement is imported to completion and its inserted, duplicate and failed counts are returned
+    job = create_import_job(db, str(path), "ofx")
+    assert run_import(job.id) == "completed"
+    db.refresh(job)
+    return job.rows_inserted, job.rows_duplicate, job.rows_failed
+
+
+def counted_calls() -> float:
+    # Current value of the categorizer call counter
+    return float(CATEGORIZER_CALLS.samples()[0].split()[-1])
@@ -0,0 +1,174 @@
+# Cold month archival tests are defined in this file
+# Archived months are read back transparently and keep their ids and external ids reserved
+from datetime import date
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.migrations import run_migrations
+from app.db.session import SessionLocal
+from app.services.archive import archive_month
+from tests.helpers import bulk_create, generated_rows, import_statement, ofx_statement, rollup_totals, stream_rows, walk_pages
+
+
+def test_listing_reads_archived_months(client, db):
+    bulk_create(client, generated_rows(400, seed=8, start=date(2022, 1, 1), days=730))
+    everything = client.get("/transactions/").json()
+    summaries = {
+        month: client.get("/transactions/summary", params={"month": month}).json()
+        for month in ("2022-01", "2022-07", "2023-02")
+    }
+
+    # Months of 2022 are moved out of the table into segments
+    archived = 0
+    for month in range(1, 13):
+        segment = archive_month(db, f"2022-{month:02d}")
+        db.commit()
+        archived += segment["rows"] if segment else 0
+    assert archived == sum(1 for row in everything if row["date"] < "2023-01-01")
+    assert db.execute(text("SELECT count(*) FROM transactions WHERE date < '2023-01-01'")).scalar_one() == 0
+
+    # Rows added later to an archived month are listed with the archived ones
+    late = client.post("/transactions/", json={"amount": "5.00", "merchant": "Uber", "date": "2022-03-10"}).json()
+    late_row = {key: late[key] for key in ("id", "amount", "merchant", "category", "date")}
+    everything = sorted(everything + [late_row], key=lambda row: (row["date"], row["id"]))
+
+    # Listings, pages across the archive boundary and streams read the archive transparently
+    assert client.get("/transactions/").json() == everything
+    for limit in (1, 9, 1000):
+        assert walk_pages(client, limit) == everything
+    assert walk_pages(client, 11, start="2022-11-15", end="2023-01-20") == [
+        row for row in everything if "2022-11-15" <= row["date"] <= "2023-01-20"
+    ]
+    assert stream_rows(client) == everything
+
+    # Summaries of archived months are unchanged, and rollups still count archived rows
+    for month in ("2022-07", "2023-02"):
+        assert client.get("/transactions/summary", params={"month": month}).json() == summaries[month]
+    assert client.get("/transactions/summary", params={"month": "2022-01"}).json() == summaries["2022-01"]
+
+    # New rows never reuse an archived id
+    assert late["id"] > max(row["id"] for row in everything if row is not late_row)
+
+
+def test_external_ids_stay_unique_after_their_month_is_archived(client, db, tmp_path):
+    # Rows of February 2022 arrive by create, keyed create, bulk ingest and statement import
+    row = {"amount": "12.50", "merchant": "Lyft", "date": "2022-02-03", "external_id": "bank-1"}
+    keyed = {"amount": "3.00", "merchant": "Uber", "date": "2022-02-04"}
+    bulk_rows = [
+        {"amount": f"{index}.25", "merchant": "Walmart", "date": "2022-02-10", "external_id": f"bulk-{index}"}
+        for index in range(1, 4)
+    ]
+    statement = tmp_path / "statement.ofx"
+    statement.write_text(
+        ofx_statement([(f"fit-{index}", f"2022021{index}", f"-{index}.99", "Starbucks") for index in range(1, 4)])
+    )
+
+    first = client.post("/transactions/", json=row).json()
+    first_keyed = client.post("/transactions/", json=keyed, headers={"Idempotency-Key": "request-7"}).json()
+    first_bulk = bulk_create(client, bulk_rows)
+    assert import_statement(db, statement) == (3, 0, 0)
+
+    # The month is archived, so none of its rows is left in the table
+    assert archive_month(db, "2022-02")["rows"] == 8
+    db.commit()
+    assert db.execute(text("SELECT count(*) FROM transactions")).scalar_one() == 0
+    rollups = rollup_totals(db)
+
+    # Retried creates are answered with the archived transactions
+    retry = client.post("/transactions/", json=row)
+    assert retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first
+    retry_keyed = client.post("/transactions/", json=keyed, headers={"Idempotency-Key": "request-7"})
+    assert retry_keyed.headers["idempotent-replayed"] == "true"
+    assert retry_keyed.json()["id"] == first_keyed["id"]
+
+    # An archived external id used for a different transaction is still a conflict
+    assert client.post("/transactions/", json={**row, "amount": "99.00"}).status_code == 409
+
+    # A retried bulk request and a re-imported statement store nothing again
+    retry_bulk = bulk_create(client, bulk_rows)
+    assert retry_bulk["duplicates"] == 3
+    assert [result["id"] for result in retry_bulk["results"]] == [result["id"] for result in first_bulk["results"]]
+    assert import_statement(db, statement) == (0, 3, 0)
+
+    # No row was stored again, so the table and the month's rollups are unchanged
+    assert db.execute(text("SELECT count(*) FROM transactions")).scalar_one() == 0
+    assert rollup_totals(db) == rollups
+
+
+def test_migration_reserves_external_ids_of_months_archived_before_it(client, db, database):
+    bulk_create(client, [{"amount": "4.00", "merchant": "Uber", "date": "2022-05-06", "external_id": "old-1"}])
+    archive_month(db, "2022-05")
+    db.commit()
+
+    # A database archived before external ids were reserved is migrated again
+    # Top merchant counters were still kept as JSON at that version
+    with database.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE archived_external_ids")
+        connection.exec_driver_sql("DROP TABLE monthly_top_merchant_counters")
+        connection.exec_driver_sql("ALTER TABLE monthly_top_merchants ADD COLUMN counters TEXT NOT NULL DEFAULT '{}'")
+        connection.exec_driver_sql("PRAGMA user_version = 14")
+    run_migrations(database)
+
+    # External ids are read back from the segment files
+    with SessionLocal() as session:
+        assert session.execute(
+            text("SELECT external_id, transaction_id, amount_cents, date FROM archived_external_ids")
+        ).all() == [("old-1", 1, 400, "2022-05-06")]
+    retry = bulk_create(client, [{"amount": "4.00", "merchant": "Uber", "date": "2022-05-06", "external_id": "old-1"}])
+    assert retry["duplicates"] == 1
+
+
+def test_async_stream_merges_archived_months_in_batches(client, async_client, db, monkeypatch):
+    bulk_create(client, generated_rows(300, seed=10, start=date(2022, 1, 1), days=730))
+    for month in ("2022-02", "2022-03", "2022-09", "2023-12"):
+        archive_month(db, month)
+        db.commit()
+    bulk_create(client, generated_rows(40, seed=11, start=date(2022, 2, 1), days=60))
+
+    # Small chunks make archived batches and stored partitions interleave many times
+    monkeypatch.setattr(settings, "stream_chunk_size", 7)
+    everything = stream_rows(client)
+    assert [(row["date"], row["id"]) for row in everything] == sorted((row["date"], row["id"]) for row in everything)
+    assert len(everything) == 340
+
+    # The async stream returns the same rows as the sync stream, for whole and partial ranges
+    assert stream_rows(async_client) == everything
+    assert stream_rows(async_client, start="2022-02-15", end="2022-10-01") == [
+        row for row in everything if "2022-02-15" <= row["date"] <= "2022-10-01"
+    ]
+    assert stream_rows(async_client, start="2023-12-01") == [row for row in everything if row["date"] >= "2023-12-01"]
+
+
+def test_async_pages_merge_archived_months(client, async_client, db):
+    bulk_create(client, generated_rows(200, seed=12, start=date(2022, 1, 1), days=365))
+    for month in ("2022-01", "2022-02", "2022-06"):
+        archive_month(db, month)
+        db.commit()
+    bulk_create(client, generated_rows(30, seed=13, start=date(2022, 1, 1), days=60))
+    everything = client.get("/transactions/").json()
+
+    # Async pages cross archived and stored months in the same order as the sync listing
+    assert async_client.get("/transactions/").json() == everything
+    for limit in (1, 7, 500):
+        assert walk_pages(async_client, limit) == everything
+    assert walk_pages(async_client, 5, start="2022-01-20", end="2022-03-01") == [
+        row for row in everything if "2022-01-20" <= row["date"] <= "2022-03-01"
+    ]
+
+    # A page made only of archived rows carries the same cursor on both paths
+    page = {"limit": 3, "end": "2022-01-31"}
+    assert async_client.get("/transactions/", params=page).headers["x-next-cursor"] == client.get(
+        "/transactions/", params=page
+    ).headers["x-next-cursor"]
+
+def test_new_ids_continue_after_archived_ids(client, db):
+    bulk_create(client, generated_rows(5, seed=9, start=date(2022, 1, 3), days=7))
+    archive_month(db, "2022-01")
+    db.commit()
+
+    # The table is empty, yet the next id follows the largest archived one
+    created = client.post("/transactions/", json={"amount": "1.00", "merchant": "Uber", "date": "2024-01-01"})
+    assert created.json()["id"] == 6
@@ -0,0 +1,185 @@
+# Categorizer tests are defined in this file
+# The compiled rule engine is checked against the chained substring rules it replaced
+import random
+
+import pytest
+
+from app.services.categorizer import (
+    SOURCE_DEFAULT,
+    SOURCE_MODEL,
+    SOURCE_RULE,
+    build_rule_engine,
+    categorize_batch,
+    categorize_merchant,
+    categorize_merchants,
+    categorize_transaction,
+    get_category_cache_stats,
+    get_rule_engine,
+    set_fallback_model,
+)
+from app.services.cache import LRUCache
+from app.services.merchant import normalize_merchant
+from app.services.rule_engine import CategoryRule, RuleEngine
+from tests.helpers import counted_calls
+
+# Words merchants are built from, including the bundled patterns, their fragments and overlaps
+WORDS = (
+    "starbucks", "restaurant", "uber", "lyft", "walmart", "grocery",
+    "star", "bucks", "rest", "ube", "uberlyft", "lyftwalmart", "grocerystarbucks",
+    "cafe", "market", "store", "ride", "super", "fresh", "coffee", "shop",
+)
+
+
+def legacy_category(merchant: str) -> str:
+    # Chained substring checks the rule engine replaced
+    merchant_lower = merchant.lower()
+    if "starbucks" in merchant_lower or "restaurant" in merchant_lower:
+        return "Food & Dining"
+    if "uber" in merchant_lower or "lyft" in merchant_lower:
+        return "Transportation"
+    if "walmart" in merchant_lower or "grocery" in merchant_lower:
+        return "Groceries"
+    return "Uncategorized"
+
+
+def random_merchants(count: int, seed: int) -> list[str]:
+    # Merchants are joined from random words and letters, in random case
+    rng = random.Random(seed)
+    merchants = []
+    for _ in range(count):
+        words = [
+            rng.choice(WORDS) if rng.random() < 0.7 else "".join(rng.choices("abcdegklorstuwy", k=rng.randint(2, 8)))
+            for _ in range(rng.randint(1, 4))
+        ]
+        merchants.append(" ".join(word.upper() if rng.random() < 0.3 else word.title() for word in words))
+    return merchants
+
+
+def test_bundled_rules_match_chained_substring_rules():
+    merchants = random_merchants(5000, seed=1)
+    rule_engine = get_rule_engine()
+
+    for merchant in merchants:
+        assert rule_engine.categorize(merchant.lower()) == legacy_category(merchant), merchant
+        assert categorize_transaction(merchant) == legacy_category(merchant), merchant
+
+
+def test_priority_and_declaration_order_pick_the_rule():
+    rule_engine = build_rule_engine(
+        [
+            CategoryRule("coffee", "Coffee"),
+            CategoryRule("coffee shop", "Cafes", priority=5),
+            CategoryRule("shop", "Shopping", priority=5),
+            CategoryRule("shop", "Retail", priority=5),
+        ]
+    )
+
+    # The higher priority wins wherever it matches, and ties go to the rule listed first
+    assert rule_engine.categorize("corner coffee") == "Coffee"
+    assert rule_engine.categorize("coffee shop downtown") == "Cafes"
+    assert rule_engine.categorize("shop coffee") == "Shopping"
+    assert rule_engine.categorize("bakery") == "Uncategorized"
+
+    # The same merchants are categorized with the engine that is passed in
+    assert categorize_merchant("Corner Coffee #12", rule_engine) == ("Coffee", SOURCE_RULE)
+    assert categorize_merchant("Bakery", rule_engine) == ("Uncategorized", SOURCE_DEFAULT)
+
+
+def test_rules_with_overlapping_patterns_match_inside_words():
+    rule_engine = RuleEngine([CategoryRule("he", "A"), CategoryRule("she", "B", 1), CategoryRule("hers", "C", 2)])
+
+    assert rule_engine.categorize("ushers") == "C"
+    assert rule_engine.categorize("ushe") == "B"
+    assert rule_engine.categorize("ahe") == "A"
+    assert rule_engine.categorize("hr") == "Uncategorized"
+
+
+def test_batches_match_single_categorizations_and_are_counted():
+    merchants = random_merchants(500, seed=2) * 2
+    calls = counted_calls()
+
+    # Repeated merchants are looked up once, but every merchant of the batch is counted
+    assert categorize_batch(merchants) == [categorize_transaction(merchant) for merchant in merchants]
+    assert counted_calls() == calls + 2 * len(merchants)
+
+
+def test_fallback_model_categorizes_unmatched_merchants():
+    fallback_model = pytest.importorskip("app.services.fallback_model")
+
+    # A model learns a category for merchants no rule matches
+    names = ["qwop lemonade", "qwop lemonade stand", "lemonade qwop"] * 10 + ["zelk hardware", "zelk tools"] * 10
+    labels = ["Food & Dining"] * 30 + ["Shopping"] * 20
+    set_fallback_model(fallback_model.NaiveBayesFallback.train(names, labels))
+    try:
+        categorizations = categorize_merchants(["Qwop Lemonade", "Uber Ride", "Qwop Lemonade"])
+        assert categorizations == [
+            ("Food & Dining", SOURCE_MODEL),
+            ("Transportation", SOURCE_RULE),
+            ("Food & Dining", SOURCE_MODEL),
+        ]
+    finally:
+        set_fallback_model(None)
+
+    # Without the model the merchant falls back to the default category again
+    assert categorize_merchant("Qwop Lemonade") == ("Uncategorized", SOURCE_DEFAULT)
+
+
+@pytest.mark.parametrize(
+    ("merchant", "normalized"),
+    [
+        ("UBER *TRIP 1234", "uber trip"),
+        ("UBER *TRIP 9981", "uber trip"),
+        ("uber123", "uber"),
+        ("AB12UBER", "uber"),
+        ("7-Eleven #3310", "eleven"),
+        ("POS X9K2J Starbucks", "pos starbucks"),
+        ("Walmart #42", "walmart"),
+        ("#1234 / 5678", ""),
+    ],
+)
+def test_normalization_strips_store_numbers_and_keeps_words(merchant, normalized):
+    assert normalize_merchant(merchant) == normalized
+
+
+def test_words_after_short_prefixes_are_still_categorized():
+    # A word joined to a short code and digits still matches its rule
+    assert categorize_merchant("AB12UBER") == ("Transportation", SOURCE_RULE)
+    assert categorize_merchant("xy9walmart") == ("Groceries", SOURCE_RULE)
+
+
+def test_cache_evicts_the_least_recently_used_entry():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    # Reading "a" makes "b" the least recently used entry, which the third entry evicts
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+
+def test_cleared_cache_drops_values_computed_before_the_clear():
+    cache = LRUCache(10)
+    cache.put("a", 1)
+    generation = cache.generation
+
+    # A value computed before the clear is not stored, one computed after it is
+    cache.clear()
+    assert cache.get("a") is None
+    cache.put("b", 2, generation)
+    assert cache.get("b") is None
+    cache.put("b", 3, cache.generation)
+    assert cache.get("b") == 3
+
+
+def test_cache_stats_are_exposed_as_metrics(client):
+    categorize_merchants(["Uber Trip 1", "Uber Trip 2", "Corner Bookshop"])
+    stats = get_category_cache_stats()
+    samples = dict(
+        line.rsplit(" ", 1) for line in client.get("/metrics").text.splitlines() if line.startswith("categorizer_cache_")
+    )
+    assert float(samples["categorizer_cache_entries"]) == stats["size"] > 0
+    assert float(samples["categorizer_cache_max_entries"]) == stats["max_size"]
+    assert float(samples["categorizer_cache_misses_total"]) >= stats["misses"]
@@ -0,0 +1,35 @@
+# Change feed tests are defined in this file
+# Inserts, re-categorizations and deletes are read back in change sequence order
+from tests.helpers import generated_rows
+
+
+def test_change_feed_reports_upserts_and_tombstones(client):
+    created = [
+        client.post("/transactions/", json=row).json() for row in generated_rows(3, seed=6)
+    ]
+    feed = client.get("/transactions/changes", params={"since": 0}).json()
+    assert [change["operation"] for change in feed["changes"]] == ["upsert"] * 3
+    assert [change["id"] for change in feed["changes"]] == [row["id"] for row in created]
+    assert feed["has_more"] is False
+
+    # A poll without changes returns nothing and keeps the cursor
+    cursor = feed["next_since"]
+    empty = client.get("/transactions/changes", params={"since": cursor}).json()
+    assert (empty["changes"], empty["next_since"]) == ([], cursor)
+
+    # A delete is reported as a tombstone after the cursor
+    assert client.delete(f"/transactions/{created[1]['id']}").status_code == 204
+    new_row = client.post("/transactions/", json=generated_rows(1, seed=7)[0]).json()
+    delta = client.get("/transactions/changes", params={"since": cursor}).json()
+    assert [(change["operation"], change["id"]) for change in delta["changes"]] == [
+        ("delete", created[1]["id"]),
+        ("upsert", new_row["id"]),
+    ]
+
+    # Small pages report that more changes remain and continue where they stopped
+    # The deleted row's insert is gone, only its tombstone is left
+    page = client.get("/transactions/changes", params={"since": 0, "limit": 2}).json()
+    assert page["has_more"] is True
+    rest = client.get("/transactions/changes", params={"since": page["next_since"]}).json()
+    assert [change["seq"] for change in page["changes"] + rest["changes"]] == [1, 3, 4, 5]
+    assert rest["has_more"] is False
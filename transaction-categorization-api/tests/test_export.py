@@ -0,0 +1,64 @@
+# Export tests are defined in this file
+# Streamed CSV and NDJSON exports are decoded and compared with the listed rows, archived months included
+import csv
+import gzip
+import io
+import json
+from datetime import date
+
+from app.core.config import settings
+from app.services.archive import archive_month
+from app.services.listing import CSV_HEADER
+from tests.helpers import bulk_create, generated_rows
+
+# Merchant whose name needs quoting in CSV
+QUOTED_MERCHANT = 'Joe\'s "Diner", Main St'
+
+
+def exported(client, export_format: str, gzip_encoded: bool = False, **params) -> bytes:
+    # Raw response bytes are read, so a gzip stream is decoded here rather than by the client
+    headers = {"Accept-Encoding": "gzip" if gzip_encoded else "identity"}
+    with client.stream(
+        "GET", "/transactions/export", params={"format": export_format, **params}, headers=headers
+    ) as response:
+        assert response.status_code == 200
+        assert (response.headers.get("content-encoding") == "gzip") is gzip_encoded
+        body = b"".join(response.iter_raw())
+    return gzip.decompress(body) if gzip_encoded else body
+
+
+def test_exports_match_the_listing_including_archived_rows(client, db, monkeypatch):
+    bulk_create(client, generated_rows(120, seed=50, start=date(2022, 1, 1), days=180))
+    bulk_create(
+        client,
+        [
+            {"amount": "12.30", "merchant": QUOTED_MERCHANT, "date": "2022-02-14"},
+            {"amount": "7.05", "merchant": QUOTED_MERCHANT, "date": "2022-05-02"},
+        ],
+    )
+    archive_month(db, "2022-02")
+    db.commit()
+
+    # Small chunks spread the export over many compressed and uncompressed chunks
+    monkeypatch.setattr(settings, "stream_chunk_size", 9)
+    listed = client.get("/transactions/").json()
+    assert any(row["date"].startswith("2022-02") for row in listed)
+
+    # NDJSON lines are the listed rows
+    lines = exported(client, "ndjson").decode().splitlines()
+    assert [json.loads(line) for line in lines] == listed
+    gzipped = exported(client, "ndjson", gzip_encoded=True, start="2022-02-10", end="2022-03-31")
+    assert [json.loads(line) for line in gzipped.decode().splitlines()] == [
+        row for row in listed if "2022-02-10" <= row["date"] <= "2022-03-31"
+    ]
+
+    # The gzipped CSV export holds the header and the listed rows, with the merchant quoted
+    text = exported(client, "csv", gzip_encoded=True).decode()
+    assert '"Joe\'s ""Diner"", Main St"' in text
+    header, *records = csv.reader(io.StringIO(text))
+    assert tuple(header) == CSV_HEADER
+    assert [
+        {"id": int(row_id), "amount": float(amount), "merchant": merchant, "category": category, "date": row_date}
+        for row_id, amount, merchant, category, row_date in records
+    ] == listed
+    assert sum(1 for record in records if record[2] == QUOTED_MERCHANT) == 2
@@ -0,0 +1,65 @@
+# Idempotent creation tests are defined in this file
+# Retried creates and bulk requests are answered from the rows stored for their external ids
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from tests.helpers import bulk_create, generated_rows, grouped_totals, rollup_totals
+
+
+def test_create_with_a_stored_external_id_is_replayed(client, db):
+    row = {"amount": "12.50", "merchant": "Lyft", "date": "2024-02-03", "external_id": "bank-1"}
+    first = client.post("/transactions/", json=row)
+    assert first.status_code == 200
+    assert "idempotent-replayed" not in first.headers
+
+    # A retry is answered with the stored transaction
+    retry = client.post("/transactions/", json=row)
+    assert retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+
+    # The same external id with a different transaction is a conflict
+    conflict = client.post("/transactions/", json={**row, "amount": "13.00"})
+    assert conflict.status_code == 409
+
+    # The Idempotency-Key header keys requests without an external id
+    keyed = {"amount": "3.00", "merchant": "Uber", "date": "2024-02-04"}
+    first_keyed = client.post("/transactions/", json=keyed, headers={"Idempotency-Key": "request-7"})
+    retry_keyed = client.post("/transactions/", json=keyed, headers={"Idempotency-Key": "request-7"})
+    assert retry_keyed.headers["idempotent-replayed"] == "true"
+    assert retry_keyed.json()["id"] == first_keyed.json()["id"]
+
+    # Only one row and one rollup count exist per key
+    assert db.execute(text("SELECT count(*) FROM transactions")).scalar_one() == 2
+    assert rollup_totals(db) == grouped_totals(db)
+
+
+def test_bulk_retry_with_external_ids_stores_nothing_twice(client, db):
+    rows = [{**row, "external_id": f"statement-{index}"} for index, row in enumerate(generated_rows(50, seed=5))]
+    first = bulk_create(client, rows)
+    assert (first["inserted"], first["duplicates"], first["failed"]) == (50, 0, 0)
+
+    # A repeated batch, including a repeat inside it, is answered from the stored rows
+    retry = bulk_create(client, rows + rows[:1])
+    assert (retry["inserted"], retry["duplicates"], retry["failed"]) == (0, 51, 0)
+    assert [result["id"] for result in retry["results"][:50]] == [result["id"] for result in first["results"]]
+
+    # A changed row under a stored id is refused
+    changed = bulk_create(client, [{**rows[0], "amount": "999.99"}])
+    assert changed["failed"] == 1
+    assert "already used" in changed["results"][0]["error"]
+
+    assert db.execute(text("SELECT count(*) FROM transactions")).scalar_one() == 50
+
+
+def test_concurrent_retries_store_a_transaction_once(client, db):
+    row = {"amount": "8.00", "merchant": "Uber", "date": "2024-06-01", "external_id": "race-1"}
+    with ThreadPoolExecutor(8) as pool:
+        responses = list(pool.map(lambda _: client.post("/transactions/", json=row), range(16)))
+
+    # Every request gets the same transaction, and only one of them stored it
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert sum("idempotent-replayed" not in response.headers for response in responses) == 1
+    assert db.execute(text("SELECT count(*) FROM transactions")).scalar_one() == 1
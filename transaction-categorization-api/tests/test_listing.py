@@ -0,0 +1,105 @@
+# Transaction listing tests are defined in this file
+# Pages are followed through their keyset cursors and compared with the full listing
+import base64
+import json
+
+import pytest
+from sqlalchemy import select
+
+from app.core import responses
+from app.models.transaction import Transaction
+from app.schemas.transaction import TransactionRead
+from tests.helpers import bulk_create, generated_rows, stream_rows, walk_pages
+
+
+def test_cursor_pages_return_every_row_once(client):
+    bulk_create(client, generated_rows(250))
+    everything = client.get("/transactions/").json()
+    assert len(everything) == 250
+
+    # Rows are ordered by (date, id)
+    assert everything == sorted(everything, key=lambda row: (row["date"], row["id"]))
+
+    # Pages of any size join into the full listing, without duplicates or gaps
+    for limit in (1, 7, 100, 250, 1000):
+        assert walk_pages(client, limit) == everything
+
+    # Date filters are kept across pages
+    in_range = [row for row in everything if "2022-06-01" <= row["date"] <= "2023-03-31"]
+    assert walk_pages(client, 13, start="2022-06-01", end="2023-03-31") == in_range
+
+    # Streaming returns the same rows as the pages
+    assert stream_rows(client) == everything
+
+
+def test_cursor_pages_see_rows_added_after_the_cursor(client):
+    bulk_create(client, generated_rows(40, seed=1))
+    first = client.get("/transactions/", params={"limit": 10})
+    cursor = first.headers["x-next-cursor"]
+
+    # A row sorting after the cursor appears on a later page, one sorting before it does not
+    last_row = first.json()[-1]
+    bulk_create(
+        client,
+        [
+            {"amount": "1.00", "merchant": "Uber", "date": "2030-01-01"},
+            {"amount": "1.00", "merchant": "Uber", "date": "2000-01-01"},
+        ],
+    )
+    rest = walk_pages(client, 10, after=cursor)
+    assert [row["date"] for row in rest].count("2030-01-01") == 1
+    assert all((row["date"], row["id"]) > (last_row["date"], last_row["id"]) for row in rest)
+
+
+def raw_cursor(payload: str) -> str:
+    # Cursor token of an arbitrary JSON payload
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not-a-cursor",
+        raw_cursor('["2024-01-01", 1e400]'),
+        raw_cursor('["2024-01-01", 1.5]'),
+        raw_cursor('["2024-01-01", true]'),
+        raw_cursor('["2024-01-01", "7"]'),
+        raw_cursor(f'["2024-01-01", {1 << 63}]'),
+        raw_cursor(f'["2024-01-01", {-(1 << 63) - 1}]'),
+        raw_cursor('["2024-01-01", ' + "9" * 5000 + "]"),
+        raw_cursor('["2024-13-01", 1]'),
+        raw_cursor('[20240101, 1]'),
+        raw_cursor('["2024-01-01"]'),
+        raw_cursor("{}"),
+    ],
+)
+def test_invalid_cursor_is_rejected(client, cursor):
+    response = client.get("/transactions/", params={"limit": 10, "after": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid pagination cursor"
+
+
+def test_cursor_at_the_integer_bounds_is_accepted(client):
+    bulk_create(client, generated_rows(3))
+    assert client.get("/transactions/", params={"after": raw_cursor(f'["2000-01-01", {(1 << 63) - 1}]')}).json()
+    assert client.get("/transactions/", params={"after": raw_cursor(f'["2999-01-01", {-(1 << 63)}]')}).json() == []
+
+
+def test_fast_list_response_matches_the_response_model(client, db, monkeypatch):
+    bulk_create(client, generated_rows(60, seed=12) + [{"amount": "1.5", "merchant": "Café \"Ünï\"", "date": "2024-01-01"}])
+
+    # Rows validated and dumped through TransactionRead are the reference
+    stored = db.scalars(select(Transaction).order_by(Transaction.date, Transaction.id)).all()
+    expected = [json.loads(TransactionRead.model_validate(row).model_dump_json()) for row in stored]
+    assert client.get("/transactions/").json() == expected
+    assert walk_pages(client, 7) == expected
+    assert stream_rows(client) == expected
+
+    # The standard library encoder gives the same output as orjson
+    monkeypatch.setattr(responses, "orjson", None)
+    assert client.get("/transactions/").json() == expected
+
+    # The declared response model still documents the list payload
+    schema = client.get("/openapi.json").json()
+    listed = schema["paths"]["/transactions/"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert listed["items"]["$ref"].endswith("/TransactionRead")
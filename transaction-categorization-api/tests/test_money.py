@@ -0,0 +1,38 @@
+# Money handling tests are defined in this file
+# Amounts are stored and summed as integer cents, never as floats
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from app.services.money import cents_to_float, from_cents, to_cents
+
+
+def test_amounts_are_stored_and_summed_in_exact_cents(client, db):
+    # Ten amounts of 0.10 add up to exactly 1.00, which floats do not
+    for _ in range(10):
+        client.post("/transactions/", json={"amount": "0.10", "merchant": "Uber", "date": "2024-05-01"})
+    created = client.post("/transactions/", json={"amount": 19.99, "merchant": "Walmart", "date": "2024-05-02"})
+    assert created.json()["amount"] == 19.99
+
+    # Amounts are stored as integer cents
+    stored = db.execute(text("SELECT amount_cents FROM transactions ORDER BY id")).scalars().all()
+    assert stored == [10] * 10 + [1999]
+
+    summary = client.get("/transactions/summary", params={"month": "2024-05"}).json()
+    assert summary["totals_by_category"]["Transportation"] == 1.0
+    assert summary["overall_total"] == 20.99
+    assert summary["transaction_count"] == 11
+
+    # Amounts with more than two decimal places are refused
+    response = client.post("/transactions/", json={"amount": "1.005", "merchant": "Uber", "date": "2024-05-01"})
+    assert response.status_code == 422
+
+
+def test_cents_conversions_round_trip_exactly():
+    # Amounts convert to cents and back without drift, float noise included
+    assert to_cents("19.99") == 1999
+    assert to_cents(0.1 + 0.2) == 30
+    assert to_cents(Decimal("-0.01")) == -1
+    assert from_cents(to_cents("1234567890123.45")) == Decimal("1234567890123.45")
+    assert cents_to_float(1999) == 19.99
+    assert sum(to_cents("0.10") for _ in range(10)) == to_cents("1.00")
@@ -0,0 +1,142 @@
+# Year partitioning tests are defined in this file
+# Transactions are routed to one shard per year under the test directory, the main database keeps only jobs
+from datetime import date
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal, create_shard_engine
+from app.db.shards import ID_BLOCK, PartitionedSession, ShardRouter
+from app.services.ingest import insert_transaction_rows
+from tests.helpers import bulk_create, generated_rows, grouped_totals, rollup_totals, walk_pages
+
+
+def route_shards(monkeypatch, directory: str, readonly_before: int = 0) -> ShardRouter:
+    # Sessions of the app are made partitioned and routed through a new router
+    router = ShardRouter(directory, create_shard_engine, readonly_before)
+    monkeypatch.setattr(SessionLocal, "class_", PartitionedSession)
+    monkeypatch.setitem(SessionLocal.kw, "router", router)
+    return router
+
+
+@pytest.fixture
+def shards(database, tmp_path, monkeypatch):
+    # Shards are created under the test directory and closed after the test
+    routers = [route_shards(monkeypatch, str(tmp_path / "shards"))]
+    yield routers
+    for router in routers:
+        router.dispose()
+
+
+def shard_rows(router: ShardRouter, year: int) -> list[tuple[int, str]]:
+    # Ids and dates stored in a shard are read from its file directly
+    with router.engine(year).connect() as connection:
+        return connection.execute(text("SELECT id, date FROM transactions ORDER BY id")).all()
+
+
+def test_writes_and_pages_span_year_shards(client, database, shards):
+    router = shards[0]
+    result = bulk_create(client, generated_rows(300, seed=20, start=date(2022, 1, 1), days=730))
+    assert result["inserted"] == 300
+    created = client.post("/transactions/", json={"amount": "2.50", "merchant": "Uber", "date": "2023-12-31"})
+    assert created.status_code == 200, created.text
+
+    # Each year is written to its own shard, in the id block of that year, and the main table stays empty
+    assert router.years() == [2022, 2023]
+    for year in (2022, 2023):
+        rows = shard_rows(router, year)
+        assert rows
+        assert {row_id // ID_BLOCK for row_id, _ in rows} == {year}
+        assert {row_date[:4] for _, row_date in rows} == {str(year)}
+    assert created.json()["id"] // ID_BLOCK == 2023
+    with database.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM transactions")).scalar_one() == 0
+
+    # Rollups of every shard match the rows it holds
+    with SessionLocal() as db:
+        for year in (2022, 2023):
+            shard = db.shard(year)
+            assert rollup_totals(shard) == grouped_totals(shard)
+
+    # Listings follow the global (date, id) order across shards, on single pages and walked pages
+    everything = client.get("/transactions/").json()
+    assert len(everything) == 301
+    assert [(row["date"], row["id"]) for row in everything] == sorted((row["date"], row["id"]) for row in everything)
+    for limit in (1, 9, 1000):
+        assert walk_pages(client, limit) == everything
+    assert walk_pages(client, 7, start="2022-11-01", end="2023-02-01") == [
+        row for row in everything if "2022-11-01" <= row["date"] <= "2023-02-01"
+    ]
+
+
+def test_shards_are_committed_before_the_main_database(database, shards):
+    router = shards[0]
+    committed = []
+
+    def record_commit(session) -> None:
+        committed.append(session.bind.url.database)
+
+    # Rows of two years are written in one session, which also reads the main database
+    event.listen(Session, "after_commit", record_commit)
+    try:
+        with SessionLocal() as db:
+            db.execute(text("SELECT count(*) FROM import_jobs")).scalar_one()
+            insert_transaction_rows(
+                db,
+                [
+                    {
+                        "amount_cents": 100 * day,
+                        "merchant": "Uber",
+                        "category": "Transportation",
+                        "date": date(year, 3, day),
+                        "external_id": None,
+                        "rules_version": None,
+                        "category_source": "rule",
+                    }
+                    for year in (2023, 2022)
+                    for day in (1, 2)
+                ],
+            )
+            db.commit()
+    finally:
+        event.remove(Session, "after_commit", record_commit)
+
+    # Shards commit in year order and the main database last, so checkpoints never run ahead of rows
+    assert committed == [
+        router.engine(2022).url.database,
+        router.engine(2023).url.database,
+        database.url.database,
+    ]
+
+
+def test_read_only_years_reject_writes_and_stay_listed(client, shards, monkeypatch):
+    bulk_create(client, generated_rows(60, seed=21, start=date(2022, 6, 1), days=300))
+    before = client.get("/transactions/").json()
+    old_id = next(row["id"] for row in before if row["date"] < "2023-01-01")
+
+    # Shards of years before 2023 are opened read-only from now on
+    shards[0].dispose()
+    shards.append(route_shards(monkeypatch, shards[0].directory, readonly_before=2023))
+
+    # Single writes and deletes in a read-only year are refused
+    response = client.post("/transactions/", json={"amount": "1.00", "merchant": "Uber", "date": "2022-07-01"})
+    assert response.status_code == 409
+    assert client.delete(f"/transactions/{old_id}").status_code == 409
+
+    # Bulk rows in a read-only year fail one by one while the other rows are written
+    result = bulk_create(
+        client,
+        [
+            {"amount": "1.00", "merchant": "Uber", "date": "2022-07-01"},
+            {"amount": "2.00", "merchant": "Uber", "date": "2023-07-01"},
+        ],
+    )
+    assert (result["inserted"], result["failed"]) == (1, 1)
+    assert result["results"][0]["error"] == "date: transactions dated 2022 are archived read-only"
+    assert result["results"][1]["id"] // ID_BLOCK == 2023
+
+    # Rows of the read-only year are still listed
+    after = client.get("/transactions/").json()
+    assert [row for row in after if row["date"] < "2023-01-01"] == [row for row in before if row["date"] < "2023-01-01"]
+    assert len(after) == len(before) + 1
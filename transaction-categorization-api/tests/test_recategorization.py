@@ -0,0 +1,83 @@
+# Re-categorization tests are defined in this file
+# Stored rows are moved to the categories of new rules in checkpointed chunks that a resumed job continues from
+from app.services.categorizer import build_rule_engine, get_rule_engine, set_rule_engine
+from app.services.recategorization import create_recategorization_job, run_recategorization
+from app.services.rollups import find_rollup_drift, rebuild_rollups
+from app.services.rule_engine import CategoryRule
+from tests.helpers import bulk_create, generated_rows, rollup_totals
+
+# Rules moving rideshare trips and bookshops out of their current categories
+NEW_RULES = (
+    CategoryRule("starbucks", "Food & Dining"),
+    CategoryRule("uber", "Rideshare"),
+    CategoryRule("lyft", "Rideshare"),
+    CategoryRule("walmart", "Groceries"),
+    CategoryRule("grocery", "Groceries"),
+    CategoryRule("bookshop", "Books"),
+)
+
+
+class Interrupted(Exception):
+    # Raised from the progress callback to stop a job between chunks
+    pass
+
+
+def read_all_changes(client, since: int) -> tuple[list[dict], int]:
+    # Change feed pages are followed until no change remains
+    changes = []
+    while True:
+        page = client.get("/transactions/changes", params={"since": since, "limit": 25}).json()
+        changes.extend(page["changes"])
+        since = page["next_since"]
+        if not page["has_more"]:
+            return changes, since
+
+
+def test_recategorization_resumes_and_keeps_rollups_and_change_feed_exact(client, db):
+    bulk_create(client, generated_rows(150, seed=30))
+    before = {row["id"]: row for row in client.get("/transactions/").json()}
+    _, cursor = read_all_changes(client, 0)
+
+    # Rows whose category differs under the new rules are the ones expected to move
+    rule_engine = get_rule_engine()
+    set_rule_engine(build_rule_engine(NEW_RULES))
+    try:
+        new_engine = get_rule_engine()
+        expected = {
+            row_id: new_engine.categorize(row["merchant"].lower())
+            for row_id, row in before.items()
+            if new_engine.categorize(row["merchant"].lower()) != row["category"]
+        }
+        assert expected
+
+        # The job is stopped after its first chunk and resumed from the checkpoint
+        job = create_recategorization_job(db)
+
+        def interrupt(job) -> None:
+            raise Interrupted
+
+        assert run_recategorization(job.id, chunk_size=40, on_progress=interrupt) == "failed"
+        db.refresh(job)
+        assert job.rows_scanned == 40
+        assert run_recategorization(job.id, chunk_size=40) == "completed"
+        db.refresh(job)
+        assert (job.rows_scanned, job.rows_changed) == (150, len(expected))
+    finally:
+        set_rule_engine(rule_engine)
+
+    # Exactly the expected rows moved, and the others kept their category
+    after = {row["id"]: row for row in client.get("/transactions/").json()}
+    assert {row_id: row["category"] for row_id, row in after.items() if row != before[row_id]} == expected
+
+    # Rollups followed the moved rows and equal a rebuild from the table
+    assert find_rollup_drift(db) == []
+    totals = rollup_totals(db)
+    rebuild_rollups(db)
+    db.commit()
+    assert rollup_totals(db) == totals
+
+    # The change feed reports each moved row once, with its new category
+    changes, _ = read_all_changes(client, cursor)
+    assert {change["id"]: change["category"] for change in changes} == expected
+    assert len(changes) == len(expected)
+    assert {change["operation"] for change in changes} == {"upsert"}
@@ -0,0 +1,74 @@
+# Rules watcher tests are defined in this file
+# An edited rules file is compiled and swapped in, a broken one keeps the active rules and is reported
+import pytest
+
+from app.api.routes import health
+from app.services.categorizer import (
+    SOURCE_RULE,
+    categorize_merchant,
+    get_category_cache_stats,
+    get_rule_engine,
+    get_rules_version,
+    set_rule_engine,
+)
+from app.services.rules_watcher import RulesWatcher
+
+
+@pytest.fixture
+def watched_rules(tmp_path, monkeypatch):
+    # A rules file under the test directory is watched, and /health reports this watcher
+    path = tmp_path / "rules.csv"
+    path.write_text("pattern,category,priority\nuber,Transportation,0\n")
+    watcher = RulesWatcher(lambda: path, interval_s=0)
+    monkeypatch.setattr(health, "rules_watcher", watcher)
+
+    # The active rules are put back after the test
+    rule_engine = get_rule_engine()
+    yield path, watcher
+    set_rule_engine(rule_engine)
+
+
+def test_edited_rules_file_swaps_the_engine_and_clears_the_cache(watched_rules):
+    path, watcher = watched_rules
+    assert watcher.check() is False
+
+    # A category computed with the active rules is cached
+    version = get_rules_version()
+    assert categorize_merchant("Uber Trip") == ("Transportation", SOURCE_RULE)
+    assert get_category_cache_stats()["size"] > 0
+
+    # The edited file is compiled and swapped in, and categories of the old rules are dropped
+    path.write_text("pattern,category,priority\nuber,Rideshare,0\nlyft,Rideshare,0\n")
+    assert watcher.check() is True
+    assert get_rules_version() != version
+    assert get_category_cache_stats()["size"] == 0
+    assert categorize_merchant("Uber Trip") == ("Rideshare", SOURCE_RULE)
+    assert (watcher.reloads, watcher.failures) == (1, 0)
+
+    # An unchanged file is not compiled again
+    assert watcher.check() is False
+    assert watcher.reloads == 1
+
+
+def test_broken_rules_file_keeps_the_engine_and_is_reported(client, watched_rules):
+    path, watcher = watched_rules
+    path.write_text("pattern,category,priority\nuber,Rideshare,0\n")
+    assert watcher.check() is True
+    version = get_rules_version()
+
+    # A file that cannot be loaded leaves the active rules in place and is shown by /health
+    path.write_text("pattern,category,priority\nuber,Taxi,first\n")
+    assert watcher.check() is False
+    assert get_rules_version() == version
+    assert categorize_merchant("Uber Trip") == ("Rideshare", SOURCE_RULE)
+    assert watcher.failures == 1
+    body = client.get("/health").json()
+    assert body["rules_version"] == version
+    assert body["rules_error"].startswith(f"{path}: ")
+
+    # The repaired file is swapped in and the error is cleared
+    path.write_text("pattern,category,priority\nuber,Taxi,0\n")
+    assert watcher.check() is True
+    assert categorize_merchant("Uber Trip") == ("Taxi", SOURCE_RULE)
+    body = client.get("/health").json()
+    assert (body["rules_version"], body["rules_error"]) == (get_rules_version(), None)
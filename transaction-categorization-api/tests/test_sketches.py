@@ -0,0 +1,129 @@
+# Merchant sketch tests are defined in this file
+# Sketch estimates are checked against exact counts and sketches merged across months against the union
+import random
+from collections import Counter
+from datetime import date
+
+from app.core.config import settings
+from app.services.analytics import top_merchants
+from app.services.merchant import normalize_merchant
+from app.services.merchant_sketches import load_top_merchants, record_sketch_rows
+from app.services.sketches import HLL_RELATIVE_ERROR, HyperLogLog, SpaceSaving, merchant_hash
+
+# Counters per month, small enough that most merchants are evicted
+CAPACITY = 25
+
+
+def merchant_name(rank: int) -> str:
+    # Letter-only names, so normalization keeps them apart
+    return "Shop " + "".join("abcdefghij"[int(digit)] for digit in str(rank))
+
+
+def skewed_rows(count: int, seed: int, months: tuple[int, ...]) -> list[tuple[date, str, str]]:
+    # Merchant ranks follow a long-tailed distribution, a few merchants make up most rows
+    rng = random.Random(seed)
+    return [
+        (date(2024, rng.choice(months), 1 + rng.randrange(28)), merchant_name(int(rng.paretovariate(1.1))), "Shopping")
+        for _ in range(count)
+    ]
+
+
+def hll_of(merchants) -> HyperLogLog:
+    # A sketch holding every given merchant
+    sketch = HyperLogLog()
+    for merchant in merchants:
+        sketch.add(merchant_hash(merchant))
+    return sketch
+
+
+def test_hyperloglog_counts_within_its_error():
+    # Small counts are exact through linear counting, larger ones stay within four standard errors
+    for distinct in (0, 1, 10, 1000, 20_000, 200_000):
+        estimate = hll_of(f"merchant {index}" for index in range(distinct)).count()
+        assert abs(estimate - distinct) <= max(1, 4 * HLL_RELATIVE_ERROR * distinct), (distinct, estimate)
+
+
+def test_hyperloglog_merge_is_the_sketch_of_the_union():
+    months = [[f"merchant {index}" for index in range(start, start + 3000)] for start in (0, 2000, 4000)]
+    merged = HyperLogLog()
+    merged.merge(*(hll_of(merchants) for merchants in months))
+
+    # Merged registers equal those of one sketch over every merchant, so overlaps count once
+    assert merged.registers == hll_of(merchant for merchants in months for merchant in merchants).registers
+    assert abs(merged.count() - 7000) <= 4 * HLL_RELATIVE_ERROR * 7000
+
+    # Merging nothing leaves the sketch unchanged
+    single = hll_of(months[0])
+    registers = bytes(single.registers)
+    single.merge()
+    assert bytes(single.registers) == registers
+
+
+def test_distinct_merchants_of_an_empty_range(client):
+    response = client.get("/transactions/analytics/distinct-merchants", params={"start": "2020-01", "end": "2020-12"})
+    assert response.status_code == 200, response.text
+    assert response.json()["distinct_merchants"]["estimate"] == 0
+    assert response.json()["by_category"] == {}
+
+
+def test_stored_counters_match_a_sketch_updated_in_memory(db, monkeypatch):
+    monkeypatch.setattr(settings, "top_merchant_capacity", CAPACITY)
+    rows = skewed_rows(3000, seed=40, months=(1, 2))
+
+    # Rows are recorded in chunks, while the same chunks update sketches held in memory
+    expected = {month: SpaceSaving(CAPACITY) for month in ("2024-01", "2024-02")}
+    for offset in range(0, len(rows), 70):
+        chunk = rows[offset:offset + 70]
+        record_sketch_rows(db, chunk)
+        for month, sketch in expected.items():
+            sketch.update(
+                Counter(
+                    normalize_merchant(merchant) for row_date, merchant, _ in chunk if row_date.strftime("%Y-%m") == month
+                )
+            )
+
+    # Counters updated row by row evict and admit exactly as the whole sketch would
+    stored = load_top_merchants(db, "2024-01", "2024-02")
+    assert [(sketch.counters, sketch.floor) for _, sketch in stored] == [
+        (sketch.counters, sketch.floor) for sketch in expected.values()
+    ]
+    assert sum(transaction_count for transaction_count, _ in stored) == 3000
+
+
+def test_space_saving_bounds_hold_for_each_month_and_merged_months(db, monkeypatch):
+    monkeypatch.setattr(settings, "top_merchant_capacity", CAPACITY)
+    rows = skewed_rows(6000, seed=41, months=(1, 2, 3))
+    for offset in range(0, len(rows), 100):
+        record_sketch_rows(db, rows[offset:offset + 100])
+    exact = {
+        month: Counter(normalize_merchant(merchant) for row_date, merchant, _ in rows if row_date.month == month)
+        for month in (1, 2, 3)
+    }
+
+    # Each month's counters bracket the true count, and untracked merchants stay under the bound
+    for (_, sketch), counts in zip(load_top_merchants(db, "2024-01", "2024-03"), exact.values()):
+        for merchant, true_count in counts.items():
+            if merchant in sketch.counters:
+                count, error = sketch.counters[merchant]
+                assert count - error <= true_count <= count
+            else:
+                assert true_count <= sketch.untracked_bound()
+
+        # Merchants making up more than 1 / capacity of the month are always tracked
+        heavy = {merchant for merchant, true_count in counts.items() if true_count > sum(counts.values()) / CAPACITY}
+        assert heavy <= set(sketch.counters)
+
+    # Bounds merged over the months bracket the true totals, and guaranteed merchants are in the true top list
+    totals = sum(exact.values(), Counter())
+    result = top_merchants(db, "2024-01", "2024-03", 5)
+    assert result["transaction_count"] == 6000
+    for entry in result["merchants"]:
+        assert entry["count_lower_bound"] <= totals[entry["merchant"]] <= entry["count"]
+    true_fifth = sorted(totals.values(), reverse=True)[4]
+    assert all(totals[entry["merchant"]] >= true_fifth for entry in result["merchants"] if entry["guaranteed"])
+    assert any(entry["guaranteed"] for entry in result["merchants"])
+
+    # A merchant left out is either under the untracked cap or ranked below every listed upper bound
+    listed = {entry["merchant"] for entry in result["merchants"]}
+    cutoff = max(result["untracked_max_count"], min(entry["count"] for entry in result["merchants"]))
+    assert all(count <= cutoff for merchant, count in totals.items() if merchant not in listed)
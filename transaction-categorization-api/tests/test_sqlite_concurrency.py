@@ -0,0 +1,93 @@
+# SQLite concurrency tests are defined in this file
+# In WAL mode readers keep working while a writer holds its transaction open
+import threading
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.db.session import SessionLocal
+from app.services.ingest import insert_transaction_rows
+from app.services.listing import fetch_transaction_page
+from app.services.summaries import month_summary
+
+# Write transactions held open by the writer, and how long each is held
+WRITE_TRANSACTIONS = 10
+WRITE_HOLD_SECONDS = 0.2
+
+# Threads reading while the writer runs
+READER_THREADS = 8
+
+
+def transaction_rows(count: int, offset: int) -> list[dict]:
+    # Rows are spread over January 2024
+    return [
+        {
+            "amount_cents": 100 + offset + index,
+            "merchant": "Uber",
+            "category": "Transportation",
+            "date": date(2024, 1, 1 + (offset + index) % 28),
+            "external_id": None,
+            "rules_version": None,
+            "category_source": "rule",
+        }
+        for index in range(count)
+    ]
+
+
+@pytest.mark.slow
+def test_readers_never_see_database_is_locked_while_writer_holds_transactions(database):
+    with database.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+
+    writing = threading.Event()
+    done = threading.Event()
+    errors: list[Exception] = []
+    reads_during_writes = [0] * READER_THREADS
+
+    def writer() -> None:
+        try:
+            for number in range(WRITE_TRANSACTIONS):
+                # Rows are inserted and the write lock is held before the commit
+                with SessionLocal() as db:
+                    insert_transaction_rows(db, transaction_rows(50, number * 50))
+                    writing.set()
+                    time.sleep(WRITE_HOLD_SECONDS)
+                    writing.clear()
+                    db.commit()
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            done.set()
+
+    def reader(slot: int) -> None:
+        while not done.is_set():
+            try:
+                with SessionLocal() as db:
+                    held = writing.is_set()
+                    fetch_transaction_page(db, limit=100)
+                    month_summary(db, "2024-01")
+                    db.execute(text("SELECT count(*) FROM transactions")).scalar()
+                    if held and writing.is_set():
+                        reads_during_writes[slot] += 1
+            except OperationalError as exc:
+                errors.append(exc)
+
+    threads = [threading.Thread(target=writer)]
+    threads += [threading.Thread(target=reader, args=(slot,)) for slot in range(READER_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=60)
+
+    # No reader failed on the lock, and reads completed while a write transaction was open
+    assert not [error for error in errors if "database is locked" in str(error)]
+    assert not errors
+    assert sum(reads_during_writes) > 0
+
+    # Every committed row is visible once the writer has finished
+    with SessionLocal() as db:
+        assert db.execute(text("SELECT count(*) FROM transactions")).scalar() == WRITE_TRANSACTIONS * 50
+        assert month_summary(db, "2024-01")["transaction_count"] == WRITE_TRANSACTIONS * 50
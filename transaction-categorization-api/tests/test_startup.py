@@ -0,0 +1,68 @@
+# Startup and schema migration tests are defined in this file
+# Workers only check the schema version at startup, migrations are applied beforehand
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect
+
+from app.db.base import Base
+from app.db.migrations import SchemaOutdated, latest_version, run_migrations
+from app.db.session import create_shard_engine
+from app.main import app
+from app.services import warmup
+from app.services.categorizer import get_category_cache_stats, set_fallback_model
+from tests.helpers import bulk_create, counted_calls, generated_rows
+
+
+def test_migrations_build_the_schema_the_models_declare(tmp_path):
+    migrated = create_shard_engine(str(tmp_path / "fresh.db"))
+    try:
+        # Migrations run once, a second run finds nothing to do
+        assert run_migrations(migrated) == latest_version()
+        assert run_migrations(migrated) == latest_version()
+
+        # Every model table exists with the declared columns and indexes
+        inspector = inspect(migrated)
+        for table in Base.metadata.sorted_tables:
+            assert {column["name"] for column in inspector.get_columns(table.name)} == set(table.columns.keys())
+            declared_indexes = {index.name for index in table.indexes}
+            assert declared_indexes <= {index["name"] for index in inspector.get_indexes(table.name)}
+    finally:
+        migrated.dispose()
+
+
+def test_startup_refuses_an_unmigrated_database(tmp_path, monkeypatch):
+    unmigrated = create_shard_engine(str(tmp_path / "unmigrated.db"))
+    monkeypatch.setattr(warmup, "engine", unmigrated)
+    try:
+        with pytest.raises(SchemaOutdated, match="run python -m scripts.migrate"):
+            with TestClient(app):
+                pass
+    finally:
+        unmigrated.dispose()
+
+
+def test_startup_warms_the_category_cache_of_a_migrated_database(client, database, monkeypatch):
+    bulk_create(client, generated_rows(50, seed=13))
+    monkeypatch.setattr(warmup, "engine", database)
+
+    # The cache starts empty and holds the recent merchants once the worker has started
+    set_fallback_model(None)
+    stats = get_category_cache_stats()
+    calls = counted_calls()
+    assert stats["size"] == 0
+    with TestClient(app) as started:
+        assert started.get("/health").status_code == 200
+        warmed = get_category_cache_stats()
+        assert warmed["size"] > 0
+
+        # Warm-up counts no categorizer calls and no cache lookups, so metrics only reflect requests
+        assert counted_calls() == calls
+        assert (warmed["hits"], warmed["misses"], warmed["evictions"]) == (
+            stats["hits"],
+            stats["misses"],
+            stats["evictions"],
+        )
+
+        # The first request for a warmed merchant is a cache hit
+        assert started.post("/transactions/", json=generated_rows(1, seed=13)[0]).status_code == 200
+        assert get_category_cache_stats()["hits"] == stats["hits"] + 1
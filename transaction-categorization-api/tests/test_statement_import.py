@@ -0,0 +1,80 @@
+# Statement import tests are defined in this file
+# Files are parsed in small blocks and imported in checkpointed chunks that a resumed job continues from
+import io
+from datetime import date
+
+from sqlalchemy import text
+
+from app.services.statement_import import create_import_job, iter_ofx_records, run_import
+from tests.helpers import ofx_statement
+
+
+class Interrupted(Exception):
+    # Raised from the progress callback to stop an import between chunks
+    pass
+
+
+def test_interrupted_csv_import_resumes_without_repeating_or_skipping_rows(db, tmp_path):
+    # Records use both date layouts, currency formatting and a quoted merchant holding a comma
+    expected = [
+        (
+            1000 + index * 137,
+            "Corner Shop, Inc." if index % 4 == 0 else f"Uber Trip {index}",
+            date(2023, 1 + index % 12, 1 + index % 28),
+        )
+        for index in range(45)
+    ]
+    lines = ["Posted Date,Description,Amount"]
+    for index, (cents, merchant, row_date) in enumerate(expected):
+        posted = row_date.isoformat() if index % 2 else row_date.strftime("%m/%d/%Y")
+        lines.append(f'{posted},"{merchant}","${cents // 100:,}.{cents % 100:02d}"')
+    path = tmp_path / "statement.csv"
+    path.write_text("\n".join(lines) + "\n")
+
+    # The import is stopped once its second chunk has been committed
+    job = create_import_job(db, str(path), "csv")
+    progress = []
+
+    def interrupt(job) -> None:
+        progress.append(job.checkpoint_offset)
+        if len(progress) == 2:
+            raise Interrupted
+
+    assert run_import(job.id, chunk_size=10, read_size=64, on_progress=interrupt) == "failed"
+    db.refresh(job)
+    assert (job.rows_read, job.rows_inserted, job.checkpoint_offset) == (20, 20, progress[-1])
+    assert 0 < job.checkpoint_offset < job.total_bytes
+
+    # The resumed import continues after the checkpoint
+    assert run_import(job.id, chunk_size=10, read_size=64) == "completed"
+    db.refresh(job)
+    assert (job.rows_read, job.rows_inserted, job.rows_duplicate, job.rows_failed) == (45, 45, 0, 0)
+
+    # Every record is stored exactly once, in file order
+    stored = db.execute(text("SELECT amount_cents, merchant, date FROM transactions ORDER BY id")).all()
+    assert [(cents, merchant, date.fromisoformat(row_date)) for cents, merchant, row_date in stored] == expected
+
+
+def test_ofx_records_are_parsed_across_read_blocks():
+    statement = ofx_statement(
+        [
+            ("T1", "20230105120000[-5:EST]", "-12.50", "Starbucks &amp; Co"),
+            ("T2", "20230106", "1,024.00", "Uber Trip"),
+            ("", "20230107", "(3.25)", "Fresh Grocery"),
+        ]
+    ).encode()
+
+    # Fields of every block are read, whatever block size cuts through the tags
+    for read_size in (1, 7, 64, 4096):
+        records = list(iter_ofx_records(io.BytesIO(statement), read_size))
+        assert [record for _, record in records] == [
+            {"date": "2023-01-05", "amount": "-12.50", "merchant": "Starbucks & Co", "external_id": "T1"},
+            {"date": "2023-01-06", "amount": "1024.00", "merchant": "Uber Trip", "external_id": "T2"},
+            {"date": "2023-01-07", "amount": "-3.25", "merchant": "Fresh Grocery", "external_id": None},
+        ]
+
+        # Each offset ends its block, so reading from it yields only the records after it
+        offsets = [offset for offset, _ in records]
+        assert all(statement[:offset].endswith(b"</STMTTRN>") for offset in offsets)
+        resumed = list(iter_ofx_records(io.BytesIO(statement), read_size, offsets[0]))
+        assert resumed == records[1:]
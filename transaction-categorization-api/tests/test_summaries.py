@@ -0,0 +1,110 @@
+# Summary endpoint tests are defined in this file
+# Month and range summaries are compared with totals grouped from the stored rows
+import random
+
+import pytest
+
+from tests.helpers import bulk_create, generated_rows, grouped_totals, rollup_totals
+
+
+def test_month_summary_counts_rows_on_month_edges_once(client):
+    # Rows sit on the first and last day of months, across a leap day and a year end
+    dates = ["2023-12-31", "2024-01-01", "2024-01-31", "2024-02-01", "2024-02-29", "2024-03-01"]
+    for index, row_date in enumerate(dates):
+        response = client.post("/transactions/", json={"amount": f"{index + 1}.00", "merchant": "Uber", "date": row_date})
+        assert response.status_code == 200
+
+    # Each month holds exactly its own first and last days
+    expected = {"2023-12": (1, 1.0), "2024-01": (2, 5.0), "2024-02": (2, 9.0), "2024-03": (1, 6.0), "2024-04": (0, 0)}
+    for month, (count, total) in expected.items():
+        summary = client.get("/transactions/summary", params={"month": month}).json()
+        assert (summary["transaction_count"], summary["overall_total"]) == (count, total)
+
+
+@pytest.mark.parametrize("month", ["2024-13", "2024-1", "2024-00", "24-01", "2024-01-01"])
+def test_month_summary_rejects_malformed_months(client, month):
+    assert client.get("/transactions/summary", params={"month": month}).status_code == 422
+
+
+def test_rollups_match_grouped_rows_after_creates_bulk_and_deletes(client, db):
+    # Rows are added one by one and in bulk
+    for row in generated_rows(20, seed=2):
+        assert client.post("/transactions/", json=row).status_code == 200
+    bulk_create(client, generated_rows(300, seed=3))
+
+    # Some rows are deleted again, and a missing one is reported
+    ids = [row["id"] for row in client.get("/transactions/").json()]
+    for transaction_id in random.Random(4).sample(ids, 60):
+        assert client.delete(f"/transactions/{transaction_id}").status_code == 204
+    assert client.delete(f"/transactions/{ids[0] + 10_000}").status_code == 404
+
+    # Rollups hold exactly the grouped totals of the remaining rows
+    assert rollup_totals(db) == grouped_totals(db)
+
+    # Month summaries are answered from the same totals
+    for (month, category), (count, cents) in grouped_totals(db).items():
+        summary = client.get("/transactions/summary", params={"month": month}).json()
+        assert summary["totals_by_category"][category] == cents / 100
+    assert sum(count for count, _ in grouped_totals(db).values()) == 260
+
+
+def test_range_summary_returns_columns_and_year_over_year_deltas(client):
+    for row_date, merchant, amount in [
+        ("2023-01-15", "Uber", "10.00"),
+        ("2024-01-15", "Uber", "12.50"),
+        ("2024-02-10", "Walmart", "7.25"),
+        ("2024-03-31", "Starbucks", "3.00"),
+    ]:
+        client.post("/transactions/", json={"amount": amount, "merchant": merchant, "date": row_date})
+
+    summary = client.get("/transactions/summary/range", params={"start": "2024-01", "end": "2024-03", "yoy": "true"})
+    assert summary.status_code == 200
+    assert summary.json() == {
+        "months": ["2024-01", "2024-02", "2024-03"],
+        "transaction_counts": [1, 1, 1],
+        "overall_totals": [12.5, 7.25, 3.0],
+        "totals_by_category": {
+            "Food & Dining": [0.0, 0.0, 3.0],
+            "Groceries": [0.0, 7.25, 0.0],
+            "Transportation": [12.5, 0.0, 0.0],
+        },
+        # Only January has a prior year month with data
+        "yoy_deltas_by_category": {
+            "Food & Dining": [0.0, None, None],
+            "Groceries": [0.0, None, None],
+            "Transportation": [2.5, None, None],
+        },
+    }
+
+
+@pytest.mark.parametrize(
+    ("start", "end", "yoy"),
+    [
+        ("0002-01", "0002-03", True),
+        ("0001-01", "0001-02", False),
+        ("9999-01", "9999-12", False),
+        ("9999-01", "9999-12", True),
+        ("9990-01", "9999-12", True),
+    ],
+)
+def test_range_summary_accepts_the_first_and_last_calendar_months(client, start, end, yoy):
+    response = client.get("/transactions/summary/range", params={"start": start, "end": end, "yoy": yoy})
+    assert response.status_code == 200
+    months = response.json()["months"]
+    assert (months[0], months[-1]) == (start, end)
+
+
+@pytest.mark.parametrize(
+    ("start", "end", "yoy"),
+    [
+        # The prior year of year 1 does not exist
+        ("0001-01", "0001-02", True),
+        ("0001-12", "0002-02", True),
+        ("0000-01", "0000-02", False),
+        ("2024-03", "2024-01", False),
+        ("2000-01", "2010-01", False),
+    ],
+)
+def test_range_summary_rejects_ranges_it_cannot_serve(client, start, end, yoy):
+    response = client.get("/transactions/summary/range", params={"start": start, "end": end, "yoy": yoy})
+    assert response.status_code == 422
@@ -0,0 +1,149 @@
+# Transaction endpoint tests are defined in this file
+# Requests go through the ASGI app against a fresh database per test
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.api.routes import transactions as transactions_routes
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.write_behind import GroupCommitWriter
+from tests.helpers import rollup_totals
+
+
+class GatedSessions:
+    # Session factory counting the group commits, which can be held open before they write
+    def __init__(self):
+        self.flushes = 0
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self):
+        self.flushes += 1
+        self.entered.set()
+        assert self.release.wait(10)
+        return SessionLocal()
+
+
+@pytest.fixture
+def writer_factory(monkeypatch):
+    # Creates are handed to a writer of the test, which is stopped afterwards
+    monkeypatch.setattr(settings, "write_behind_enabled", True)
+    writers = []
+
+    def make_writer(**options) -> tuple[GroupCommitWriter, GatedSessions]:
+        sessions = GatedSessions()
+        writer = GroupCommitWriter(session_factory=sessions, **options)
+        monkeypatch.setattr(transactions_routes, "write_behind", writer)
+        writers.append(writer)
+        return writer, sessions
+
+    yield make_writer
+    for writer in writers:
+        writer.stop(5)
+
+
+def created_row(index: int) -> dict:
+    # Create request body of a numbered row
+    return {"amount": f"{index + 1}.00", "merchant": "Uber", "date": "2024-03-01"}
+
+
+def row_for_writer(index: int) -> dict:
+    # Insert parameters of a numbered row, as the create route builds them
+    return {
+        "amount_cents": (index + 1) * 100,
+        "merchant": "Uber",
+        "category": "Transportation",
+        "date": date(2024, 3, 1),
+        "external_id": None,
+        "rules_version": None,
+        "category_source": "rule",
+    }
+
+
+def test_write_behind_commits_concurrent_creates_together(client, db, writer_factory):
+    # The group is flushed once every request has arrived
+    writer, sessions = writer_factory(max_batch_rows=12, max_delay_ms=5000)
+    with ThreadPoolExecutor(12) as pool:
+        responses = list(pool.map(lambda index: client.post("/transactions/", json=created_row(index)), range(12)))
+
+    assert [response.status_code for response in responses] == [200] * 12
+    assert sorted(response.json()["id"] for response in responses) == list(range(1, 13))
+    assert sessions.flushes == 1
+    assert rollup_totals(db) == {("2024-03", "Transportation"): (12, sum(range(1, 13)) * 100)}
+
+
+def test_write_behind_rejects_a_full_queue(client, writer_factory, monkeypatch):
+    monkeypatch.setattr(settings, "write_behind_submit_timeout_ms", 10)
+    writer, sessions = writer_factory(queue_size=1)
+
+    # One row is being committed and one waits in the queue, which is then full
+    sessions.release.clear()
+    committing = writer.submit(row_for_writer(0))
+    assert sessions.entered.wait(5)
+    queued = writer.submit(row_for_writer(1))
+
+    response = client.post("/transactions/", json=created_row(2))
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+    # Accepted rows are written once the commit goes through
+    sessions.release.set()
+    assert [committing.result(5)[0]["id"], queued.result(5)[0]["id"]] == [1, 2]
+
+
+def test_write_behind_answers_unconfirmed_commits_with_503_or_504(client, db, writer_factory, monkeypatch):
+    monkeypatch.setattr(settings, "write_behind_commit_timeout_s", 0.2)
+    writer, sessions = writer_factory()
+
+    # A row whose group is being committed may still be stored
+    sessions.release.clear()
+    with ThreadPoolExecutor(1) as pool:
+        committing = pool.submit(client.post, "/transactions/", json=created_row(0))
+        assert sessions.entered.wait(5)
+
+        # A row still waiting in the queue is withdrawn
+        withdrawn = client.post("/transactions/", json=created_row(1))
+        assert withdrawn.status_code == 503
+        assert committing.result(5).status_code == 504
+
+    # Only the row of the group being committed is stored
+    sessions.release.set()
+    writer.stop(5)
+    assert db.execute(text("SELECT amount_cents FROM transactions")).scalars().all() == [100]
+
+
+def test_write_behind_stop_drains_queued_rows(db, writer_factory):
+    writer, sessions = writer_factory(max_batch_rows=8)
+
+    # Rows pile up behind a commit that is held open
+    sessions.release.clear()
+    futures = [writer.submit(row_for_writer(0))]
+    assert sessions.entered.wait(5)
+    futures += [writer.submit(row_for_writer(index)) for index in range(1, 21)]
+
+    # Stopping commits every queued row, in batches of at most eight, before the thread exits
+    stopping = threading.Thread(target=writer.stop, args=(10,))
+    stopping.start()
+    sessions.release.set()
+    stopping.join(10)
+    assert [future.result(0)[1] for future in futures] == [True] * 21
+    assert db.execute(text("SELECT count(*) FROM transactions")).scalar_one() == 21
+    assert sessions.flushes == 4
+
+
+def test_write_behind_fails_every_request_of_a_failed_group(db, writer_factory):
+    writer, sessions = writer_factory(max_batch_rows=3, max_delay_ms=5000)
+
+    # The second row breaks the group's insert, so none of the three rows is stored
+    rows = [row_for_writer(0), {**row_for_writer(1), "merchant": None}, row_for_writer(2)]
+    futures = [writer.submit(row) for row in rows]
+    errors = [future.exception(5) for future in futures]
+    assert all(isinstance(error, IntegrityError) for error in errors)
+    assert len({id(error) for error in errors}) == 1
+    assert db.execute(text("SELECT count(*) FROM transactions")).scalar_one() == 0